@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
+
+from core import audit
+from .caching import forget_users
 from .models import User, Department
 
 
@@ -93,12 +96,18 @@ class CustomUserAdmin(UserAdmin):
     
     def verify_users(self, request, queryset):
         """Bulk verify users."""
+        pks = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_verified=True)
+        forget_users(pks)
+        audit.record_many('user.verified', User, pks, actor=request.user)
         self.message_user(request, f'{updated} users were verified.')
     verify_users.short_description = "Verify selected users"
     
     def unverify_users(self, request, queryset):
         """Bulk unverify users."""
+        pks = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_verified=False)
+        forget_users(pks)
+        audit.record_many('user.unverified', User, pks, actor=request.user)
         self.message_user(request, f'{updated} users were unverified.')
     unverify_users.short_description = "Unverify selected users"
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Async read endpoints for departments and the current user.
+
+Served in place of the DRF list/``me`` actions when running under ASGI (see
+``ts_backend/asgi_urls.py``), with the same payloads.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from django.db.models import Count, aprefetch_related_objects
+
+from core.async_api import (
+    api_response,
+    async_read_view,
+    filter_queryset,
+    invalid_page,
+    authentication_required,
+    paginate,
+)
+from core.fieldsets import field_requested, optimize_queryset, query_plan, selection_from_request
+from .models import Department, User
+from .serializers import DepartmentSerializer, UserSerializer, load_nested_member_ids
+from .views import DepartmentViewSet, StandardPagination
+
+
+@async_read_view
+@authentication_required
+async def department_list(request):
+    """Async ``GET /departments/``."""
+    selection = selection_from_request(request)
+    queryset = optimize_queryset(Department.objects.all(), DepartmentSerializer, **selection)
+    if field_requested(selection, 'member_count'):
+        queryset = queryset.annotate(member_count_annotation=Count('members'))
+    queryset = await filter_queryset(DepartmentViewSet, request, queryset)
+    try:
+        departments, envelope = await paginate(
+            request, queryset, StandardPagination.page_size
+        )
+    except InvalidPage:
+        return invalid_page(request)
+
+    serializer = DepartmentSerializer(
+        departments, many=True, context={'request': request}, **selection
+    )
+    # Member ids and the user expansions' department names are loaded while
+    # rendering, which may query: render in a thread.
+    data = await sync_to_async(lambda: serializer.data)()
+    return api_response(request, {**envelope, 'results': data})
+
+
+@async_read_view
+@authentication_required
+async def me(request):
+    """Async ``GET /users/me/``."""
+    user = request.user
+    selection = selection_from_request(request)
+    plan = query_plan(UserSerializer, User, **selection)
+    if set(plan.select_related) - {'department'}:
+        # Expanded relations need joins ``authenticate`` did not make.
+        user = await plan.apply(User.objects.all(), prefetch=False).aget(pk=user.pk)
+    await aprefetch_related_objects([user], *plan.prefetch_related)
+    serializer = UserSerializer(user, context={'request': request}, **selection)
+    await sync_to_async(load_nested_member_ids)(serializer, [user])
+    return api_response(request, serializer.data)
@@ -0,0 +1,113 @@
+"""
+Cache tags of the account models, and the cached users behind authentication.
+
+``'department'`` covers every department, ``'department:<pk>'`` one of them;
+``'user:<pk>'`` covers one user.
+
+``get_user(pk)`` is what ``accounts.authentication.CachedJWTAuthentication``
+resolves tokens with, so it runs on every authenticated request. It looks in a
+per-process LRU first (``AUTH_USER_LOCAL_TTL`` seconds, ``AUTH_USER_LOCAL_SIZE``
+users), then in the shared cache, then in the database. Saving a user, which
+changing its password does, drops it from both caches once the transaction
+commits; other processes' LRUs hold it for at most ``AUTH_USER_LOCAL_TTL``
+seconds more. ``User.managed_department_ids``, the departments a user leads,
+comes from one cached map of every department leader, so permission checks
+on it need no query either.
+"""
+import copy
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from core.caching import LocalCache, cached, invalidate_on_change, invalidate_on_commit
+from core.conf import perf_setting
+
+from .models import Department
+
+_users = LocalCache(perf_setting('AUTH_USER_LOCAL_SIZE'))
+
+
+def user_tag(pk):
+    return f'user:{pk}'
+
+
+def department_leaders():
+    """``{team leader id: [{'id', 'name'}, ...]}`` of every led department, by name."""
+    def compute():
+        leaders = {}
+        rows = Department.objects.filter(team_leader__isnull=False).values('team_leader_id', 'id', 'name')
+        for row in rows:
+            leaders.setdefault(row['team_leader_id'], []).append({'id': row['id'], 'name': row['name']})
+        return leaders
+
+    return cached('departments:leaders', compute, tags=('department',))
+
+
+def department_names():
+    """``{department id: display name}`` of every department."""
+    def compute():
+        labels = dict(Department.DEPARTMENTS)
+        return {pk: labels.get(name, name) for pk, name in Department.objects.values_list('pk', 'name')}
+
+    return cached('departments:names', compute, tags=('department',))
+
+
+def managed_departments(user_pk):
+    """``{'id', 'name'}`` of the departments ``user_pk`` leads."""
+    return department_leaders().get(user_pk, [])
+
+
+def managed_department_ids(user_pk):
+    return frozenset(department['id'] for department in managed_departments(user_pk))
+
+
+def get_user(pk):
+    """
+    The user with primary key ``pk``, its department selected, or ``None``.
+    Each call returns a copy, which the caller may modify.
+    """
+    User = get_user_model()
+    # Token claims hold the id as a string.
+    pk = User._meta.pk.to_python(pk)
+    user = _users.get(pk)
+    if user is None:
+        user = cached(
+            f'users:{pk}',
+            lambda: User.objects.select_related('department').filter(pk=pk).first(),
+            tags=(user_tag(pk),),
+        )
+        if user is None:
+            return None
+        _users.set(pk, user, perf_setting('AUTH_USER_LOCAL_TTL'))
+    return copy.copy(user)
+
+
+def forget_user(pk):
+    """Drop ``pk`` from this process's LRU once the current transaction commits."""
+    transaction.on_commit(lambda: _users.delete(pk))
+
+
+def forget_users(pks):
+    """Drop users changed without signals (``update()``) from every cache, on commit."""
+    pks = list(pks)
+    invalidate_on_commit(*(user_tag(pk) for pk in pks))
+    for pk in pks:
+        forget_user(pk)
+
+
+def _user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+def forget_all_users():
+    """Empty this process's LRU, now."""
+    _users.clear()
+
+
+def register():
+    User = get_user_model()
+    invalidate_on_change(Department, lambda department: ('department', f'department:{department.pk}'))
+    invalidate_on_change(User, lambda user: (user_tag(user.pk),))
+    for signal, name in ((post_save, 'saved'), (post_delete, 'deleted')):
+        signal.connect(_user_changed, sender=User, dispatch_uid=f'accounts.caching.user_{name}')
@@ -0,0 +1,70 @@
+"""
+Password hashing on a process pool, for creating many users at once.
+
+A password hash is slow on purpose, about half a second with the default
+PBKDF2 hasher, so hashing the passwords of a few hundred users one after the
+other takes minutes. ``hash_passwords`` spreads them over
+``PROVISION_HASH_WORKERS`` processes, one per CPU by default, whatever the
+hasher and whether or not it releases the GIL. The pool is started on first
+use and kept for the life of the process. Its children are spawned, like
+``run_workers --pool process``, and set Django up so they hash with the
+project's ``PASSWORD_HASHERS``; they unpickle this module by reference before
+that, so it must not import models at the top level.
+"""
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_process():
+    import django
+    django.setup()
+
+
+def _hash_chunk(passwords):
+    from django.contrib.auth.hashers import make_password
+    return [make_password(password) for password in passwords]
+
+
+def hash_workers():
+    from core.conf import perf_setting
+    return perf_setting('PROVISION_HASH_WORKERS') or os.cpu_count() or 1
+
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forked children would share the parent's database sockets.
+            _pool = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_process,
+            )
+        return _pool
+
+
+def hash_passwords(passwords):
+    """``make_password`` of each of ``passwords``, in order."""
+    global _pool
+    passwords = list(passwords)
+    workers = hash_workers()
+    if workers < 2 or len(passwords) < 2:
+        return _hash_chunk(passwords)
+    # One chunk per worker: a task each, not one per password.
+    size = math.ceil(len(passwords) / workers)
+    chunks = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+    pool = _get_pool(workers)
+    try:
+        return [hashed for chunk in pool.map(_hash_chunk, chunks) for hashed in chunk]
+    except BrokenProcessPool:
+        # A child died; start a new pool on the next call.
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
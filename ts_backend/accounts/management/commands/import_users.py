@@ -0,0 +1,87 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.provisioning import MAX_USERS, UserProvisioner
+
+
+class Command(BaseCommand):
+    help = (
+        'Create users from a CSV file (a header row of POST /users/ fields) or '
+        'a JSON array of objects, the way POST /users/bulk/ does: in batches, '
+        'passwords hashed on a process pool, reporting each row that fails.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON file, or '-' for standard input.")
+        parser.add_argument('--format', choices=('csv', 'json'),
+                            help='Default: from the file extension, else csv.')
+        parser.add_argument('--batch-size', type=int, default=MAX_USERS,
+                            help='Rows validated and inserted together (default: %(default)s).')
+        parser.add_argument('--atomic', action='store_true',
+                            help='Create no user at all if any row is invalid, stopping '
+                                 'at the first batch with one.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        fmt = options['format'] or ('json' if options['path'].endswith('.json') else 'csv')
+        stream = sys.stdin if options['path'] == '-' else None
+        try:
+            if stream is None:
+                stream = Path(options['path']).open(newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(exc)
+
+        started = time.perf_counter()
+        with stream:
+            rows = self.read_csv(stream) if fmt == 'csv' else self.read_json(stream)
+            if options['atomic']:
+                with transaction.atomic():
+                    created, failed = self.run(rows, options['batch_size'], atomic=True)
+                    if failed:
+                        # Rolls back the batches already inserted.
+                        raise CommandError(f'{failed} invalid rows; no user created.')
+            else:
+                created, failed = self.run(rows, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} users, {failed} rows failed, in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def run(self, rows, batch_size, atomic=False):
+        created = failed = offset = 0
+        provisioner = UserProvisioner()
+        while batch := list(islice(rows, batch_size)):
+            results, count = provisioner.run(batch, atomic=atomic)
+            created += count
+            for result in results:
+                if 'errors' in result and result['status'] != 424:
+                    failed += 1
+                    # Rows are numbered from 1, the CSV header aside.
+                    self.stderr.write(f'row {offset + result["index"] + 1}: {json.dumps(result["errors"])}')
+            offset += len(batch)
+            if atomic and failed:
+                # Every row after this is rolled back anyway; don't hash them.
+                break
+        return created, failed
+
+    def read_csv(self, stream):
+        for row in csv.DictReader(stream):
+            # An empty cell is a missing value, so the field's default applies.
+            yield {key: value for key, value in row.items() if key and value != ''}
+
+    def read_json(self, stream):
+        try:
+            rows = json.load(stream)
+        except ValueError as exc:
+            raise CommandError(f'Invalid JSON: {exc}')
+        if not isinstance(rows, list):
+            raise CommandError('Expected a JSON array of users.')
+        return iter(rows)
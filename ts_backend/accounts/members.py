@@ -0,0 +1,38 @@
+"""
+Department membership without a model instance per member.
+
+``DepartmentSerializer.members`` lists member ids. Prefetching ``members``
+for them built a ``User`` for every member of every department on the page;
+``load_member_ids`` reads the ids for a whole page of departments from one
+``values_list`` query instead. Members themselves are listed a page at a time
+by ``/departments/{id}/members/`` with ``MemberPagination``: keyset pages by
+id, which the index on ``department`` answers in order (SQLite keeps the
+primary key in every index), however large the department.
+"""
+from core.pagination import KeysetPagination
+
+from .models import User
+
+
+class MemberPagination(KeysetPagination):
+    page_size = 50
+    max_page_size = 200
+    ordering = ('id',)
+
+
+def load_member_ids(departments):
+    """Set ``member_ids`` on each of ``departments`` that lacks it, in one query."""
+    pending = {}
+    for department in departments:
+        if not hasattr(department, 'member_ids'):
+            pending.setdefault(department.pk, []).append(department)
+    if not pending:
+        return
+    member_ids = {pk: [] for pk in pending}
+    # User's default ordering, as the prefetch had.
+    rows = User.objects.filter(department_id__in=pending).values_list('department_id', 'pk')
+    for department_id, pk in rows:
+        member_ids[department_id].append(pk)
+    for pk, instances in pending.items():
+        for department in instances:
+            department.member_ids = member_ids[pk]
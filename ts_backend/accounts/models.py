@@ -128,8 +128,9 @@ class User(AbstractUser):
     def full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
     
-    def save(self, *args, **kwargs):
-    # Ensure username is lowercase for consistency
+    def normalize(self):
+        """What ``save()`` enforces; ``bulk_create`` callers call it themselves."""
+        # Ensure username is lowercase for consistency
         if self.username:
             self.username = self.username.lower()
 
@@ -137,6 +138,8 @@ class User(AbstractUser):
             self.is_superuser = True
             self.is_staff = True
 
+    def save(self, *args, **kwargs):
+        self.normalize()
         super().save(*args, **kwargs)
 
 
@@ -148,9 +151,18 @@ class User(AbstractUser):
         """Return human-readable permissions level."""
         return dict(self.USER_TYPES).get(self.user_type, self.user_type)
     
+    @property
+    def managed_department_ids(self):
+        """Ids of the departments this user leads, from the cache (see accounts.caching)."""
+        ids = self.__dict__.get('_managed_department_ids')
+        if ids is None:
+            from .caching import managed_department_ids
+            ids = self._managed_department_ids = managed_department_ids(self.pk)
+        return ids
+
     def can_manage_department(self, department):
         """Check if user can manage the given department."""
-        return self.managed_departments.filter(pk=department.pk).exists()
+        return department.pk in self.managed_department_ids
 
 
 
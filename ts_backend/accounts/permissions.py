@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .models import Department
+
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     """
@@ -48,12 +50,14 @@ class IsTeamLeaderOrReadOnly(permissions.BasePermission):
             return False
 
         is_admin = request.user.user_type == 'ADMIN'
-        is_team_leader = request.user.managed_departments.exists()
+        is_team_leader = bool(request.user.managed_department_ids)
 
         return is_admin or is_team_leader
     
     def has_object_permission(self, request, view, obj):
+        # A department, or something belonging to one (a user).
+        department_id = obj.pk if isinstance(obj, Department) else obj.department_id
         return (
         request.user.user_type == 'ADMIN' or
-        obj.department in request.user.managed_departments.all()
+        department_id in request.user.managed_department_ids
         )
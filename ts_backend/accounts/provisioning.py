@@ -0,0 +1,206 @@
+"""
+Creating many users at once: ``POST /users/bulk/`` and ``manage.py import_users``.
+
+``POST /users/bulk/`` takes ``{"users": [...], "atomic": false}``, each user
+what ``POST /users/`` takes without ``confirm_password``. Creating them one at
+a time, as ``UserCreateSerializer`` does, costs a query checking the username,
+an ``INSERT`` and a full password hash per user, one after the other.
+``UserProvisioner`` instead
+
+* validates every row, departments resolved from one query;
+* checks usernames and emails against existing users with one query, and
+  against the other rows, as set lookups;
+* hashes the passwords of the valid rows on a process pool
+  (``accounts.hashing``);
+* inserts them with one ``bulk_create``.
+
+Invalid rows are reported in the per-row results and the others are created,
+unless ``atomic`` is set: then any invalid row rejects the whole batch.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import serializers, status
+
+from .caching import forget_users
+from .hashing import hash_passwords
+from .models import Department
+from .serializers import UserCreateSerializer
+
+User = get_user_model()
+
+MAX_USERS = 1000
+
+
+class DepartmentLookupField(serializers.PrimaryKeyRelatedField):
+    """Departments from ``context['departments']``, loaded once for the batch."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.context['departments'][int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BulkUserSerializer(UserCreateSerializer):
+    """One row: ``UserCreateSerializer`` without the queries and the confirmation."""
+    confirm_password = None
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    department = DepartmentLookupField(
+        queryset=Department.objects.all(), required=False, allow_null=True
+    )
+
+    class Meta(UserCreateSerializer.Meta):
+        fields = [field for field in UserCreateSerializer.Meta.fields if field != 'confirm_password']
+
+    def validate_username(self, value):
+        # Uniqueness is checked for the whole batch.
+        return User.normalize_username(value).lower()
+
+    def validate_email(self, value):
+        return User.objects.normalize_email(value)
+
+    def validate(self, attrs):
+        return attrs
+
+
+class ProvisionRequestSerializer(serializers.Serializer):
+    """Request body of ``POST /users/bulk/``; the users are checked one by one."""
+    users = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_USERS
+    )
+    atomic = serializers.BooleanField(default=False)
+
+
+class Row:
+    """One user to create and, once known, its result."""
+
+    def __init__(self, index, data):
+        self.index = index
+        self.data = data
+        self.validated = None
+        self.instance = None
+        self.result = None
+
+    def fail(self, code, errors):
+        self.result = {'index': self.index, 'status': code, 'errors': errors}
+
+    def succeed(self, code, **data):
+        self.result = {'index': self.index, 'status': code, **data}
+
+
+class UserProvisioner:
+    """Validate and create the users of one batch."""
+
+    def __init__(self):
+        self.departments = {}
+        self.serializer = BulkUserSerializer(context={'departments': self.departments})
+
+    def run(self, users, atomic=False):
+        """Returns ``(results, created)``, results in the order of ``users``."""
+        items = [Row(index, data) for index, data in enumerate(users)]
+        for item in items:
+            if not isinstance(item.data, dict):
+                item.fail(status.HTTP_400_BAD_REQUEST, {'non_field_errors': ['Expected an object.']})
+        self._load([item for item in items if item.result is None])
+        for item in items:
+            if item.result is None:
+                self._validate(item)
+        self._check_unique([item for item in items if item.result is None])
+
+        valid = [item for item in items if item.result is None]
+        if atomic and len(valid) < len(items):
+            self._reject(valid)
+            return [item.result for item in items], 0
+        if valid:
+            valid = self._create(valid, atomic)
+        return [item.result for item in items], len(valid)
+
+    @staticmethod
+    def _reject(items):
+        for item in items:
+            item.fail(status.HTTP_424_FAILED_DEPENDENCY,
+                      {'detail': 'Not created: another user in the batch is invalid.'})
+
+    # Validation
+
+    def _load(self, items):
+        ids = set()
+        for item in items:
+            value = item.data.get('department')
+            if isinstance(value, bool):
+                continue
+            try:
+                ids.add(int(value))
+            except (TypeError, ValueError):
+                continue
+        if ids:
+            self.departments.update(Department.objects.in_bulk(ids))
+
+    def _validate(self, item):
+        try:
+            item.validated = self.serializer.run_validation(item.data)
+        except serializers.ValidationError as exc:
+            item.fail(status.HTTP_400_BAD_REQUEST, exc.detail)
+
+    def _check_unique(self, items):
+        """Reject usernames and emails taken by a user or by an earlier row."""
+        if not items:
+            return
+        usernames = {item.validated['username'] for item in items}
+        emails = {item.validated['email'] for item in items if item.validated.get('email')}
+        taken_usernames, taken_emails = set(), set()
+        rows = User.objects.filter(Q(username__in=usernames) | Q(email__in=emails))
+        for username, email in rows.values_list('username', 'email'):
+            taken_usernames.add(username)
+            taken_emails.add(email)
+
+        for item in items:
+            username, email = item.validated['username'], item.validated.get('email')
+            errors = {}
+            if username in taken_usernames:
+                errors['username'] = ['Username already exists']
+            if email and email in taken_emails:
+                errors['email'] = ['Email address is already in use']
+            if errors:
+                item.fail(status.HTTP_400_BAD_REQUEST, errors)
+                continue
+            taken_usernames.add(username)
+            if email:
+                taken_emails.add(email)
+
+    # Writes
+
+    def _create(self, items, atomic):
+        """Create the users of ``items``; returns the items created."""
+        passwords = hash_passwords([item.validated.pop('password') for item in items])
+        for item, password in zip(items, passwords):
+            item.instance = User(password=password, **item.validated)
+            item.instance.normalize()
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([item.instance for item in items])
+        except IntegrityError:
+            # Another request took a username since the check: check again,
+            # against the users there are now, and retry once.
+            self._check_unique(items)
+            valid = [item for item in items if item.result is None]
+            if atomic and len(valid) < len(items):
+                self._reject(valid)
+                return []
+            items = valid
+            if items:
+                with transaction.atomic():
+                    User.objects.bulk_create([item.instance for item in items])
+        # As save() would, in case a lookup cached one of the ids as missing.
+        forget_users(item.instance.pk for item in items)
+        for item in items:
+            item.succeed(status.HTTP_201_CREATED, id=item.instance.pk, username=item.instance.username)
+        return items
@@ -0,0 +1,22 @@
+"""
+OpenAPI extensions for the accounts app.
+
+drf-spectacular finds extensions by their module having been imported. This
+one is imported when a schema is generated, by the preprocessing hook below
+(``SPECTACULAR_SETTINGS['PREPROCESSING_HOOKS']``), rather than by
+``accounts.authentication`` at startup: loading drf-spectacular is no part of
+authenticating a request.
+"""
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+from .authentication import CachedJWTAuthentication
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Document ``CachedJWTAuthentication`` as the bearer scheme it is."""
+    target_class = CachedJWTAuthentication
+
+
+def register_extensions(endpoints, **kwargs):
+    """Preprocessing hook: importing this module registered the extensions."""
+    return endpoints
@@ -0,0 +1,174 @@
+"""
+Indexed search over the user directory.
+
+DRF's ``SearchFilter`` ORs an ``icontains`` per search field, which no index
+can answer, so every search scanned the user table. ``search_users`` answers
+from an index instead:
+
+* a UUID is an exact ``employee_id`` lookup, on that column's unique index;
+* on SQLite, the other terms match the words of username, email, first and
+  last name by prefix (``jo sm`` finds John Smith) in ``accounts_user_search``,
+  an FTS5 table kept in sync by triggers on ``accounts_user``, so ``save()``,
+  ``bulk_create()`` and ``update()`` all reach it;
+* on PostgreSQL, each term is an ``icontains`` over the same columns, which
+  the ``pg_trgm`` indexes on them answer;
+* other databases fall back to the ``icontains`` scan.
+
+Every term must match. ``create_index`` is run by the accounts migration
+and again after each ``migrate`` (``ensure_index``): SQLite drops a table's
+triggers when a migration rebuilds the table, and the index is rebuilt if
+they were missing.
+"""
+import re
+import uuid
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+from .models import User
+
+TABLE = 'accounts_user_search'
+COLUMNS = ('username', 'email', 'first_name', 'last_name')
+TRIGGERS = (f'{TABLE}_insert', f'{TABLE}_delete', f'{TABLE}_update')
+
+_cols = ', '.join(COLUMNS)
+_new = ', '.join(f'new.{column}' for column in COLUMNS)
+_old = ', '.join(f'old.{column}' for column in COLUMNS)
+_SQLITE_SCHEMA = (
+    # External content: the text stays in accounts_user, the index holds
+    # only the tokens. Prefix indexes make 1-3 character prefixes cheap.
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5({_cols}, "
+    f"content='accounts_user', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {TRIGGERS[0]} AFTER INSERT ON accounts_user BEGIN "
+    f"INSERT INTO {TABLE}(rowid, {_cols}) VALUES (new.id, {_new}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TRIGGERS[1]} AFTER DELETE ON accounts_user BEGIN "
+    f"INSERT INTO {TABLE}({TABLE}, rowid, {_cols}) VALUES ('delete', old.id, {_old}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TRIGGERS[2]} AFTER UPDATE OF {_cols} ON accounts_user BEGIN "
+    f"INSERT INTO {TABLE}({TABLE}, rowid, {_cols}) VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO {TABLE}(rowid, {_cols}) VALUES (new.id, {_new}); END",
+)
+_POSTGRES_SCHEMA = ('CREATE EXTENSION IF NOT EXISTS pg_trgm',) + tuple(
+    # The expression icontains compares, so the planner can use the index.
+    f'CREATE INDEX IF NOT EXISTS accounts_user_{column}_trgm '
+    f'ON accounts_user USING gin (UPPER({column}::text) gin_trgm_ops)'
+    for column in COLUMNS
+)
+
+
+def create_index(connection):
+    """Create the search index on ``connection`` if it is missing."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f"SELECT count(*) FROM sqlite_master WHERE type = 'trigger' "
+                f"AND name IN ({', '.join(['%s'] * len(TRIGGERS))})", TRIGGERS,
+            )
+            if cursor.fetchone()[0] == len(TRIGGERS):
+                return
+            for statement in _SQLITE_SCHEMA:
+                cursor.execute(statement)
+            # Rows written while triggers were missing.
+            cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == 'postgresql':
+            for statement in _POSTGRES_SCHEMA:
+                cursor.execute(statement)
+
+
+def drop_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for trigger in TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+        elif connection.vendor == 'postgresql':
+            for column in COLUMNS:
+                cursor.execute(f'DROP INDEX IF EXISTS accounts_user_{column}_trgm')
+
+
+def ensure_index(sender, using, **kwargs):
+    """
+    ``post_migrate`` receiver restoring the triggers a migration dropped.
+    Only an index the accounts migration created is repaired, so migrating
+    back past it leaves none.
+    """
+    connection = connections[using]
+    if (
+        connection.vendor == 'sqlite'
+        and router.allow_migrate_model(using, User)
+        and TABLE in connection.introspection.table_names()
+    ):
+        create_index(connection)
+
+
+def parse_employee_id(term):
+    try:
+        return uuid.UUID(term.strip())
+    except ValueError:
+        return None
+
+
+def match_expression(term):
+    """
+    The FTS5 query matching every word of ``term`` by prefix, or ``''``.
+    Words are quoted, so FTS5 operators in ``term`` are matched as text.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', term))
+
+
+def search_users(queryset, term):
+    """``queryset`` narrowed to the users matching ``term``."""
+    employee_id = parse_employee_id(term)
+    if employee_id is not None:
+        return queryset.filter(employee_id=employee_id)
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        expression = match_expression(term)
+        if not expression:
+            return queryset
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [expression])
+        )
+
+    for word in term.split():
+        queryset = queryset.filter(
+            Q.create([(f'{column}__icontains', word) for column in COLUMNS], connector=Q.OR)
+        )
+    return queryset
+
+
+def rank_users(queryset, term, limit):
+    """
+    At most ``limit`` users of ``queryset`` matching ``term``, best match
+    first: by FTS5 rank on SQLite, else by username.
+    """
+    if parse_employee_id(term) is not None or connections[queryset.db].vendor != 'sqlite':
+        return list(search_users(queryset, term).order_by('username')[:limit])
+    expression = match_expression(term)
+    if not expression:
+        return []
+    # Ranked ids from the index alone, a batch at a time, until ``limit`` of
+    # them pass the queryset's own filters.
+    found = []
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY rank', [expression])
+        while len(found) < limit:
+            ids = [row[0] for row in cursor.fetchmany(limit)]
+            if not ids:
+                break
+            users = queryset.filter(pk__in=ids).in_bulk()
+            found += [users[pk] for pk in ids if pk in users]
+    return found[:limit]
+
+
+class UserSearchFilter(SearchFilter):
+    """``?search=`` through ``search_users`` rather than ``icontains`` on ``search_fields``."""
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        return search_users(queryset, term)
@@ -1,28 +1,104 @@
+from functools import cached_property
+
+from django.db import models
 from rest_framework import serializers
+from rest_framework.fields import SkipField
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from core.fieldsets import SparseFieldsMixin
 # from django.contrib.auth import get_user_model
 from . models import Department, User
-
-
-
-class DepartmentSerializer(serializers.ModelSerializer):
+from .caching import department_names
+from .members import load_member_ids
+
+
+
+class MemberIdsField(serializers.ListField):
+    """
+    Ids of a department's members: its ``member_ids``, which
+    ``MemberIdsListSerializer`` loads for a whole list at once, else queried.
+    """
+    child = serializers.IntegerField()
+
+    def __init__(self, **kwargs):
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, department):
+        if not hasattr(department, 'member_ids'):
+            load_member_ids([department])
+        return department.member_ids
+
+
+class MemberIdsListSerializer(serializers.ListSerializer):
+    """
+    List serializer loading the member ids of every department that it, or a
+    serializer nested in it, shows, in one query.
+    """
+
+    def to_representation(self, data):
+        instances = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        load_nested_member_ids(self.child, instances)
+        return super().to_representation(instances)
+
+
+def load_nested_member_ids(serializer, instances):
+    """
+    Load, in one query, the member ids ``serializer`` will show when
+    representing ``instances``. Async views call it (through
+    ``sync_to_async``) before rendering.
+    """
+    load_member_ids(_member_id_departments(serializer, instances))
+
+
+def _member_id_departments(serializer, instances):
+    """The departments ``serializer`` shows ``members`` ids of when representing ``instances``."""
+    found = []
+    if isinstance(serializer.fields.get('members'), MemberIdsField):
+        found += instances
+    for field in serializer.fields.values():
+        many = isinstance(field, serializers.ListSerializer)
+        nested = field.child if many else field
+        if field.write_only or not isinstance(nested, serializers.BaseSerializer):
+            continue
+        related = []
+        for instance in instances:
+            try:
+                value = field.get_attribute(instance)
+            except SkipField:
+                continue
+            if value is None:
+                continue
+            if many:
+                related += value.all() if isinstance(value, models.manager.BaseManager) else value
+            else:
+                related.append(value)
+        found += _member_id_departments(nested, related)
+    return found
+
+
+class DepartmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     team_leader_name = serializers.CharField(
         source='team_leader.get_full_name', read_only=True)
     member_count = serializers.IntegerField(source='member_count_annotation', read_only=True)
-    members = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    members = MemberIdsField()
+    # Human-readable department name
+    name_display = serializers.CharField(source='get_name_display', read_only=True)
     
     class Meta:
         model = Department
         fields = ['id', 'name', 'description', 'team_leader',  'team_leader_name', 
-                 'member_count', 'created_at', 'members']
+                 'member_count', 'created_at', 'members', 'name_display']
         read_only_fields = ['created_at']
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-
-        # Convert department code to human-readable format
-        representation['name_display'] = instance.get_name_display()
-        return representation
+        list_serializer_class = MemberIdsListSerializer
+        field_sources = {
+            'team_leader_name': ['team_leader__first_name', 'team_leader__last_name'],
+            # Loaded by load_member_ids, not prefetched.
+            'members': [],
+        }
+        expandable_fields = {
+            'team_leader': 'accounts.serializers.UserSummarySerializer',
+            'members': ('accounts.serializers.UserSummarySerializer', {'many': True}),
+        }
     
     def validate_team_leader(self, value):
         """Validate that team leader has appropriate permissions."""
@@ -33,7 +109,7 @@ class DepartmentSerializer(serializers.ModelSerializer):
         return value
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     department_name = serializers.SerializerMethodField()
     # department_name = serializers.CharField(
     #     source='department.get_department_display', read_only=True)
@@ -65,6 +141,13 @@ class UserSerializer(serializers.ModelSerializer):
                  'managed_departments', 'created_at', 'updated_at', 'full_name', 'role_display']
         
         read_only_fields = ['created_at', 'updated_at', 'employee_id']
+        list_serializer_class = MemberIdsListSerializer
+        field_sources = {
+            'department_name': ['department__name'],
+            'full_name': ['first_name', 'last_name'],
+            'permissions_display': ['user_type'],
+        }
+        expandable_fields = {'department': DepartmentSerializer}
         
         extra_kwargs = {
             'password': {'write_only': True, 'required': False},
@@ -96,6 +179,57 @@ class UserSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Email address must be unique")
         return value
 
+class ChoiceDisplayField(serializers.CharField):
+    """
+    The display name of a choice field's value, from a map built once per
+    serializer rather than by ``get_FOO_display()`` on every call.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(read_only=True, **kwargs)
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        model_field = parent.Meta.model._meta.get_field(self.source)
+        self.labels = dict(model_field.flatchoices)
+
+    def to_representation(self, value):
+        return self.labels.get(value, value)
+
+
+class UserSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Compact user for lists and nested representations."""
+    # No related lists, and department names come from the cached map
+    # (accounts.caching.department_names): a page is one query on users alone.
+    full_name = serializers.CharField(source='get_full_name', read_only=True)
+    department_name = serializers.SerializerMethodField()
+    user_type_display = ChoiceDisplayField(source='user_type')
+    role_display = ChoiceDisplayField(source='role')
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'full_name',
+                  'employee_id', 'department', 'department_name', 'user_type',
+                  'user_type_display', 'role', 'role_display', 'is_verified']
+        read_only_fields = fields
+        list_serializer_class = MemberIdsListSerializer
+        field_sources = {
+            'full_name': ['first_name', 'last_name'],
+            'department_name': ['department'],
+        }
+        expandable_fields = {'department': DepartmentSerializer}
+
+    @cached_property
+    def _department_names(self):
+        # One cache read for the whole list: the child serializer is shared.
+        return department_names()
+
+    def get_department_name(self, obj):
+        if obj.department_id is None:
+            return None
+        return self._department_names.get(obj.department_id)
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     confirm_password = serializers.CharField(write_only=True, min_length=8)
@@ -128,7 +262,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for user profile updates"""
     # department_name = serializers.CharField('department.get_name_display', read_only=True)
     department_name = serializers.SerializerMethodField()
@@ -142,6 +276,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
                 'phone_number', 'profile_picture', 'department', 'username', 'department_name', 'full_name']
 
         read_only_fields = ['username', 'department']
+        field_sources = {
+            'department_name': ['department__name'],
+            'full_name': ['first_name', 'last_name'],
+        }
 
     def validate_email(self, value):
         """Ensure email uniqueness for profile updates."""
@@ -1,3 +1,278 @@
-from django.test import TestCase
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import throttling
+from core.caching import get_cache
+from core.throttling import ScopedBucketThrottle, SQLiteBucketStore
+
+from .authentication import CachedJWTAuthentication
+from .caching import forget_all_users
+from .models import Department
+
+User = get_user_model()
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                           'LOCATION': 'accounts-tests'}}
+# Hash inline, and cheaply: the tests are about what gets created.
+TEST_PERFORMANCE = {**settings.PERFORMANCE, 'PROVISION_HASH_WORKERS': 1}
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def new_user(username, **fields):
+    return {
+        'username': username, 'email': f'{username}@example.com', 'password': 'S3cure-pass-123',
+        'first_name': username.title(), 'last_name': 'Test', 'user_type': 'TECH', **fields,
+    }
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CachedJWTAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        forget_all_users()
+        self.addCleanup(forget_all_users)
+        self.user = User.objects.create_user('tech', 'tech@example.com', 'pass', user_type='TECH')
+        self.request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_resolves_the_token_user_once(self):
+        with self.assertNumQueries(1):
+            user, _ = CachedJWTAuthentication().authenticate(self.request)
+        with self.assertNumQueries(0):
+            again, _ = CachedJWTAuthentication().authenticate(self.request)
+
+        self.assertEqual(user, self.user)
+        self.assertIsNot(again, user)
+
+    def test_saving_the_user_drops_it(self):
+        CachedJWTAuthentication().authenticate(self.request)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Renamed'
+            self.user.save()
+
+        with self.assertNumQueries(1):
+            user, _ = CachedJWTAuthentication().authenticate(self.request)
+        self.assertEqual(user.first_name, 'Renamed')
+
+    def test_inactive_users_are_rejected(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = self.client.get('/api/v1/profile/', HTTP_AUTHORIZATION=self.request.META['HTTP_AUTHORIZATION'])
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DepartmentMembersTests(APITestCase):
+
+    def setUp(self):
+        self.department = Department.objects.create(name='NETWORK')
+        self.members = [
+            User.objects.create_user(f'member{i}', f'member{i}@example.com', 'pass', department=self.department)
+            for i in range(3)
+        ]
+        User.objects.create_user('outsider', 'outsider@example.com', 'pass')
+        self.client.force_authenticate(self.members[0])
+
+    def test_department_lists_member_ids(self):
+        response = self.client.get(f'/api/v1/departments/{self.department.pk}/')
+
+        self.assertCountEqual(response.data['members'], [member.pk for member in self.members])
+
+    def test_members_are_paged_by_cursor(self):
+        url = f'/api/v1/departments/{self.department.pk}/members/'
+        first = self.client.get(url, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual([user['id'] for user in first.data['results']], [m.pk for m in self.members[:2]])
+        self.assertEqual([user['id'] for user in second.data['results']], [self.members[2].pk])
+        self.assertIsNone(second.data['next'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class UserSummaryTests(APITestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.department = Department.objects.create(name='NETWORK')
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass', user_type='ADMIN')
+        User.objects.create_user(
+            'tech', 'tech@example.com', 'pass', first_name='Tess', last_name='Tech',
+            department=self.department, user_type='TECH',
+        )
+        self.client.force_authenticate(self.admin)
+
+    def test_list_returns_summaries(self):
+        response = self.client.get('/api/v1/users/', {'username': 'tech', 'search': 'tess'})
+
+        user = response.data['results'][0]
+        self.assertNotIn('managed_departments', user)
+        self.assertNotIn('phone_number', user)
+        self.assertEqual(user['full_name'], 'Tess Tech')
+        self.assertEqual(user['department_name'], 'Network')
+        self.assertEqual(user['user_type_display'], 'Technician')
+
+    def test_list_with_a_warm_cache_reads_users_only(self):
+        self.client.get('/api/v1/users/')
+        # The count and the page.
+        with self.assertNumQueries(2):
+            self.client.get('/api/v1/users/')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class UserSearchTests(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.john = User.objects.create_user(
+            'jsmith', 'john@example.com', 'pass', first_name='John', last_name='Smith'
+        )
+        User.objects.create_user('jdoe', 'jane@example.com', 'pass', first_name='Jane', last_name='Doe')
+        User.objects.create_user('msmithers', 'mary@example.com', 'pass', first_name='Mary', last_name='Smithers')
+        self.client.force_authenticate(self.admin)
+
+    def search(self, term):
+        response = self.client.get('/api/v1/users/', {'search': term})
+        return sorted(user['username'] for user in response.data['results'])
+
+    def test_every_word_matches_by_prefix(self):
+        self.assertEqual(self.search('jo sm'), ['jsmith'])
+        self.assertEqual(self.search('smith'), ['jsmith', 'msmithers'])
+        self.assertEqual(self.search('mith'), [])
+
+    def test_employee_id_is_an_exact_lookup(self):
+        self.assertEqual(self.search(str(self.john.employee_id)), ['jsmith'])
+
+    def test_index_follows_updates(self):
+        User.objects.filter(pk=self.john.pk).update(last_name='Carpenter')
+
+        self.assertEqual(self.search('carp'), ['jsmith'])
+        self.assertEqual(self.search('smith'), ['msmithers'])
+
+    def test_autocomplete_is_limited_to_active_users(self):
+        User.objects.filter(username='msmithers').update(is_active=False)
+
+        response = self.client.get('/api/v1/users/autocomplete/', {'q': 'j', 'limit': 1})
+        self.assertEqual(len(response.data), 1)
+        response = self.client.get('/api/v1/users/autocomplete/', {'q': 'smith'})
+        self.assertEqual([user['username'] for user in response.data], ['jsmith'])
+
+
+@override_settings(CACHES=TEST_CACHES, PERFORMANCE=TEST_PERFORMANCE, PASSWORD_HASHERS=FAST_HASHERS)
+class BulkUserTests(APITestCase):
+    url = '/api/v1/users/bulk/'
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.department = Department.objects.create(name='NETWORK')
+        self.client.force_authenticate(self.admin)
+
+    def test_creates_valid_rows(self):
+        response = self.client.post(self.url, {'users': [
+            new_user('alice', department=self.department.pk), new_user('bob'),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 201])
+        alice = User.objects.get(username='alice')
+        self.assertEqual(response.data['results'][0]['id'], alice.pk)
+        self.assertEqual(alice.department, self.department)
+        self.assertTrue(alice.check_password('S3cure-pass-123'))
+
+    def test_reports_invalid_rows_and_creates_the_rest(self):
+        response = self.client.post(self.url, {'users': [
+            new_user('admin'),
+            new_user('carol'),
+            new_user('carol', email='other@example.com'),
+            new_user('dave', email='carol@example.com'),
+            new_user('erin', department=999),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], [400, 201, 400, 400, 400])
+        self.assertEqual(results[0]['errors']['username'], ['Username already exists'])
+        self.assertEqual(results[2]['errors']['username'], ['Username already exists'])
+        self.assertEqual(results[3]['errors']['email'], ['Email address is already in use'])
+        self.assertIn('department', results[4]['errors'])
+        self.assertEqual(response.data['created'], 1)
+        self.assertFalse(User.objects.filter(username__in=['dave', 'erin']).exists())
+
+    def test_atomic_batch_with_an_invalid_row_creates_nothing(self):
+        response = self.client.post(self.url, {'atomic': True, 'users': [
+            new_user('frank'), new_user('admin'),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual([result['status'] for result in response.data['results']], [424, 400])
+        self.assertFalse(User.objects.filter(username='frank').exists())
+
+    def test_requires_an_admin(self):
+        tech = User.objects.create_user('tech', 'tech@example.com', 'pass', user_type='TECH')
+        self.client.force_authenticate(tech)
+
+        response = self.client.post(self.url, {'users': [new_user('grace')]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(User.objects.filter(username='grace').exists())
+
+
+@override_settings(CACHES=TEST_CACHES, PERFORMANCE=TEST_PERFORMANCE, PASSWORD_HASHERS=FAST_HASHERS)
+class ImportUsersCommandTests(APITestCase):
+
+    def import_csv(self, text, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'users.csv'
+            path.write_text(text, encoding='utf-8')
+            stdout, stderr = StringIO(), StringIO()
+            call_command('import_users', str(path), *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_imports_rows_in_batches_and_reports_failures(self):
+        User.objects.create_user('taken', 'taken@example.com', 'pass')
+        stdout, stderr = self.import_csv(
+            'username,email,password,user_type\n'
+            'heidi,heidi@example.com,S3cure-pass-123,TECH\n'
+            'taken,other@example.com,S3cure-pass-123,TECH\n'
+            'ivan,ivan@example.com,S3cure-pass-123,\n',
+            '--batch-size', '2',
+        )
+
+        self.assertIn('Created 2 users, 1 rows failed', stdout)
+        self.assertIn('row 2:', stderr)
+        self.assertTrue(User.objects.get(username='ivan').check_password('S3cure-pass-123'))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TokenThrottleTests(APITestCase):
+    url = '/api/v1/token/'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = SQLiteBucketStore(Path(directory.name) / 'throttle.sqlite3')
+        for patcher in (
+            mock.patch.object(throttling, '_store', store),
+            mock.patch.object(ScopedBucketThrottle, 'THROTTLE_RATES', {'token_obtain': '2/minute'}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_token_requests_are_throttled_per_client(self):
+        credentials = {'username': 'nobody', 'password': 'wrong'}
+        codes = [self.client.post(self.url, credentials, format='json').status_code for _ in range(3)]
+
+        self.assertEqual(codes[:2], [status.HTTP_401_UNAUTHORIZED] * 2)
+        self.assertEqual(codes[2], status.HTTP_429_TOO_MANY_REQUESTS)
@@ -1,21 +1,27 @@
-from rest_framework.renderers import JSONRenderer
 from rest_framework import viewsets, status, permissions, generics
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 from rest_framework.pagination import PageNumberPagination
 
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Prefetch
-
+from django.db.models import Count
+
+from core import audit
+from core.fieldsets import SparseFieldsViewMixin, optimize_queryset
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+from core.throttling import ScopedBucketThrottle
+from .caching import managed_departments
+from .members import MemberPagination
+from .search import UserSearchFilter, rank_users
 from .models import Department
 from .serializers import (
       DepartmentSerializer,
     UserSerializer,
+    UserSummarySerializer,
     UserCreateSerializer,
     UserProfileSerializer,
     ChangePasswordSerializer,
@@ -32,7 +38,7 @@ class StandardPagination(PageNumberPagination):
     page_size = 15
 
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
      ViewSet for viewing and editing departments.
 
@@ -41,7 +47,7 @@ class DepartmentViewSet(viewsets.ModelViewSet):
     """
 
     serializer_class = DepartmentSerializer
-    renderer_classes = [JSONRenderer]
+    renderer_classes = [FastJSONRenderer, MessagePackRenderer]
     filter_backends = [DjangoFilterBackend,SearchFilter, OrderingFilter]
     filterset_fields = ['team_leader', 'name'] # Filter by team_leader ID
     search_fields = ['name', 'description'] # Search by name and description
@@ -54,15 +60,13 @@ class DepartmentViewSet(viewsets.ModelViewSet):
     # ).order_by('name')
 
     def get_queryset(self):
-        """Optimized queryset with prefetch for better performance."""
-        return Department.objects.select_related('team_leader').prefetch_related(
-            Prefetch(
-                'members',
-                queryset=User.objects.select_related('department')
-            )
-        ).annotate(
-            member_count_annotation=Count('members')
-        )
+        """Queryset loading what the requested fields read, and nothing else."""
+        if self.action == 'members':
+            return Department.objects.only('pk')
+        queryset = self.optimize_queryset(Department.objects.all())
+        if self.field_requested('member_count'):
+            queryset = queryset.annotate(member_count_annotation=Count('members'))
+        return queryset
     
 
     def get_permissions(self):
@@ -81,15 +85,22 @@ class DepartmentViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
   
 
-    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated],
+            pagination_class=MemberPagination)
     def members(self, request, pk=None):
         """
-        Get all members of a specific department.
+        Members of a specific department, by id, paginated with `?cursor=`.
         """
         department = self.get_object()
-        members = department.members.select_related('department').all()
-        serializer = UserSerializer(members, many=True, context={'request': request})
-        return Response(serializer.data)
+        members = optimize_queryset(
+            User.objects.filter(department_id=department.pk), UserSummarySerializer,
+            **self.field_selection
+        )
+        page = self.paginate_queryset(members)
+        serializer = UserSummarySerializer(
+            page, many=True, context=self.get_serializer_context(), **self.field_selection
+        )
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_managed(self, request):
@@ -102,7 +113,7 @@ class DepartmentViewSet(viewsets.ModelViewSet):
 
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and editing users with role-based access control.
 
@@ -110,24 +121,29 @@ class UserViewSet(viewsets.ModelViewSet):
     """
 
     permission_classes = [permissions.IsAdminUser] # Only admins can manage users
-    renderer_classes = [JSONRenderer]
-    filter_backends = [DjangoFilterBackend,SearchFilter, OrderingFilter]
+    renderer_classes = [FastJSONRenderer, MessagePackRenderer]
+    filter_backends = [DjangoFilterBackend, UserSearchFilter, OrderingFilter]
     filterset_fields = ['department', 'role', 'is_verified', 'user_type'] # Filter by department, role, etc.
-    search_fields = ['username', 'email', 'employee_id', 'first_name', 'last_name'] # Search key fields
+    # What ?search= matches, answered by the accounts.search index.
+    search_fields = ['username', 'email', 'employee_id', 'first_name', 'last_name']
     ordering_fields = ['first_name', 'last_name', 'created_at']
     ordering = ['first_name', 'last_name']
     pagination_class = StandardPagination
     # queryset = User.objects.all().order_by('first_name', 'last_name')
     
     def get_queryset(self):
-        """Optimized queryset with related data."""
-        return User.objects.select_related('department').prefetch_related(
-            'managed_departments'
-        )
+        """Queryset loading what the requested fields read, and nothing else."""
+        return self.optimize_queryset(User.objects.all())
 
     def get_serializer_class(self):
         if self.action == 'create':
             return UserCreateSerializer
+        if self.action == 'bulk':
+            # Provisioning (password hashing in a process pool) loads on first use.
+            from .provisioning import ProvisionRequestSerializer
+            return ProvisionRequestSerializer
+        if self.action in ('list', 'autocomplete'):
+            return UserSummarySerializer
         return UserSerializer
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
@@ -135,12 +151,47 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         Get current user profile with optimized query.
         """
-        user = User.objects.select_related('department').prefetch_related(
-            'managed_departments'
-        ).get(pk=request.user.pk)
-        serializer = UserSerializer(user, context={'request': request})
+        user = self.optimize_queryset(User.objects.all()).get(pk=request.user.pk)
+        serializer = self.get_serializer(user)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def autocomplete(self, request):
+        """
+        Up to `?limit=` (default 10, at most 50) active users matching `?q=`
+        by word prefix, or by exact employee id, best match first.
+        """
+        term = request.query_params.get('q', '').strip()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 50))
+        except ValueError:
+            limit = 10
+        users = rank_users(
+            self.optimize_queryset(User.objects.filter(is_active=True)), term, limit
+        ) if term else []
+        serializer = self.get_serializer(users, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create many users in one request; see `accounts.provisioning` for the
+        body format.
+
+        Responds with one result per user, in order: its HTTP status and
+        either the new user's id and username or errors.
+        """
+        from .provisioning import UserProvisioner
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results, created = UserProvisioner().run(**serializer.validated_data)
+        rejected = serializer.validated_data['atomic'] and created < len(results)
+        return Response(
+            {'created': created, 'results': results},
+            status=status.HTTP_400_BAD_REQUEST if rejected else status.HTTP_200_OK
+        )
+
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def verify(self, request, pk=None):
         """
@@ -149,6 +200,7 @@ class UserViewSet(viewsets.ModelViewSet):
         user = self.get_object()
         user.is_verified = True
         user.save()
+        audit.record('user.verified', user, actor=request.user)
         return Response({'detail': 'User verified successfully'})
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
@@ -159,10 +211,11 @@ class UserViewSet(viewsets.ModelViewSet):
         user = self.get_object()
         user.is_verified = False
         user.save()
+        audit.record('user.unverified', user, actor=request.user)
         return Response({'detail': 'User unverified successfully'})
 
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(SparseFieldsViewMixin, generics.RetrieveUpdateAPIView):
     """
     View for the current user to retrieve and update their profile.
     """
@@ -171,7 +224,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         """Return the current user with optimized query."""
-        return User.objects.select_related('department').get(pk=self.request.user.pk)
+        return self.optimize_queryset(User.objects.all()).get(pk=self.request.user.pk)
 
 class ChangePasswordView(generics.UpdateAPIView):
     """
@@ -180,7 +233,8 @@ class ChangePasswordView(generics.UpdateAPIView):
     serializer_class = ChangePasswordSerializer
     model = User
     permission_classes = [permissions.IsAuthenticated]
-    throttle_classes = [UserRateThrottle]
+    throttle_classes = [ScopedBucketThrottle]
+    throttle_scope = 'password_change'
 
     def get_object(self, queryset=None):
         
@@ -197,6 +251,7 @@ class ChangePasswordView(generics.UpdateAPIView):
                                          context={'request': request})
         serializer.is_valid(raise_exception=True) # Will raise ValidationError if old_password is wrong
         serializer.save() 
+        audit.record('user.password_changed', self.object, actor=request.user)
 
         return Response(
             {"detail": "Password updated successfully"},
@@ -206,14 +261,15 @@ class ChangePasswordView(generics.UpdateAPIView):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
-    throttle_classes = [AnonRateThrottle]
+    throttle_classes = [ScopedBucketThrottle]
+    throttle_scope = 'token_obtain'
 
 
-class MyDepartmentMembersView(generics.ListAPIView):
+class MyDepartmentMembersView(SparseFieldsViewMixin, generics.ListAPIView):
     """
     View for a team leader to see all members of the departments they manage.
     """
-    serializer_class = UserSerializer
+    serializer_class = UserSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -221,24 +277,23 @@ class MyDepartmentMembersView(generics.ListAPIView):
         Return users from departments managed by the current user.
         """
         user = self.request.user
+        queryset = self.optimize_queryset(User.objects.all())
         
         # Admin users can see all users
         if user.user_type == 'ADMIN':
-            return User.objects.select_related('department').all()
+            return queryset
         
         # Team leaders can see their department members
-        return User.objects.select_related('department').filter(
-            department__team_leader=user
-        )
+        return queryset.filter(department_id__in=user.managed_department_ids)
 
     def list(self, request, *args, **kwargs):
         """Override to add department context."""
         response = super().list(request, *args, **kwargs)
         
         # Add managed departments info
-        managed_deps = request.user.managed_departments.values('id', 'name')
+        managed_deps = managed_departments(request.user.pk)
         response.data = {
-            'managed_departments': list(managed_deps),
+            'managed_departments': managed_deps,
             'members': response.data
         }
         return response
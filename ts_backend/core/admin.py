@@ -0,0 +1,36 @@
+from django.contrib import admin
+
+from .models import AuditEvent, Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Inspect the background job queue.
+    """
+    list_per_page = 50
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'dedup_key', 'locked_by']
+    readonly_fields = ['attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at']
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    """
+    Browse the audit trail; it is append-only, here as everywhere.
+    """
+    list_per_page = 50
+    list_display = ['created_at', 'action', 'actor', 'object_type', 'object_id']
+    list_filter = ['action']
+    list_select_related = ['actor', 'object_type']
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
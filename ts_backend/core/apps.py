@@ -0,0 +1,25 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def install_query_hooks(sender, connection, **kwargs):
+    """Attach the per-request query hooks to every new database connection."""
+    from .instrumentation import query_timer
+    from .querylog import analyze_query
+
+    for hook in (analyze_query, query_timer):
+        if hook not in connection.execute_wrappers:
+            connection.execute_wrappers.append(hook)
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from .lazy import defer_schema_class
+        from .sqlite import configure_connection
+
+        defer_schema_class()
+        connection_created.connect(install_query_hooks, dispatch_uid='core.install_query_hooks')
+        connection_created.connect(configure_connection, dispatch_uid='core.configure_sqlite')
@@ -0,0 +1,156 @@
+"""
+Helpers for the async (ASGI) read endpoints.
+
+DRF views are synchronous, so the async endpoints are plain Django async
+views. These helpers give them the same authentication, filtering and page
+format as their DRF counterparts so clients cannot tell them apart.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import HttpResponse
+from django.urls import resolve
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .encoding import json_dumps, msgpack_dumps
+from .instrumentation import phase
+from .renderers import MSGPACK_MEDIA_TYPE
+
+def json_response(data, status=200):
+    with phase('render'):
+        return HttpResponse(json_dumps(data), status=status, content_type='application/json')
+
+
+def api_response(request, data, status=200):
+    """
+    ``data`` as JSON, or as MessagePack when the client asks for it with
+    ``Accept`` or ``?format=msgpack``, like the DRF renderers.
+    """
+    if request.GET.get('format') == 'msgpack' or request.get_preferred_type(
+        ('application/json', MSGPACK_MEDIA_TYPE)
+    ) == MSGPACK_MEDIA_TYPE:
+        with phase('render'):
+            return HttpResponse(msgpack_dumps(data), status=status, content_type=MSGPACK_MEDIA_TYPE)
+    return json_response(data, status)
+
+
+def drf_request(request):
+    """``request`` wrapped for the DRF views' authentication classes."""
+    return Request(
+        request, authenticators=[auth() for auth in drf_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+
+
+async def authenticate(request):
+    """
+    The active user the DRF ``request`` authenticates as, or ``None``, with
+    the classes of ``DEFAULT_AUTHENTICATION_CLASSES`` (JWT, session, basic)
+    like the sync views. Raises ``AuthenticationFailed`` for credentials
+    that are given but invalid.
+    """
+    # Session and user lookups, and basic auth's password check, are sync.
+    user = await sync_to_async(lambda: request.user)()
+    return user if user.is_authenticated else None
+
+
+def unauthenticated_response(request, exc):
+    """What DRF answers ``exc`` with: 401 with the first class's challenge, else 403."""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    header = request.authenticators[0].authenticate_header(request) if request.authenticators else None
+    response = json_response(data, 401 if header else 403)
+    if header:
+        response['WWW-Authenticate'] = header
+    return response
+
+
+def async_read_view(view):
+    """
+    Serve GET/HEAD with the async ``view`` and hand every other method to the
+    DRF view registered for the same path in ``settings.ROOT_URLCONF``.
+
+    The async views replace DRF routes path-for-path, so writes to the same
+    URL (``POST /entries/``) must still reach the viewset.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await view(request, *args, **kwargs)
+        match = resolve(request.path_info, urlconf=settings.ROOT_URLCONF)
+        return await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+    # DRF views are CSRF exempt and enforce CSRF for session auth themselves.
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def authentication_required(view):
+    """
+    Authenticate an async view like the DRF views, with ``IsAuthenticated``:
+    the same credentials are accepted, and rejected with the same responses.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        wrapped = drf_request(request)
+        with phase('auth'):
+            try:
+                user = await authenticate(wrapped)
+            except AuthenticationFailed as exc:
+                return unauthenticated_response(wrapped, exc)
+        if user is None:
+            return unauthenticated_response(wrapped, NotAuthenticated())
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def filter_queryset(viewset_class, request, queryset, action='list'):
+    """
+    Apply the filter backends of the matching DRF viewset.
+
+    Run in a worker thread because django-filter validates model choices
+    (e.g. ``?category=3``) with a query of its own.
+    """
+    def apply():
+        view = viewset_class(request=Request(request), action=action, format_kwarg=None)
+        qs = queryset
+        for backend in view.filter_backends:
+            qs = backend().filter_queryset(view.request, qs, view)
+        return qs
+    return await sync_to_async(apply)()
+
+
+async def paginate(request, queryset, page_size=None):
+    """
+    Fetch one page of ``queryset`` asynchronously.
+
+    Returns ``(objects, envelope)`` where ``envelope`` is the
+    ``PageNumberPagination`` response body without ``results``.
+    Raises ``InvalidPage`` for pages out of range.
+    """
+    page_size = page_size or drf_settings.PAGE_SIZE
+    count = await queryset.acount()
+    paginator = Paginator(range(count), page_size)
+    number = paginator.validate_number(request.GET.get('page', 1))
+    start = (number - 1) * page_size
+    objects = [
+        obj async for obj in queryset[start:start + page_size].aiterator(chunk_size=page_size)
+    ]
+
+    url = request.build_absolute_uri()
+    next_url = previous_url = None
+    if number < paginator.num_pages:
+        next_url = replace_query_param(url, 'page', number + 1)
+    if number > 1:
+        previous_url = (
+            remove_query_param(url, 'page') if number == 2
+            else replace_query_param(url, 'page', number - 1)
+        )
+    return objects, {'count': count, 'next': next_url, 'previous': previous_url}
+
+
+def invalid_page(request):
+    return api_response(request, {'detail': 'Invalid page.'}, 404)
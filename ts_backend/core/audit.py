@@ -0,0 +1,192 @@
+"""
+Append-only audit trail: who changed what, and when.
+
+``record``, ``record_many`` and ``record_each`` don't write anything. The events they are given
+join a per-process ring buffer once the transaction around the call commits
+(straight away outside one), so an event is kept only for a change that was,
+and a rolled back request leaves none. A daemon thread drains the buffer with
+one ``bulk_create`` per ``AUDIT_BATCH_SIZE`` events: whenever that many are
+waiting, and at least every ``AUDIT_FLUSH_INTERVAL`` seconds. The request
+path pays for neither an ``INSERT`` nor a query; even the content types are
+resolved at flush time. What is left is flushed when the process exits.
+
+The buffer holds at most ``AUDIT_BUFFER_SIZE`` events. If the database
+refuses a flush the events are put back and retried on the next one; should
+the buffer overflow meanwhile, the oldest events are dropped, and counted in
+the log.
+
+The table is ``core.AuditEvent``. Every lookup the query API
+(``GET /api/v1/audit/events/``) offers, by actor, by object, or neither,
+is a range of an index ending in ``(created_at, id)``, newest first. There are
+no declarative partitions to drop on SQLite; ``manage.py prune_audit`` deletes
+the events older than a cut-off by the same time index instead.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .conf import perf_setting
+
+logger = logging.getLogger('core.audit')
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = None
+_pid = None
+_dropped = 0
+
+
+def record(action, target=None, actor=None, **data):
+    """
+    Log ``action`` (``'user.verified'``) by ``actor`` on the model instance
+    ``target``, with the JSON-serializable ``data``.
+    """
+    if target is None:
+        record_many(action, None, (), actor, data)
+    else:
+        record_many(action, type(target), [target.pk], actor, data)
+
+
+def record_many(action, model, ids, actor=None, data=None):
+    """
+    Log ``action`` once for each of the ``ids`` of ``model`` instances, or
+    once with no object if ``model`` is ``None``; ``data`` is shared by all.
+    """
+    if model is None:
+        _defer(action, actor, None, [(None, data or {})])
+    else:
+        data = data or {}
+        _defer(action, actor, model, [(object_id, data) for object_id in ids])
+
+
+def record_each(action, model, changes, actor=None):
+    """Log ``action`` on each ``model`` instance of ``changes``, ``{pk: data}``."""
+    _defer(action, actor, model, list(changes.items()))
+
+
+def _defer(action, actor, model, targets):
+    if not targets:
+        return
+    now = timezone.now()
+    actor_id = getattr(actor, 'pk', actor)
+    label = model._meta.label_lower if model is not None else None
+    events = [(now, action, actor_id, label, object_id, data) for object_id, data in targets]
+    transaction.on_commit(lambda: _append(events))
+
+
+def _append(events):
+    global _dropped
+    _start()
+    with _buffer_lock:
+        overflow = len(_buffer) + len(events) - _buffer.maxlen
+        if overflow > 0:
+            _dropped += overflow
+        _buffer.extend(events)
+        waiting = len(_buffer)
+    if waiting >= perf_setting('AUDIT_BATCH_SIZE'):
+        _wake.set()
+
+
+def _start():
+    """Start this process's buffer and flusher, once, after any fork."""
+    global _buffer, _flusher, _pid
+    if _pid == os.getpid():
+        return
+    with _buffer_lock:
+        if _pid == os.getpid():
+            return
+        # A forked child inherits the parent's buffer but not its thread;
+        # those events are the parent's to write.
+        _buffer = deque(maxlen=perf_setting('AUDIT_BUFFER_SIZE'))
+        _flusher = threading.Thread(target=_run, name='audit-flusher', daemon=True)
+        _flusher.start()
+        _pid = os.getpid()
+    atexit.register(flush)
+
+
+def _run():
+    interval = perf_setting('AUDIT_FLUSH_INTERVAL')
+    while True:
+        _wake.wait(interval)
+        _wake.clear()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Audit flush failed')
+        finally:
+            # The thread's own connection; don't hold it between flushes.
+            connection.close()
+
+
+def _take():
+    with _buffer_lock:
+        events = list(_buffer)
+        _buffer.clear()
+        return events
+
+
+def flush():
+    """Write every buffered event now; returns how many were written."""
+    global _dropped
+    if _buffer is None or _pid != os.getpid():
+        return 0
+    with _flush_lock:
+        written = 0
+        size = perf_setting('AUDIT_BATCH_SIZE')
+        while events := _take():
+            try:
+                _write(events, size)
+            except DatabaseError:
+                logger.exception('Writing %d audit events failed; kept for the next flush', len(events))
+                with _buffer_lock:
+                    pending = events + list(_buffer)
+                    _buffer.clear()
+                    _buffer.extend(pending)
+                    _dropped += max(0, len(pending) - _buffer.maxlen)
+                break
+            written += len(events)
+        with _buffer_lock:
+            dropped, _dropped = _dropped, 0
+        if dropped:
+            logger.error('Audit buffer overflowed: %d events dropped', dropped)
+    return written
+
+
+def _write(events, batch_size):
+    from django.apps import apps
+    from django.contrib.contenttypes.models import ContentType
+
+    from .models import AuditEvent
+
+    labels = {label for _, _, _, label, _, _ in events if label}
+    types = ContentType.objects.get_for_models(*(apps.get_model(label) for label in labels))
+    type_ids = {model._meta.label_lower: content_type.pk for model, content_type in types.items()}
+    AuditEvent.objects.bulk_create([
+        AuditEvent(
+            created_at=created_at, action=action, actor_id=actor_id,
+            object_type_id=type_ids.get(label), object_id=object_id, data=data,
+        )
+        for created_at, action, actor_id, label, object_id, data in events
+    ], batch_size=batch_size)
+
+
+def events(actor=None, object_type=None, object_id=None, action=None, since=None, until=None):
+    """
+    The events matching every filter given, newest first: by ``actor`` (a
+    user id), by ``object_type`` (a ``ContentType``) and ``object_id``, by
+    ``action``, from ``since`` and before ``until``.
+    """
+    from .models import AuditEvent
+
+    filters = {
+        'actor_id': actor, 'object_type': object_type, 'object_id': object_id,
+        'action': action, 'created_at__gte': since, 'created_at__lt': until,
+    }
+    return AuditEvent.objects.filter(**{key: value for key, value in filters.items() if value is not None})
@@ -0,0 +1,225 @@
+"""
+Concurrency benchmark: the WSGI application on a thread pool versus the ASGI
+application on one event loop.
+
+Both applications are driven in-process (no HTTP server or sockets), so the
+numbers compare the request handling paths themselves: DRF views on worker
+threads for WSGI, the async read views for ASGI.
+
+``hold_streams`` measures the other side of ASGI: how much an idle event
+stream costs and how quickly one event fans out to all of them.
+"""
+import asyncio
+import io
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from ..pubsub import get_broker
+from .runner import _percentile
+
+
+def _split(path):
+    parts = urlsplit(path)
+    return parts.path, parts.query
+
+
+def wsgi_call(app, path, headers, method='GET', body=b''):
+    """Send one request (a JSON ``body``, if any) to a WSGI application and return the status code."""
+    path_info, query = _split(path)
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'wsgi.version': (1, 0),
+    }
+    for name, value in headers.items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+    status = []
+    body = app(environ, lambda s, h, exc_info=None: status.append(int(s.split()[0])))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return status[0]
+
+
+def _asgi_scope(path, headers):
+    path_info, query = _split(path)
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path_info,
+        'raw_path': path_info.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver')] + [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+
+
+async def asgi_call(app, path, headers):
+    """Send one GET to an ASGI application and return the status code."""
+    scope = _asgi_scope(path, headers)
+    done = asyncio.Event()
+    sent_request = False
+    status = []
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return status[0]
+
+
+def _summary(latencies, elapsed, errors):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 50), 3),
+        'p90_ms': round(_percentile(latencies, 90), 3),
+        'p99_ms': round(_percentile(latencies, 99), 3),
+    }
+
+
+def run_wsgi(app, path, headers, concurrency, total):
+    def one(_):
+        start = time.perf_counter()
+        status = wsgi_call(app, path, headers)
+        return (time.perf_counter() - start) * 1000, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    return _summary([r[0] for r in results], elapsed, sum(r[1] >= 400 for r in results))
+
+
+def run_asgi(app, path, headers, concurrency, total):
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with slots:
+                start = time.perf_counter()
+                status = await asgi_call(app, path, headers)
+                return (time.perf_counter() - start) * 1000, status
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(total)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(main())
+    return _summary([r[0] for r in results], elapsed, sum(r[1] >= 400 for r in results))
+
+
+class _Stream:
+    """An ASGI client that keeps a streaming GET open until ``close()``."""
+
+    def __init__(self, app, path, headers):
+        self.scope = _asgi_scope(path, headers)
+        self.app = app
+        self.status = None
+        self.events = 0
+        self.received = asyncio.Event()
+        self._closed = asyncio.Event()
+        self._sent_request = False
+        self.task = asyncio.ensure_future(app(self.scope, self.receive, self.send))
+
+    async def receive(self):
+        if not self._sent_request:
+            self._sent_request = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self._closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message['type'] == 'http.response.body':
+            if b'\nevent: ' in message.get('body', b''):
+                self.events += 1
+                self.received.set()
+            if not message.get('more_body'):
+                self._closed.set()
+
+    async def close(self):
+        self._closed.set()
+        try:
+            await asyncio.wait_for(self.task, 5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.task.cancel()
+
+
+def hold_streams(app, path, headers, channel, count):
+    """
+    Open ``count`` event streams on ``path``, publish one event to
+    ``channel`` and time its delivery to every stream.
+    """
+    broker = get_broker()
+
+    async def main():
+        before = broker.subscriber_count(channel)
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        streams = [_Stream(app, path, headers) for _ in range(count)]
+        while broker.subscriber_count(channel) - before < count:
+            if any(stream.task.done() for stream in streams):
+                raise RuntimeError(f'A stream on {path} ended early (status {streams[0].status}).')
+            await asyncio.sleep(0.01)
+        opened = time.perf_counter() - start
+        held = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        broker.publish(channel, {'type': 'benchmark', 'data': {}})
+        await asyncio.gather(*(stream.received.wait() for stream in streams))
+        fanout = time.perf_counter() - start
+
+        await asyncio.gather(*(stream.close() for stream in streams))
+        return {
+            'streams': count,
+            'open_s': round(opened, 3),
+            'bytes_per_stream': held // count,
+            'fanout_ms': round(fanout * 1000, 3),
+            'leaked_subscriptions': broker.subscriber_count(channel) - before,
+        }
+
+    return asyncio.run(main())
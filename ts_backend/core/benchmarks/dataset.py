@@ -0,0 +1,200 @@
+"""
+Deterministic dataset used by the benchmark suite.
+
+Everything is inserted with ``bulk_create`` so that building a few thousand
+rows takes seconds, and the same ``seed`` always yields the same shape of data.
+"""
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from faker import Faker
+
+from .. import audit
+from ..caching import get_cache
+
+from accounts.caching import forget_all_users
+from accounts.models import Department
+from troubleshoots.models import Category, Tag, TroubleshootingEntry, Vote, Comment
+
+User = get_user_model()
+
+BENCH_PASSWORD = 'benchPass123'
+BENCH_ADMIN = 'bench_admin'
+BENCH_LEADER = 'bench_leader'
+
+SCALES = {
+    'small': {'users': 60, 'categories': 6, 'tags': 20, 'entries': 150, 'votes': 4, 'comments': 3},
+    'medium': {'users': 250, 'categories': 12, 'tags': 60, 'entries': 800, 'votes': 8, 'comments': 5},
+    'large': {'users': 1000, 'categories': 20, 'tags': 150, 'entries': 4000, 'votes': 12, 'comments': 8},
+}
+
+
+@contextmanager
+def benchmark_database(scale='small', seed=1234):
+    """
+    Create throwaway test databases, fill them, and yield the fixtures.
+
+    The real development database is never touched.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        fixtures = build_dataset(scale, seed)
+        # Bulk inserts send no signals: values cached from an earlier
+        # database, users under the same ids among them, would be served.
+        get_cache().clear()
+        forget_all_users()
+        yield fixtures
+    finally:
+        # Into the throwaway database, not the real one at exit.
+        audit.flush()
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+@transaction.atomic
+def build_dataset(scale='small', seed=1234):
+    """Populate the current database and return a dict of handy fixtures."""
+    sizes = SCALES[scale]
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    password = make_password(BENCH_PASSWORD)
+
+    departments = Department.objects.bulk_create([
+        Department(name=code, description=fake.catch_phrase())
+        for code, _ in Department.DEPARTMENTS
+    ])
+
+    admin = User(
+        username=BENCH_ADMIN, email='bench_admin@local.test', password=password,
+        first_name='Bench', last_name='Admin', user_type='ADMIN',
+        is_superuser=True, is_staff=True, department=departments[0],
+    )
+    leader = User(
+        username=BENCH_LEADER, email='bench_leader@local.test', password=password,
+        first_name='Bench', last_name='Leader', user_type='SENIOR_TECH',
+        department=departments[1],
+    )
+    users = [admin, leader] + [
+        User(
+            username=f'user{i}',
+            email=f'user{i}@local.test',
+            password=password,
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            user_type=rng.choice(['TECH', 'JUNIOR_TECH', 'SENIOR_TECH', 'VIEWER']),
+            role=rng.choice([code for code, _ in User.ROLE_CHOICES]),
+            department=rng.choice(departments),
+        )
+        for i in range(sizes['users'])
+    ]
+    users = User.objects.bulk_create(users)
+
+    for department in departments:
+        department.team_leader = leader if department == departments[1] else rng.choice(users[2:])
+    Department.objects.bulk_update(departments, ['team_leader'])
+
+    parents = Category.objects.bulk_create([
+        Category(name=f'Category {i}', slug=f'category-{i}', order=i)
+        for i in range(sizes['categories'])
+    ])
+    children = Category.objects.bulk_create([
+        Category(name=f'Category {parent.order}.{j}', slug=f'category-{parent.order}-{j}',
+                 parent=parent, order=j)
+        for parent in parents for j in range(2)
+    ])
+    categories = parents + children
+
+    tags = Tag.objects.bulk_create([
+        Tag(name=f'tag-{i}', slug=f'tag-{i}', is_featured=i % 10 == 0)
+        for i in range(sizes['tags'])
+    ])
+
+    priorities = [code for code, _ in TroubleshootingEntry.PRIORITY_CHOICES]
+    statuses = ['PUBLISHED'] * 6 + ['PENDING_REVIEW', 'DRAFT', 'ARCHIVED']
+    entries = []
+    for i in range(sizes['entries']):
+        priority = rng.choice(priorities)
+        entries.append(TroubleshootingEntry(
+            title=fake.sentence(nb_words=6),
+            slug=f'entry-{i}',
+            problem_description=fake.paragraph(nb_sentences=6),
+            solution=fake.paragraph(nb_sentences=8),
+            error_messages=fake.sentence(),
+            category=rng.choice(categories),
+            author=rng.choice(users),
+            priority=priority,
+            priority_rank=TroubleshootingEntry.PRIORITY_RANKS[priority],
+            status=rng.choice(statuses),
+            estimated_time=rng.randint(5, 240),
+        ))
+    entries = TroubleshootingEntry.objects.bulk_create(entries)
+
+    Through = TroubleshootingEntry.tags.through
+    Through.objects.bulk_create([
+        Through(troubleshootingentry_id=entry.pk, tag_id=tag.pk)
+        for entry in entries for tag in rng.sample(tags, 3)
+    ])
+
+    votes = []
+    for entry in entries:
+        for voter in rng.sample(users, sizes['votes']):
+            votes.append(Vote(
+                troubleshooting_entry=entry, user=voter,
+                vote_type='UP' if rng.random() < 0.8 else 'DOWN',
+            ))
+    Vote.objects.bulk_create(votes)
+    upvotes = {}
+    for vote in votes:
+        if vote.vote_type == 'UP':
+            upvotes[vote.troubleshooting_entry_id] = upvotes.get(vote.troubleshooting_entry_id, 0) + 1
+    for entry in entries:
+        entry.upvotes_count = upvotes.get(entry.pk, 0)
+    TroubleshootingEntry.objects.bulk_update(entries, ['upvotes_count'], batch_size=500)
+
+    top_level = Comment.objects.bulk_create([
+        Comment(troubleshooting_entry=entry, author=rng.choice(users),
+                content=fake.sentence(), is_solution=rng.random() < 0.1)
+        for entry in entries for _ in range(sizes['comments'])
+    ])
+    Comment.objects.bulk_create([
+        Comment(troubleshooting_entry_id=parent.troubleshooting_entry_id, parent=parent,
+                author=rng.choice(users), content=fake.sentence())
+        for parent in top_level for _ in range(rng.randint(0, 2))
+    ])
+
+    # One busy, deeply nested thread for the comment thread endpoints.
+    busy = entries[0]
+    level = thread_root = Comment.objects.bulk_create([
+        Comment(troubleshooting_entry=busy, author=rng.choice(users),
+                content=fake.sentence(), is_solution=rng.random() < 0.1)
+        for _ in range(60)
+    ])
+    for _ in range(4):
+        level = Comment.objects.bulk_create([
+            Comment(troubleshooting_entry=busy, parent=parent,
+                    author=rng.choice(users), content=fake.sentence())
+            for parent in level[:25] for _ in range(rng.randint(1, 4))
+        ])
+
+    return {
+        'admin': admin,
+        'leader': leader,
+        'user': users[2],
+        'entry': entries[0],
+        'entry_ids': [entry.pk for entry in entries[:50]],
+        'thread_comment': thread_root[0],
+        'departments': departments,
+        'search_term': entries[0].title.split()[0],
+        'pending_ids': [entry.pk for entry in entries if entry.status == 'PENDING_REVIEW'],
+    }
@@ -0,0 +1,71 @@
+"""
+Encoding benchmark for the response renderers and request parsers.
+
+Payloads are real API responses: the department, user and entry lists are
+fetched through the API once, following ``next`` links until ``rows``
+results are collected, so the data has the shape and types the serializers
+produce. Each payload is then rendered and parsed back with DRF's JSON
+renderer/parser, the fast JSON ones and MessagePack, outside of any request.
+"""
+import gzip
+import io
+import time
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from ..parsers import FastJSONParser, MessagePackParser
+from ..renderers import FastJSONRenderer, MessagePackRenderer
+from .runner import _client_for, _percentile
+
+FORMATS = {
+    'drf-json': (JSONRenderer, JSONParser),
+    'fast-json': (FastJSONRenderer, FastJSONParser),
+    'msgpack': (MessagePackRenderer, MessagePackParser),
+}
+
+
+def default_payloads(fixtures):
+    """``name: (path, user)`` of the list endpoints to collect payloads from."""
+    return {
+        'department-list': ('/api/v1/departments/', fixtures['user']),
+        'user-list': ('/api/v1/users/', fixtures['admin']),
+        'entry-list': ('/api/v1/entries/', fixtures['user']),
+    }
+
+
+def collect(path, user, rows):
+    """Up to ``rows`` results of a paginated list endpoint, as one page body."""
+    client = _client_for(user)
+    results = []
+    while path and len(results) < rows:
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {path} returned {response.status_code}')
+        results.extend(response.data['results'])
+        path = response.data['next']
+    return {'count': len(results[:rows]), 'next': None, 'previous': None, 'results': results[:rows]}
+
+
+def _time_us(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return round(_percentile(timings, 50), 1)
+
+
+def measure(data, iterations=200):
+    """Size and median encode/decode time of ``data`` in every format."""
+    results = {}
+    for name, (renderer_class, parser_class) in FORMATS.items():
+        renderer, parser = renderer_class(), parser_class()
+        content = renderer.render(data, renderer_class.media_type)
+        results[name] = {
+            'bytes': len(content),
+            'gzip_bytes': len(gzip.compress(content, compresslevel=6)),
+            'encode_us': _time_us(lambda: renderer.render(data, renderer_class.media_type), iterations),
+            'decode_us': _time_us(lambda: parser.parse(io.BytesIO(content)), iterations),
+        }
+    return results
@@ -0,0 +1,137 @@
+"""
+Mixed read/write load on an SQLite file, with and without the production profile.
+
+Writer threads cast votes and post comments while reader threads fetch entry
+details, all through the WSGI application, for a fixed time. The database is
+a real file (an in-memory database has no journal to tune), created afresh
+for each profile:
+
+* ``default``: SQLite's own settings, a new connection per request and
+  deferred transactions, which is what ``settings.py`` used to configure;
+* ``tuned``: ``CONN_MAX_AGE``, ``OPTIONS`` and ``SQLITE_PRAGMAS`` as the
+  project settings configure them (see ``core.sqlite``).
+"""
+import copy
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+
+from ..conf import perf_setting
+from .concurrency import wsgi_call
+from .runner import _percentile
+
+PROFILES = ('default', 'tuned')
+
+
+@contextmanager
+def sqlite_profile(profile, path):
+    """Point the test database at the file ``path`` and configure it as ``profile``."""
+    db = connections.settings[DEFAULT_DB_ALIAS]
+    if db['ENGINE'] != 'django.db.backends.sqlite3':
+        raise ValueError('The default database is not SQLite.')
+    saved = copy.deepcopy({key: db[key] for key in ('CONN_MAX_AGE', 'OPTIONS', 'TEST')})
+    db['TEST'] = {**db['TEST'], 'NAME': str(path)}
+    pragmas = perf_setting('SQLITE_PRAGMAS')
+    if profile == 'default':
+        db['CONN_MAX_AGE'] = 0
+        db['OPTIONS'] = {}
+        pragmas = {}
+    performance = {**getattr(settings, 'PERFORMANCE', {}), 'SQLITE_PRAGMAS': pragmas}
+    try:
+        # DEBUG off, so failed requests render the short error page.
+        with override_settings(PERFORMANCE=performance, DEBUG=False):
+            yield
+    finally:
+        connections.close_all()
+        db.update(saved)
+
+
+def run_mixed(app, entry_ids, reader_headers, writer_headers, readers, duration, seed=1234):
+    """
+    Run ``readers`` reader threads and one writer thread per entry of
+    ``writer_headers`` for ``duration`` seconds; return throughput and latency
+    of each side as a JSON-ready dict.
+    """
+    stop = threading.Event()
+    samples = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+
+    def read(worker):
+        rng = random.Random(seed + worker)
+        while not stop.is_set():
+            path = f'/api/v1/entries/{rng.choice(entry_ids)}/'
+            record('read', lambda: wsgi_call(app, path, reader_headers))
+
+    def write(worker):
+        rng = random.Random(-seed - worker)
+        headers = writer_headers[worker]
+        count = 0
+        while not stop.is_set():
+            entry_id = rng.choice(entry_ids)
+            if count % 2:
+                path, data = '/api/v1/comments/', {
+                    'troubleshooting_entry': entry_id, 'content': f'Load test comment {count}',
+                }
+            else:
+                path, data = f'/api/v1/entries/{entry_id}/vote/', {
+                    'vote_type': rng.choice(('UP', 'DOWN')),
+                }
+            body = json.dumps(data).encode()
+            record('write', lambda: wsgi_call(app, path, headers, 'POST', body))
+            count += 1
+
+    def record(kind, call):
+        started = time.perf_counter()
+        status = call()
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            if status >= 400:
+                errors[kind] += 1
+            else:
+                samples[kind].append(elapsed)
+
+    def worker(target, index):
+        try:
+            target(index)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(read, i)) for i in range(readers)] + [
+        threading.Thread(target=worker, args=(write, i)) for i in range(len(writer_headers))
+    ]
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    # Lock errors are counted, not logged with a traceback each.
+    request_logger.setLevel(logging.CRITICAL)
+    try:
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        request_logger.setLevel(level)
+
+    return {kind: _summary(samples[kind], errors[kind], elapsed) for kind in samples}
+
+
+def _summary(latencies, errors, elapsed):
+    return {
+        'ok': len(latencies),
+        'errors': errors,
+        'per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 50), 3) if latencies else None,
+        'p90_ms': round(_percentile(latencies, 90), 3) if latencies else None,
+        'p99_ms': round(_percentile(latencies, 99), 3) if latencies else None,
+    }
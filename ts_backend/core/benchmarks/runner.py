@@ -0,0 +1,251 @@
+"""
+Endpoint benchmark runner.
+
+Every scenario is a single HTTP request sent through DRF's ``APIClient`` with a
+real JWT, so authentication, permissions, serialization and rendering are all
+part of the measurement. For each scenario we record wall time percentiles,
+the number of SQL queries and the peak Python memory allocated by one request.
+"""
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.caching import forget_all_users, get_user
+
+from ..throttling import get_store
+from .dataset import BENCH_PASSWORD
+
+
+class Scenario:
+    """A named request to benchmark."""
+
+    def __init__(self, name, method, path, user=None, data=None, iterations=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.user = user
+        self.data = data
+        self.iterations = iterations
+
+    def payload(self, iteration):
+        return self.data(iteration) if callable(self.data) else self.data
+
+
+def default_scenarios(fixtures):
+    """The endpoints covered by ``manage.py bench``."""
+    admin = fixtures['admin']
+    user = fixtures['user']
+    entry = fixtures['entry']
+    return [
+        Scenario('department-list', 'get', '/api/v1/departments/', user),
+        Scenario('user-list', 'get', '/api/v1/users/', admin),
+        Scenario('user-me', 'get', '/api/v1/users/me/', user),
+        Scenario('token-obtain', 'post', '/api/v1/token/', None,
+                 {'username': user.username, 'password': BENCH_PASSWORD}, iterations=5),
+        Scenario('entry-list', 'get', '/api/v1/entries/', user),
+        Scenario('entry-list-sparse', 'get',
+                 '/api/v1/entries/?fields=id,title,upvotes_count,comments_count', user),
+        Scenario('entry-detail', 'get', f'/api/v1/entries/{entry.pk}/', user),
+        Scenario('entry-search', 'get', f"/api/v1/entries/?search={fixtures['search_term']}", user),
+        Scenario('entry-comments', 'get', f'/api/v1/entries/{entry.pk}/comments/', user),
+        Scenario('comment-replies', 'get',
+                 f"/api/v1/comments/{fixtures['thread_comment'].pk}/replies/?depth=3", user),
+        Scenario('entry-vote', 'post', f'/api/v1/entries/{entry.pk}/vote/', user,
+                 lambda i: {'vote_type': 'UP' if i % 2 else 'DOWN'}),
+        Scenario('comment-create', 'post', '/api/v1/comments/', user,
+                 lambda i: {'troubleshooting_entry': entry.pk, 'content': f'Benchmark comment {i}'}),
+        Scenario('batch-write', 'post', '/api/v1/batch/', user,
+                 lambda i: {'operations': batch_operations(fixtures['entry_ids'], i)}),
+        Scenario('review-queue', 'get', '/api/v1/entries/review-queue/', admin),
+        Scenario('review-bulk', 'post', '/api/v1/entries/review/', admin,
+                 {'ids': fixtures['pending_ids'], 'action': 'publish'}, iterations=5),
+    ]
+
+
+def batch_operations(entry_ids, iteration):
+    """A vote on and a comment to every entry in ``entry_ids``."""
+    vote_type = 'UP' if iteration % 2 else 'DOWN'
+    return [
+        {'op': 'create', 'type': 'vote', 'data': {'troubleshooting_entry': pk, 'vote_type': vote_type}}
+        for pk in entry_ids
+    ] + [
+        {'op': 'create', 'type': 'comment',
+         'data': {'troubleshooting_entry': pk, 'content': f'Batch comment {iteration}'}}
+        for pk in entry_ids
+    ]
+
+
+def _client_for(user):
+    client = APIClient()
+    if user is not None:
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def _reset(scenario):
+    """
+    Put the process back in the same state before each call, outside what
+    is measured. Empty throttle buckets would reject repeated calls, and a
+    warm cache would serve them. The caller's user stays loaded, as it is
+    between a client's requests: left to the per-process LRU's expiry, it
+    would be loaded by some calls of a run and not others.
+    """
+    cache.clear()
+    get_store().clear()
+    forget_all_users()
+    if scenario.user is not None:
+        get_user(scenario.user.pk)
+
+
+def _send(client, scenario, iteration):
+    response = getattr(client, scenario.method)(
+        scenario.path, scenario.payload(iteration), format='json'
+    )
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f'{scenario.name}: {scenario.method.upper()} {scenario.path} '
+            f'returned {response.status_code}: {response.content[:200]!r}'
+        )
+    return response
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_scenario(scenario, iterations=20, warmup=2):
+    """Run one scenario and return its measurements as a JSON-ready dict."""
+    client = _client_for(scenario.user)
+    iterations = scenario.iterations or iterations
+    # A full collection walks the whole heap, dataset included, and took
+    # 50-80ms in whichever call it fell; what exists now never needs one.
+    gc.freeze()
+    for i in range(warmup):
+        _reset(scenario)
+        _send(client, scenario, i)
+
+    timings = []
+    queries = 0
+    for i in range(iterations):
+        _reset(scenario)
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = _send(client, scenario, warmup + i)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = max(queries, len(ctx.captured_queries))
+
+    # Measured separately: tracemalloc slows every allocation down.
+    _reset(scenario)
+    tracemalloc.start()
+    try:
+        _send(client, scenario, warmup + iterations)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'method': scenario.method.upper(),
+        'path': scenario.path,
+        'status': response.status_code,
+        'iterations': iterations,
+        'p50_ms': round(_percentile(timings, 50), 3),
+        'p90_ms': round(_percentile(timings, 90), 3),
+        'p99_ms': round(_percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': queries,
+        'peak_kib': round(peak / 1024, 1),
+        'response_bytes': len(response.content),
+    }
+
+
+def run_all(scenarios, iterations=20, warmup=2):
+    return {scenario.name: run_scenario(scenario, iterations, warmup) for scenario in scenarios}
+
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def save(path, data):
+    with open(path, 'w') as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+
+
+def check_budgets(results, baseline, tolerance=0.25, slack_ms=5.0):
+    """
+    Compare results against stored budgets.
+
+    Returns a list of human-readable failures. An endpoint fails when it runs
+    more queries than its budget, or when its p90 latency is more than
+    ``tolerance`` plus ``slack_ms`` above the stored baseline. The absolute
+    slack keeps scheduler jitter from failing endpoints that take a few ms.
+    """
+    failures = []
+    for name, budget in baseline.get('endpoints', {}).items():
+        result = results.get(name)
+        if result is None:
+            continue
+        if result['queries'] > budget['max_queries']:
+            failures.append(
+                f"{name}: {result['queries']} queries exceeds budget of {budget['max_queries']}"
+            )
+        limit = budget['p90_ms'] * (1 + tolerance) + slack_ms
+        if result['p90_ms'] > limit:
+            failures.append(
+                f"{name}: p90 {result['p90_ms']:.1f}ms exceeds baseline "
+                f"{budget['p90_ms']:.1f}ms (+{tolerance:.0%}, +{slack_ms:g}ms)"
+            )
+    return failures
+
+
+def update_baseline(path, sections):
+    """Replace ``sections`` of the budget file at ``path``, keeping the others."""
+    try:
+        baseline = load(path)
+    except FileNotFoundError:
+        baseline = {}
+    baseline.update(sections)
+    save(path, baseline)
+
+
+def make_baseline(results):
+    return {
+        'endpoints': {
+            name: {'max_queries': result['queries'], 'p90_ms': result['p90_ms']}
+            for name, result in sorted(results.items())
+        }
+    }
+
+
+def compare(previous, current):
+    """Yield one formatted line per endpoint showing the change between two runs."""
+    def delta(old, new):
+        if not old:
+            return '   n/a'
+        return f'{(new - old) / old:+6.1%}'
+
+    yield f"{'endpoint':<18}{'p50 ms':>18}{'p90 ms':>18}{'queries':>12}{'peak KiB':>20}"
+    for name, new in current.items():
+        old = previous.get(name)
+        if old is None:
+            yield f'{name:<18} (new)'
+            continue
+        yield (
+            f"{name:<18}"
+            f"{new['p50_ms']:>10.2f} {delta(old['p50_ms'], new['p50_ms'])}"
+            f"{new['p90_ms']:>10.2f} {delta(old['p90_ms'], new['p90_ms'])}"
+            f"{old['queries']:>5} -> {new['queries']:<4}"
+            f"{new['peak_kib']:>12.1f} {delta(old['peak_kib'], new['peak_kib'])}"
+        )
@@ -0,0 +1,169 @@
+"""
+Cold start: the time from process start to the first served request.
+
+``run_startup`` starts a new interpreter that does what a new worker does,
+timing each step:
+
+* ``python``: the interpreter starting, up to the first line of ``child``;
+* ``setup``: ``django.setup()``: settings, then for each app, importing its
+  package, its models and running ``AppConfig.ready()``, all timed per app;
+* ``handler``: creating the WSGI handler, which loads the middleware;
+* ``request``: the first request, including the URLconf and every view
+  module it imports, up to the last byte of the response.
+
+With ``importtime=True`` the interpreter runs under ``python -X importtime``
+and each import it reports is attributed to the step that made it: the child
+writes a marker line on stderr as each step starts. The timing itself is
+best taken without: ``-X importtime`` slows imports down a little.
+
+The child is run with ``python -c`` and imports this module before Django,
+which is why it imports nothing but a few standard library modules at the
+top level; their time is counted in ``python``.
+"""
+import json
+import os
+import sys
+import time
+
+DEFAULT_PATH = '/api/v1/entries/'
+STEPS = ('python', 'setup', 'handler', 'request')
+_MARKER = 'startup-step:'
+_CHILD = 'import sys; from core.benchmarks.startup import child; child(sys.argv[1])'
+
+
+def _mark(marks, step):
+    marks[step] = time.time()
+    sys.stderr.write(f'{_MARKER}{step}\n')
+    sys.stderr.flush()
+
+
+def _timed(timings, app, phase, method):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings.setdefault(app, {})[phase] = time.perf_counter() - started
+    return wrapper
+
+
+def child(path):
+    """Start up as a worker would, serve ``path`` once, print the timings."""
+    marks = {}
+    _mark(marks, 'setup')
+    import django
+    from django.apps.config import AppConfig
+
+    apps = {}
+    create = AppConfig.create.__func__
+
+    def timed_create(cls, entry):
+        started = time.perf_counter()
+        config = create(cls, entry)
+        apps[config.label] = {'import': time.perf_counter() - started}
+        config.import_models = _timed(apps, config.label, 'models', config.import_models)
+        config.ready = _timed(apps, config.label, 'ready', config.ready)
+        return config
+
+    AppConfig.create = classmethod(timed_create)
+    django.setup(set_prefix=False)
+    AppConfig.create = classmethod(create)
+
+    _mark(marks, 'handler')
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+    _mark(marks, 'request')
+    status = _serve(handler, path)
+    marks['served'] = time.time()
+    print(json.dumps({'marks': marks, 'apps': apps, 'status': status}))
+
+
+def _serve(handler, path):
+    from io import BytesIO, StringIO
+
+    path_info, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path_info, 'QUERY_STRING': query,
+        'SCRIPT_NAME': '', 'SERVER_NAME': 'localhost', 'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': 'localhost', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': BytesIO(), 'wsgi.errors': StringIO(), 'wsgi.url_scheme': 'http',
+        'wsgi.multithread': True, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+        'wsgi.version': (1, 0),
+    }
+    status = []
+    response = handler(environ, lambda s, h, exc_info=None: status.append(int(s.split()[0])))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return status[0]
+
+
+def run_startup(path=DEFAULT_PATH, importtime=False):
+    """
+    Start a worker process that serves ``path`` once; return its timings as
+    a JSON-ready dict, with every import it made if ``importtime``.
+    """
+    import subprocess
+
+    from django.conf import settings
+
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', _CHILD, path]
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+    started = time.time()
+    process = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(f'The worker process failed:\n{process.stderr[-2000:]}')
+    report = json.loads(process.stdout.splitlines()[-1])
+
+    marks = {'python': started, **report['marks']}
+    ends = [*STEPS[1:], 'served']
+    result = {
+        'path': path,
+        'status': report['status'],
+        'total_ms': round((marks['served'] - started) * 1000, 1),
+        'steps': {step: round((marks[end] - marks[step]) * 1000, 1) for step, end in zip(STEPS, ends)},
+        'apps': {
+            label: {f'{phase}_ms': round(seconds * 1000, 2) for phase, seconds in phases.items()}
+            for label, phases in report['apps'].items()
+        },
+    }
+    if importtime:
+        result['imports'] = parse_importtime(process.stderr)
+    return result
+
+
+def parse_importtime(output):
+    """
+    The imports in ``-X importtime`` output, in the order they finished:
+    ``{'module', 'step', 'depth', 'self_us', 'cumulative_us'}`` each, where
+    ``depth`` 0 is an import the code asked for rather than one it caused.
+    """
+    imports = []
+    step = 'python'
+    for line in output.splitlines():
+        if line.startswith(_MARKER):
+            step = line[len(_MARKER):]
+            continue
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        imports.append({
+            'module': name.strip(),
+            'step': step,
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_us': int(own),
+            'cumulative_us': int(cumulative),
+        })
+    return imports
+
+
+def by_package(imports):
+    """Self import time in µs per top-level package, largest first."""
+    totals = {}
+    for entry in imports:
+        package = entry['module'].partition('.')[0]
+        totals[package] = totals.get(package, 0) + entry['self_us']
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
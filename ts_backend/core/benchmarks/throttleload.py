@@ -0,0 +1,114 @@
+"""
+Throttle accuracy and overhead under several worker processes.
+
+Every process checks the same client against the same limit, as fast as it
+can, for a fixed time, the way gunicorn workers would see one busy client.
+Two throttles are compared, each with its state in a fresh SQLite file:
+
+* ``history``: DRF's ``SimpleRateThrottle``, its request times in an
+  ``SQLiteCache`` (what ``UserRateThrottle`` did with the default cache);
+* ``bucket``: ``core.throttling.SQLiteBucketStore``.
+
+A throttle is accurate when it admits what the limit allows over the run and
+no more: ``num`` requests for ``history``, whose window is longer than the
+run, and ``num`` plus the refill for ``bucket``. Requests admitted beyond
+that are the ones concurrent checks lost. Overhead is the time one check
+takes. The processes are spawned and unpickle this module before they set
+Django up, so it must not import models, even indirectly, at the top level.
+"""
+import multiprocessing
+import time
+from pathlib import Path
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from ..throttling import SQLiteBucketStore, parse_rate
+
+MODES = ('history', 'bucket')
+KEY = 'throttle-load'
+
+
+def init_process():
+    import django
+    django.setup()
+
+
+def _ready(_):
+    return True
+
+
+class _HistoryThrottle(SimpleRateThrottle):
+    scope = 'load'
+
+    def __init__(self, cache, rate):
+        self.cache = cache
+        self.rate = rate
+        self.num_requests, self.duration = self.parse_rate(rate)
+
+    def get_cache_key(self, request, view):
+        return KEY
+
+
+def _checker(mode, path, rate):
+    if mode == 'history':
+        from ..cache_backends import SQLiteCache
+
+        throttle = _HistoryThrottle(SQLiteCache(path, {}), rate)
+        return lambda: throttle.allow_request(None, None)
+    store = SQLiteBucketStore(path)
+    capacity, period = parse_rate(rate)
+    return lambda: store.take(KEY, capacity, capacity / period) == 0
+
+
+def _hammer(mode, path, rate, start_at, duration):
+    """Check until ``start_at + duration``; returns (admitted, timings in s, end)."""
+    check = _checker(mode, path, rate)
+    admitted = 0
+    timings = []
+    time.sleep(max(0.0, start_at - time.time()))
+    end = start_at + duration
+    while time.time() < end:
+        started = time.perf_counter()
+        allowed = check()
+        timings.append(time.perf_counter() - started)
+        admitted += allowed
+    return admitted, timings, time.time()
+
+
+def run_throttle_load(mode, directory, workers, rate, duration):
+    """
+    Run ``workers`` processes checking one client against ``rate`` for
+    ``duration`` seconds with the ``mode`` throttle; return the result as a
+    JSON-ready dict.
+    """
+    from .runner import _percentile
+
+    path = str(Path(directory) / f'{mode}.sqlite3')
+    # Creates the schema before the processes race to.
+    _checker(mode, path, rate)
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers, initializer=init_process) as pool:
+        pool.map(_ready, range(workers))
+        start_at = time.time() + 0.5
+        results = pool.starmap(_hammer, [(mode, path, rate, start_at, duration)] * workers)
+
+    num, period = parse_rate(rate)
+    elapsed = max(end for _, _, end in results) - start_at
+    if mode == 'history':
+        allowed = num if elapsed < period else None
+    else:
+        allowed = int(num + num / period * elapsed)
+    admitted = sum(count for count, _, _ in results)
+    timings = [timing * 1e6 for _, samples, _ in results for timing in samples]
+    return {
+        'workers': workers,
+        'rate': rate,
+        'seconds': round(elapsed, 3),
+        'checks': len(timings),
+        'checks_per_second': round(len(timings) / elapsed, 1),
+        'admitted': admitted,
+        'allowed': allowed,
+        'over_admitted': None if allowed is None else max(0, admitted - allowed),
+        'p50_us': round(_percentile(timings, 50), 1),
+        'p99_us': round(_percentile(timings, 99), 1),
+    }
@@ -0,0 +1,186 @@
+"""
+An SQLite cache backend shared by every process on the host.
+
+``LocMemCache`` is per process, so gunicorn workers and ``run_workers``
+would each keep their own copy of cached values and invalidation tags.
+``FileBasedCache`` is shared but its ``add()`` and ``incr()`` are not atomic,
+which the tagged cache (``core.caching``) needs for its recompute locks.
+``SQLiteCache`` keeps entries in one SQLite file in WAL mode: reads do not
+block each other or the writer, and each write is a single statement.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': BASE_DIR / 'cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
+Expired rows and, over ``MAX_ENTRIES``, the ones closest to expiry are culled
+every ``CULL_EVERY`` writes per process, like ``DatabaseCache`` but without
+counting the table on each ``set()``.
+"""
+import itertools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+) WITHOUT ROWID
+"""
+_LIVE = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        options = params.get('OPTIONS', {})
+        self._cull_every = int(options.get('CULL_EVERY', 100))
+        # next() on a count is atomic; ``+= 1`` from many threads loses updates.
+        self._writes = itertools.count(1)
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        pid, db = getattr(self._local, 'db', (None, None))
+        if pid != os.getpid():
+            # One connection per thread, and a new one after a fork.
+            # Autocommit; multi-statement writes open their own transaction.
+            db = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode = WAL')
+            db.execute('PRAGMA synchronous = NORMAL')
+            db.execute(_SCHEMA)
+            self._local.db = (os.getpid(), db)
+        return db
+
+    def _expiry(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _wrote(self):
+        if next(self._writes) % self._cull_every == 0:
+            self._cull()
+
+    def _cull(self):
+        db = self._db
+        db.execute('DELETE FROM cache_entries WHERE expires <= ?', (time.time(),))
+        count = db.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count > self._max_entries:
+            db.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                'SELECT key FROM cache_entries ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency if self._cull_frequency else count,),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._db.execute(
+            f'SELECT value FROM cache_entries WHERE key = ? AND {_LIVE}', (key, time.time())
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        names = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not names:
+            return {}
+        rows = self._db.execute(
+            f'SELECT key, value FROM cache_entries '
+            f'WHERE key IN ({", ".join("?" * len(names))}) AND {_LIVE}',
+            (*names, time.time()),
+        )
+        return {names[key]: pickle.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expiry(timeout)
+        rows = [
+            (self.make_and_validate_key(key, version=version),
+             pickle.dumps(value, self.pickle_protocol), expires)
+            for key, value in data.items()
+        ]
+        self._db.executemany(
+            'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires',
+            rows,
+        )
+        self._wrote()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Replaces an expired row, never a live one: the check and the write
+        # are one statement, so concurrent add() calls have a single winner.
+        cursor = self._db.execute(
+            'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache_entries.expires IS NOT NULL AND cache_entries.expires <= ?',
+            (key, pickle.dumps(value, self.pickle_protocol), self._expiry(timeout), time.time()),
+        )
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._db.execute(
+            f'UPDATE cache_entries SET expires = ? WHERE key = ? AND {_LIVE}',
+            (self._expiry(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                f'SELECT value FROM cache_entries WHERE key = ? AND {_LIVE}', (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache_entries SET value = ? WHERE key = ?',
+                (pickle.dumps(value, self.pickle_protocol), key),
+            )
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db.execute(
+            f'SELECT 1 FROM cache_entries WHERE key = ? AND {_LIVE}', (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db.execute('DELETE FROM cache_entries WHERE key = ?', (key,)).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        names = [self.make_and_validate_key(key, version=version) for key in keys]
+        if names:
+            self._db.execute(
+                f'DELETE FROM cache_entries WHERE key IN ({", ".join("?" * len(names))})', names
+            )
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache_entries')
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused; Django calls this after
+        # every request.
+        pass
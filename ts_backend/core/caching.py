@@ -0,0 +1,220 @@
+"""
+Cached computations with tag invalidation, on top of Django's cache framework.
+
+``cached(key, compute, tags=...)`` returns the value cached under ``key`` or
+stores what ``compute()`` returns. Tags name what the value was computed from
+(``'category'``, ``'department:5'``, ``'entry:123'``); ``invalidate(tag)``
+drops every value computed from it. Models declare their tags with
+``invalidate_on_change``, which invalidates them when a row is saved or
+deleted, once the transaction commits. Bulk writes, which send no signals,
+call ``invalidate_on_commit`` themselves.
+
+* Tags are versioned rather than tracked: each tag has a version in the cache
+  and a value is stored with the versions of its tags at compute time.
+  Invalidating a tag gives it a new version, so values stored under the old
+  one no longer match and are recomputed on their next read. Invalidation
+  is one write, however many values the tag covers.
+* Values are recomputed before they expire, with a probability that rises as
+  expiry nears, scaled by how long the value took to compute (the XFetch
+  algorithm, ``CACHE_EARLY_RECOMPUTE`` is its beta; 0 turns it off). A
+  popular value is so refreshed by one request instead of missing for all
+  of them at once.
+* Concurrent misses on one key are coalesced: within a process, one thread
+  computes and the others wait for its result; across processes, the one
+  that takes the key's lock (``cache.add``) computes while the others serve
+  the expired value if there is one, or wait up to ``CACHE_LOCK_TIMEOUT``
+  for the result.
+
+The cache is ``CACHE_ALIAS``. Invalidation only reaches every process if it
+is shared: ``core.cache_backends.SQLiteCache`` on a single host, or Redis or
+Memcached. ``LocMemCache`` is fine for one process.
+
+``LocalCache`` is a small per-process LRU for values read on every request,
+in front of ``cached``; it has no invalidation across processes, so its
+entries live for a few seconds only.
+"""
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .conf import perf_setting
+
+KEY_PREFIX = 'cached:'
+TAG_PREFIX = 'tag:'
+LOCK_PREFIX = 'lock:'
+LOCK_POLL = 0.05
+
+
+def get_cache():
+    return caches[perf_setting('CACHE_ALIAS')]
+
+
+def _new_version():
+    return uuid.uuid4().hex[:16]
+
+
+def _tag_versions(cache, tags, found):
+    """Current versions of ``tags``, giving a version to those without one."""
+    missing = [tag for tag in tags if TAG_PREFIX + tag not in found]
+    for tag in missing:
+        # add(): another process may be creating the same version.
+        cache.add(TAG_PREFIX + tag, _new_version(), None)
+    if missing:
+        found = {**found, **cache.get_many([TAG_PREFIX + tag for tag in missing])}
+    return tuple(found.get(TAG_PREFIX + tag) for tag in tags)
+
+
+def invalidate(*tags):
+    """Drop every cached value computed from any of ``tags``, now."""
+    if tags:
+        get_cache().set_many({TAG_PREFIX + tag: _new_version() for tag in tags}, None)
+
+
+def invalidate_on_commit(*tags):
+    """``invalidate(*tags)`` once the current transaction commits (now, outside one)."""
+    transaction.on_commit(lambda: invalidate(*tags))
+
+
+def invalidate_on_change(model, tags):
+    """
+    Invalidate ``tags(instance)`` whenever an instance of ``model`` is saved
+    or deleted. Queryset ``update()``/``delete()`` and bulk methods send no
+    signals; their callers invalidate.
+    """
+    def receiver(sender, instance, **kwargs):
+        invalidate_on_commit(*tags(instance))
+
+    uid = f'core.caching:{model._meta.label}'
+    post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+
+
+class _Flight:
+    """One in-process computation other threads wait on."""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def cached(key, compute, tags=(), timeout=None):
+    """
+    The value cached under ``key``, computed by ``compute()`` on a miss and
+    kept for ``timeout`` seconds (default ``CACHE_TIMEOUT``) or until one
+    of ``tags`` is invalidated. Values must be picklable.
+    """
+    cache = get_cache()
+    timeout = perf_setting('CACHE_TIMEOUT') if timeout is None else timeout
+    tags = tuple(tags)
+    full_key = KEY_PREFIX + key
+    found = cache.get_many([full_key, *(TAG_PREFIX + tag for tag in tags)])
+    versions = _tag_versions(cache, tags, found)
+
+    stale = None
+    entry = found.get(full_key)
+    if entry is not None and entry[1] == versions:
+        value, _, expires, delta = entry
+        beta = perf_setting('CACHE_EARLY_RECOMPUTE')
+        if time.time() - delta * beta * math.log(1.0 - random.random()) < expires:
+            return value
+        stale = entry
+
+    with _flights_lock:
+        flight = _flights.get(full_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[full_key] = _Flight()
+    if not leader:
+        if stale is not None:
+            return stale[0]
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    try:
+        flight.value = _compute(cache, full_key, compute, versions, timeout, stale)
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[full_key]
+        flight.done.set()
+    return flight.value
+
+
+def _compute(cache, full_key, compute, versions, timeout, stale):
+    """Compute and store the value, unless another process is already doing it."""
+    lock_timeout = perf_setting('CACHE_LOCK_TIMEOUT')
+    lock_key = LOCK_PREFIX + full_key
+    locked = cache.add(lock_key, 1, lock_timeout)
+    if not locked:
+        if stale is not None:
+            return stale[0]
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            entry = cache.get(full_key)
+            if entry is not None and entry[1] == versions:
+                return entry[0]
+        # The other process died or is slow; compute anyway.
+    try:
+        started = time.perf_counter()
+        value = compute()
+        delta = time.perf_counter() - started
+        # Kept past its expiry so it can be served while it is recomputed.
+        cache.set(full_key, (value, versions, time.time() + timeout, delta), timeout + lock_timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+class LocalCache:
+    """A thread-safe LRU with per-entry expiry, private to the process."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[1] <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,78 @@
+"""
+Settings for the ``core`` performance tooling.
+
+Everything lives under a single ``PERFORMANCE`` dict in ``settings.py``, the
+same way ``REST_FRAMEWORK`` and ``SIMPLE_JWT`` are configured. Keys missing
+from the project settings fall back to ``DEFAULTS``.
+"""
+from django.conf import settings
+
+DEFAULTS = {
+    # Per-request phase timings (core.middleware.PerformanceMiddleware)
+    'INSTRUMENTATION': True,
+    'SERVER_TIMING': True,
+    'METRICS': True,
+    'HISTOGRAM_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    # N+1 detection and slow-query log (core.querylog.QueryAnalyzer)
+    'NPLUSONE_DETECTION': False,
+    'NPLUSONE_THRESHOLD': 5,
+    'NPLUSONE_STRICT': False,
+    'SLOW_QUERY_MS': 200,
+    'SLOW_QUERY_EXPLAIN': True,
+    # Live event streams (core.pubsub, core.async_api.event_stream)
+    'PUBSUB_BACKEND': 'core.pubsub.LocalBroker',
+    'PUBSUB_QUEUE_SIZE': 100,
+    'SSE_KEEPALIVE': 15,
+    # Background jobs (core.jobs, manage.py run_workers)
+    'JOBS_MAX_ATTEMPTS': 5,
+    'JOBS_BACKOFF_BASE': 10,
+    'JOBS_BACKOFF_MAX': 3600,
+    'JOBS_LEASE': 600,
+    # Done and failed jobs are deleted by manage.py prune_jobs this many days
+    # after they finished.
+    'JOBS_RETENTION_DAYS': 14,
+    # Audit trail (core.audit): events buffered per process, at most
+    # AUDIT_BUFFER_SIZE, and written AUDIT_BATCH_SIZE at a time, whenever that
+    # many are waiting and at least every AUDIT_FLUSH_INTERVAL seconds.
+    'AUDIT_BUFFER_SIZE': 10000,
+    'AUDIT_BATCH_SIZE': 500,
+    'AUDIT_FLUSH_INTERVAL': 2.0,
+    # Tagged cache (core.caching)
+    'CACHE_ALIAS': 'default',
+    'CACHE_TIMEOUT': 300,
+    'CACHE_EARLY_RECOMPUTE': 1.0,
+    'CACHE_LOCK_TIMEOUT': 10,
+    # Users resolved by accounts.authentication.CachedJWTAuthentication: kept
+    # this many seconds in a per-process LRU of this size, then in CACHE_ALIAS.
+    'AUTH_USER_LOCAL_TTL': 5,
+    'AUTH_USER_LOCAL_SIZE': 1024,
+    # Processes hashing passwords for bulk user creation (accounts.hashing);
+    # None is one per CPU, 1 hashes in the calling process.
+    'PROVISION_HASH_WORKERS': None,
+    # Pragmas run on every new SQLite connection (core.sqlite); an empty dict
+    # leaves SQLite's defaults.
+    'SQLITE_PRAGMAS': {},
+    # Token-bucket throttles (core.throttling): the bucket store, and the
+    # SQLite file it keeps them in.
+    'THROTTLE_STORE': 'core.throttling.SQLiteBucketStore',
+    'THROTTLE_LOCATION': 'throttle.sqlite3',
+    # OpenAPI schema cache (core.schema): the code version it is keyed by, None
+    # for a hash of the sources, and where it is kept, None for memory only.
+    'SCHEMA_VERSION': None,
+    'SCHEMA_CACHE_DIR': None,
+    # Read replicas (core.replicas.ReplicaRouter, core.middleware.ReplicaMiddleware)
+    'REPLICA_DATABASES': (),
+    'REPLICA_PIN_SECONDS': 5,
+    'REPLICA_PIN_CACHE': 'default',
+    # Archive tier (troubleshoots.archive): entries ARCHIVED this many days ago
+    # move to the archive tables, ARCHIVE_BATCH_SIZE per transaction; the
+    # background task sweeps again every ARCHIVE_INTERVAL seconds, None for
+    # only when queued (manage.py archive_entries --enqueue).
+    'ARCHIVE_AFTER_DAYS': 180,
+    'ARCHIVE_BATCH_SIZE': 200,
+    'ARCHIVE_INTERVAL': 6 * 3600,
+}
+
+
+def perf_setting(name):
+    return getattr(settings, 'PERFORMANCE', {}).get(name, DEFAULTS[name])
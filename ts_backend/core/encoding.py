@@ -0,0 +1,243 @@
+"""
+JSON and MessagePack encoding for API responses and request bodies.
+
+``orjson`` and ``msgpack`` are used when they are installed; neither is a
+hard requirement. Without ``orjson`` JSON goes through one reused stdlib
+encoder (its C accelerator), and without ``msgpack`` MessagePack goes through
+the pure-Python codec below, which is slower but produces the same bytes for
+the types API payloads contain.
+
+Either way the output matches DRF's ``JSONRenderer`` with the default
+settings: compact UTF-8, ``\\u2028``/``\\u2029`` escaped, and anything JSON
+has no type for (dates, decimals, UUIDs, lazy strings) converted by DRF's
+``JSONEncoder``. MessagePack payloads convert those the same way, so both
+formats carry the same values.
+"""
+import json
+import struct
+
+from rest_framework.utils import json as drf_json
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+MSGPACK_BACKEND = 'msgpack' if msgpack is not None else 'python'
+
+_json_encoder = JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+_default = _json_encoder.default
+
+
+def json_dumps(data):
+    """``data`` as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        try:
+            content = orjson.dumps(
+                data, default=_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            # orjson.JSONEncodeError: integers over 64 bits, deep nesting.
+            pass
+        else:
+            # Valid JSON but not valid JavaScript; DRF escapes them too.
+            if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+                content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+            return content
+    # On a str, unlike bytes, these are free when the text has no such characters.
+    text = _json_encoder.encode(data)
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def json_loads(content, encoding='utf-8', strict=True):
+    """
+    Parse JSON ``content`` (bytes). With ``strict``, ``NaN`` and infinities
+    are rejected. Raises ``ValueError`` on invalid input.
+    """
+    if orjson is not None and strict:
+        if encoding.lower().replace('-', '') != 'utf8':
+            content = content.decode(encoding)
+        return orjson.loads(content)
+    return json.loads(
+        content.decode(encoding),
+        parse_constant=drf_json.strict_constant if strict else None,
+    )
+
+
+def msgpack_dumps(data):
+    """``data`` as MessagePack bytes."""
+    if msgpack is not None:
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
+    out = bytearray()
+    _pack(data, out)
+    return bytes(out)
+
+
+def msgpack_loads(content):
+    """Parse MessagePack ``content``. Raises ``ValueError`` on invalid input."""
+    if msgpack is not None:
+        try:
+            return msgpack.unpackb(content, raw=False)
+        except Exception as exc:
+            # Extra data, unhashable keys, unknown extension types...
+            raise ValueError(str(exc)) from exc
+    try:
+        data, end = _unpack(bytes(content), 0)
+    except (IndexError, struct.error):
+        raise ValueError('Unexpected end of data.') from None
+    except (TypeError, RecursionError) as exc:
+        raise ValueError(str(exc)) from None
+    if end != len(content):
+        raise ValueError('Extra data after the first object.')
+    return data
+
+
+# Pure-Python MessagePack (https://github.com/msgpack/msgpack/blob/master/spec.md).
+# Exact built-in types are tested first: they are nearly all a payload holds.
+
+_UINT = ((0xff, struct.Struct('>BB'), 0xcc), (0xffff, struct.Struct('>BH'), 0xcd),
+         (0xffffffff, struct.Struct('>BI'), 0xce), (0xffffffffffffffff, struct.Struct('>BQ'), 0xcf))
+_INT = ((0x7f, struct.Struct('>Bb'), 0xd0), (0x7fff, struct.Struct('>Bh'), 0xd1),
+        (0x7fffffff, struct.Struct('>Bi'), 0xd2), (0x7fffffffffffffff, struct.Struct('>Bq'), 0xd3))
+_STR = ((0xff, struct.Struct('>BB'), 0xd9), (0xffff, struct.Struct('>BH'), 0xda),
+        (0xffffffff, struct.Struct('>BI'), 0xdb))
+_BIN = ((0xff, struct.Struct('>BB'), 0xc4), (0xffff, struct.Struct('>BH'), 0xc5),
+        (0xffffffff, struct.Struct('>BI'), 0xc6))
+_ARRAY = ((0xffff, struct.Struct('>BH'), 0xdc), (0xffffffff, struct.Struct('>BI'), 0xdd))
+_MAP = ((0xffff, struct.Struct('>BH'), 0xde), (0xffffffff, struct.Struct('>BI'), 0xdf))
+_FLOAT = struct.Struct('>Bd')
+
+
+def _pack_header(out, value, formats):
+    for limit, fmt, type_byte in formats:
+        if -limit - 1 <= value <= limit:
+            out += fmt.pack(type_byte, value)
+            return
+    raise OverflowError('Value too large for MessagePack.')
+
+
+def _pack(obj, out):
+    kind = type(obj)
+    if kind is str:
+        encoded = obj.encode()
+        if len(encoded) < 32:
+            out.append(0xa0 | len(encoded))
+        else:
+            _pack_header(out, len(encoded), _STR)
+        out += encoded
+    elif kind is int:
+        if -0x20 <= obj < 0x80:
+            out.append(obj & 0xff)
+        else:
+            _pack_header(out, obj, _UINT if obj >= 0 else _INT)
+    elif kind is dict:
+        if len(obj) < 16:
+            out.append(0x80 | len(obj))
+        else:
+            _pack_header(out, len(obj), _MAP)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    elif kind is list or kind is tuple:
+        if len(obj) < 16:
+            out.append(0x90 | len(obj))
+        else:
+            _pack_header(out, len(obj), _ARRAY)
+        for item in obj:
+            _pack(item, out)
+    elif obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif kind is float:
+        out += _FLOAT.pack(0xcb, obj)
+    elif kind is bytes:
+        _pack_header(out, len(obj), _BIN)
+        out += obj
+    # Subclasses (ReturnDict, ErrorDetail, enums) pack as their base type.
+    elif isinstance(obj, str):
+        _pack(str(obj), out)
+    elif isinstance(obj, dict):
+        _pack(dict(obj), out)
+    elif isinstance(obj, (list, tuple)):
+        _pack(list(obj), out)
+    elif isinstance(obj, int):
+        _pack(int(obj), out)
+    elif isinstance(obj, float):
+        _pack(float(obj), out)
+    elif isinstance(obj, (bytearray, memoryview)):
+        _pack(bytes(obj), out)
+    else:
+        _pack(_default(obj), out)
+
+
+_CONSTANTS = {0xc0: None, 0xc2: False, 0xc3: True}
+_NUMBERS = {
+    type_byte: struct.Struct(fmt) for type_byte, fmt in (
+        (0xca, '>f'), (0xcb, '>d'),
+        (0xcc, '>B'), (0xcd, '>H'), (0xce, '>I'), (0xcf, '>Q'),
+        (0xd0, '>b'), (0xd1, '>h'), (0xd2, '>i'), (0xd3, '>q'),
+    )
+}
+# Type byte -> (struct of the length that follows it, kind)
+_SIZED = {
+    type_byte: (struct.Struct(fmt), kind) for type_byte, fmt, kind in (
+        (0xd9, '>B', 'str'), (0xda, '>H', 'str'), (0xdb, '>I', 'str'),
+        (0xc4, '>B', 'bin'), (0xc5, '>H', 'bin'), (0xc6, '>I', 'bin'),
+        (0xdc, '>H', 'array'), (0xdd, '>I', 'array'),
+        (0xde, '>H', 'map'), (0xdf, '>I', 'map'),
+    )
+}
+
+
+def _unpack(data, pos):
+    """The object starting at ``data[pos]`` and the position after it."""
+    type_byte = data[pos]
+    pos += 1
+    if 0xa0 <= type_byte <= 0xbf:
+        kind, length = 'str', type_byte & 0x1f
+    elif type_byte <= 0x7f:
+        return type_byte, pos
+    elif 0x80 <= type_byte <= 0x8f:
+        kind, length = 'map', type_byte & 0x0f
+    elif 0x90 <= type_byte <= 0x9f:
+        kind, length = 'array', type_byte & 0x0f
+    elif type_byte >= 0xe0:
+        return type_byte - 0x100, pos
+    elif type_byte in _CONSTANTS:
+        return _CONSTANTS[type_byte], pos
+    elif type_byte in _NUMBERS:
+        fmt = _NUMBERS[type_byte]
+        return fmt.unpack_from(data, pos)[0], pos + fmt.size
+    elif type_byte in _SIZED:
+        fmt, kind = _SIZED[type_byte]
+        length = fmt.unpack_from(data, pos)[0]
+        pos += fmt.size
+    else:
+        raise TypeError(f'Unsupported MessagePack type 0x{type_byte:02x}.')
+
+    if kind == 'map':
+        mapping = {}
+        for _ in range(length):
+            key, pos = _unpack(data, pos)
+            mapping[key], pos = _unpack(data, pos)
+        return mapping, pos
+    if kind == 'array':
+        items = [None] * length
+        for index in range(length):
+            items[index], pos = _unpack(data, pos)
+        return items, pos
+    end = pos + length
+    if end > len(data):
+        raise IndexError
+    return (data[pos:end].decode() if kind == 'str' else data[pos:end]), end
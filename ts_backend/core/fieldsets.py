@@ -0,0 +1,307 @@
+"""
+Sparse fieldsets (``?fields=``) and selective expansion (``?expand=``).
+
+``?fields=id,title,author.username`` limits a response to the listed fields.
+Dotted paths select inside nested objects; a nested object named without a
+path keeps its default fields. ``?expand=team_leader`` swaps a related id for
+the object, or adds a relation the serializer leaves out by default, for the
+names in the serializer's ``Meta.expandable_fields``. An expanded field is
+always included. Both parameters apply to GET and HEAD; writes validate and
+return the full representation.
+
+Serializers opt in with ``SparseFieldsMixin`` and views with
+``SparseFieldsViewMixin``. ``optimize_queryset`` then shapes the queryset
+after the serializer as the client trimmed it: ``select_related`` for nested
+objects, a ``Prefetch`` for nested lists and ``only()`` on the columns the
+remaining fields read, at every level. Views leave out their annotations for
+fields nobody asked for with ``field_requested``.
+
+Columns are read off each field's ``source``. Fields computed in Python
+(``SerializerMethodField``, model properties and methods) list the model
+fields they read in ``Meta.field_sources``, as ``__`` paths; a model level
+with a computed field that is not listed loads all of its columns.
+"""
+import json
+import re
+from functools import cached_property, lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+READ_METHODS = ('GET', 'HEAD')
+
+
+def parse_field_paths(value):
+    """
+    ``'id,author.username,author.email'`` ->
+    ``{'id': {}, 'author': {'username': {}, 'email': {}}}``, or ``None``.
+    """
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for name in path.split('.'):
+            name = name.strip()
+            if name:
+                node = node.setdefault(name, {})
+    return tree or None
+
+
+def selection_from_request(request):
+    """Serializer kwargs for the ``?fields=`` and ``?expand=`` of a read request."""
+    if request is None or request.method not in READ_METHODS:
+        return {}
+    params = getattr(request, 'query_params', request.GET)
+    return {
+        'fields': parse_field_paths(params.get(FIELDS_PARAM)),
+        'expand': parse_field_paths(params.get(EXPAND_PARAM)),
+    }
+
+
+def field_requested(selection, *path):
+    """Whether the default field at ``path`` (names of nested fields) is in the response."""
+    fields = selection.get('fields')
+    for name in path:
+        if not fields:
+            return True
+        if name not in fields:
+            return False
+        fields = fields[name]
+    return True
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin taking ``fields`` and ``expand`` trees (as returned by
+    ``parse_field_paths``) and applying them to itself and to nested
+    serializers that use the mixin too.
+
+    ``Meta.expandable_fields`` maps a field name to the serializer that
+    represents it when expanded: a class, its dotted path (for serializers
+    that would import each other) or ``(class_or_path, kwargs)``.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._requested_fields = fields
+        self._expanded_fields = expand or {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        expand = {name: tree for name, tree in self._expanded_fields.items() if name in expandable}
+        for name in expand:
+            fields[name] = self._build_expanded_field(expandable[name])
+
+        requested = self._requested_fields
+        if requested:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in requested or name in expand
+            }
+        for name, field in fields.items():
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(nested, SparseFieldsMixin):
+                nested._requested_fields = (requested or {}).get(name) or None
+                nested._expanded_fields = expand.get(name) or {}
+        return fields
+
+    def _build_expanded_field(self, spec):
+        serializer_class, kwargs = spec if isinstance(spec, tuple) else (spec, {})
+        if isinstance(serializer_class, str):
+            serializer_class = import_string(serializer_class)
+        return serializer_class(read_only=True, **kwargs)
+
+
+class SparseFieldsViewMixin:
+    """
+    View mixin passing ``?fields=`` and ``?expand=`` to serializers that use
+    ``SparseFieldsMixin``, with ``optimize_queryset`` to load only what they
+    will read.
+    """
+
+    @cached_property
+    def field_selection(self):
+        return selection_from_request(self.request)
+
+    def field_requested(self, *path):
+        return field_requested(self.field_selection, *path)
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), SparseFieldsMixin):
+            kwargs = {**self.field_selection, **kwargs}
+        return super().get_serializer(*args, **kwargs)
+
+    def optimize_queryset(self, queryset):
+        """
+        ``optimize_queryset`` for the view's serializer. Writes keep all
+        columns, since the instance is saved, but still get the joins and
+        prefetches the response needs.
+        """
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsMixin):
+            return queryset
+        return optimize_queryset(
+            queryset, serializer_class,
+            only=self.request.method in READ_METHODS, **self.field_selection
+        )
+
+
+def optimize_queryset(queryset, serializer_class, only=True, fields=None, expand=None):
+    """
+    Add the ``select_related``, ``prefetch_related`` and (with ``only``)
+    ``only()`` that ``serializer_class``, trimmed to ``fields`` and
+    ``expand``, needs to represent the rows of ``queryset``.
+    """
+    return query_plan(
+        serializer_class, queryset.model, fields=fields, expand=expand
+    ).apply(queryset, only=only)
+
+
+def query_plan(serializer_class, model, fields=None, expand=None):
+    """
+    The ``QueryPlan`` for representing ``model`` instances with
+    ``serializer_class`` trimmed to ``fields`` and ``expand``.
+
+    Plans are cached: building one means building the serializer's fields,
+    which costs about as much as the request's own serialization.
+    """
+    return _cached_plan(
+        serializer_class, model, json.dumps(fields, sort_keys=True), json.dumps(expand, sort_keys=True)
+    )
+
+
+@lru_cache(maxsize=256)
+def _cached_plan(serializer_class, model, fields, expand):
+    selection = {}
+    if issubclass(serializer_class, SparseFieldsMixin):
+        selection = {'fields': json.loads(fields), 'expand': json.loads(expand)}
+    return QueryPlan.for_serializer(serializer_class(**selection), model)
+
+
+class QueryPlan:
+    """
+    What a serializer reads: ``select_related`` paths, prefetched relations
+    and the column paths for ``only()`` (``None`` when all are needed).
+
+    A plan holds no querysets, so one can be cached and applied to any
+    number of them.
+    """
+
+    def __init__(self):
+        self.select_related = []
+        self.prefetches = []  # (path, related model, QueryPlan or None)
+        self.columns = None
+        self._whole = set()
+
+    @classmethod
+    def for_serializer(cls, serializer, model):
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        plan = cls()
+        plan.columns = plan.collect(serializer, model, '')
+        return plan
+
+    @property
+    def prefetch_related(self):
+        """Lookups for ``prefetch_related()`` or ``prefetch_related_objects()``."""
+        return [
+            path if nested is None
+            else Prefetch(path, queryset=nested.apply(related._default_manager.all()))
+            for path, related, nested in self.prefetches
+        ]
+
+    def apply(self, queryset, only=True, prefetch=True):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if prefetch and self.prefetches:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if only and self.columns is not None:
+            queryset = queryset.only(*(
+                path for path in dict.fromkeys(self.columns)
+                if not any(path.startswith(f'{whole}__') for whole in self._whole)
+            ))
+        return queryset
+
+    def collect(self, serializer, model, prefix):
+        """Column paths read by ``serializer`` on ``model``, or ``None`` if unknown."""
+        columns = [prefix + model._meta.pk.name]
+        known = True
+        field_sources = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+        expanded = getattr(serializer, '_expanded_fields', {})
+        for field in serializer._readable_fields:
+            # An expanded field is a serializer reading its own sources.
+            if field.field_name in field_sources and field.field_name not in expanded:
+                for path in field_sources[field.field_name]:
+                    known &= self._collect_source(model, path.split('__'), None, prefix, columns)
+            elif isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                known = False
+            else:
+                known &= self._collect_source(model, field.source_attrs, field, prefix, columns)
+        return columns if known else None
+
+    def _collect_source(self, model, attrs, field, prefix, columns):
+        name = attrs[0]
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            display = re.fullmatch(r'get_(\w+)_display', name)
+            if display:
+                columns.append(prefix + display.group(1))
+                return True
+            # Properties and methods read columns we cannot see; any other
+            # missing attribute is an annotation.
+            return not hasattr(model, name)
+
+        if not model_field.is_relation:
+            columns.append(prefix + name)
+            return True
+
+        path = prefix + name
+        if model_field.one_to_many or model_field.many_to_many:
+            self._prefetch(model_field, path, field if len(attrs) == 1 else None)
+            return True
+
+        if len(attrs) == 1 and model_field.concrete and (
+            field is None or isinstance(field, PrimaryKeyRelatedField)
+        ):
+            # Just the foreign key column.
+            columns.append(path)
+            return True
+
+        if path not in self.select_related:
+            self.select_related.append(path)
+        columns.append(path)
+        related = model_field.related_model
+        if len(attrs) > 1:
+            if not self._collect_source(related, attrs[1:], field, f'{path}__', columns):
+                self._whole.add(path)
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = self.collect(field, related, f'{path}__')
+            if nested is None:
+                self._whole.add(path)
+            else:
+                columns.extend(nested)
+        else:
+            self._whole.add(path)
+        return True
+
+    def _prefetch(self, model_field, path, field):
+        if any(seen == path for seen, _, _ in self.prefetches):
+            return
+        related = model_field.related_model
+        if isinstance(field, serializers.ListSerializer):
+            nested = QueryPlan.for_serializer(field, related)
+        elif isinstance(field, ManyRelatedField):
+            nested = QueryPlan()
+            nested.columns = [related._meta.pk.name]
+        else:
+            nested = None
+        if nested is not None and nested.columns is not None and model_field.one_to_many:
+            # The prefetch matches rows to their parent by the foreign key.
+            nested.columns.append(model_field.field.name)
+        self.prefetches.append((path, related, nested))
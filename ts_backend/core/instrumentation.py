@@ -0,0 +1,142 @@
+"""
+Per-request phase timing.
+
+``PerformanceMiddleware`` opens a ``RequestTimings`` for every request and
+stores it in a context variable. The hooks installed by ``install()`` add the
+time spent in JWT/session authentication, permission checks, serialization and
+rendering to it, and a database execute wrapper counts SQL queries, duplicate
+queries and time spent in the database.
+
+Phases can overlap: ``serialize`` includes the queries the serializer triggers
+(lazy querysets and per-row lookups), which are also counted under ``db``.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+PHASES = ('auth', 'perm', 'db', 'serialize', 'render')
+
+
+class RequestTimings:
+    """Accumulates phase durations (in seconds) and query counts for one request."""
+
+    __slots__ = ('started', 'phases', 'queries', 'duplicates', '_seen', '_depth')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.duplicates = 0
+        self._seen = set()
+        self._depth = dict.fromkeys(PHASES, 0)
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def record_query(self, sql, params, seconds):
+        self.queries += 1
+        self.phases['db'] += seconds
+        key = (sql, repr(params))
+        if key in self._seen:
+            self.duplicates += 1
+        else:
+            self._seen.add(key)
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Format the timings as a ``Server-Timing`` header value."""
+        parts = []
+        for phase in PHASES:
+            value = f'{phase};dur={self.phases[phase] * 1000:.2f}'
+            if phase == 'db':
+                value += f';desc="{self.queries} queries, {self.duplicates} duplicate"'
+            parts.append(value)
+        parts.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+def start():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def phase(name):
+    """
+    Time a block as ``name`` for the current request.
+
+    Nested use of the same phase (a serializer calling ``.data`` on another
+    serializer) is only counted once, at the outermost level.
+    """
+    timings = _current.get()
+    if timings is None or timings._depth[name]:
+        yield
+        return
+    timings._depth[name] += 1
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._depth[name] -= 1
+        timings.add(name, time.perf_counter() - start_time)
+
+
+def query_timer(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection (see ``core.apps``) that
+    records queries for the request active in this context, if any.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start_time = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.record_query(sql, params, time.perf_counter() - start_time)
+
+
+def _timed(name, func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with phase(name):
+            return func(*args, **kwargs)
+    wrapper.__timed__ = True
+    return wrapper
+
+
+def _timed_property(name, prop):
+    return property(_timed(name, prop.fget), prop.fset, prop.fdel, prop.__doc__)
+
+
+def install():
+    """
+    Wrap the DRF entry points for each phase. Safe to call more than once.
+    """
+    from rest_framework.serializers import Serializer, ListSerializer
+    from rest_framework.views import APIView
+
+    if getattr(APIView.perform_authentication, '__timed__', False):
+        return
+
+    APIView.perform_authentication = _timed('auth', APIView.perform_authentication)
+    APIView.check_permissions = _timed('perm', APIView.check_permissions)
+    APIView.check_object_permissions = _timed('perm', APIView.check_object_permissions)
+    # ``.data`` is what views call; nested serializers go through
+    # ``to_representation`` directly and are covered by the outer call.
+    Serializer.data = _timed_property('serialize', Serializer.data)
+    ListSerializer.data = _timed_property('serialize', ListSerializer.data)
@@ -0,0 +1,19 @@
+"""
+Entry points for ``run_workers --pool process``.
+
+Spawned children unpickle these by reference before Django is set up, so this
+module must not import models at the top level.
+"""
+
+
+def init_process():
+    import django
+    django.setup()
+
+    from .jobs import autodiscover
+    autodiscover()
+
+
+def execute(name, kwargs):
+    from .jobs import execute
+    return execute(name, kwargs)
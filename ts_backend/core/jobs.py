@@ -0,0 +1,374 @@
+"""
+Background jobs stored in the project database.
+
+Register a function with ``@task`` and enqueue it with ``enqueue()`` (or
+``func.enqueue(**kwargs)``); ``manage.py run_workers`` claims due jobs in
+batches and runs them on a thread or process pool.
+
+* Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database
+  supports it (PostgreSQL), so workers never wait on each other's rows.
+  SQLite has no row locks but only ever one writer, so there a single
+  ``UPDATE ... WHERE id IN (SELECT ... LIMIT n)`` claims the batch atomically.
+* At most one job per ``dedup_key`` is queued at a time. Enqueuing the same key
+  again merges into it: highest priority, earliest ``run_at``, latest kwargs.
+  Tasks declared with ``coalesce_by`` derive the key from their arguments, so
+  repeated jobs for the same object between two polls run once.
+  ``enqueue_many`` queues the jobs of many objects in two queries.
+* A failed job is retried with exponential backoff and jitter until
+  ``max_attempts``; jobs left running by a dead worker are retried once their
+  lease expires.
+* Enqueuing is transactional: a job enqueued inside a transaction is invisible
+  to workers until commit and disappears on rollback.
+* Finished jobs stay in the table, done or failed, for ``JOBS_RETENTION_DAYS``;
+  ``manage.py prune_jobs`` deletes them after that.
+"""
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, connections, router, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from . import jobprocess
+from .conf import perf_setting
+from .models import Job
+
+logger = logging.getLogger('core.jobs')
+
+_registry = {}
+
+
+class Task:
+    """A function registered with ``@task``; calling it runs it inline."""
+
+    def __init__(self, func, name, priority, max_attempts, coalesce_by):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        if isinstance(coalesce_by, str):
+            coalesce_by = (coalesce_by,)
+        self.coalesce_by = tuple(coalesce_by or ())
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def dedup_key(self, kwargs):
+        if not self.coalesce_by:
+            return None
+        return ':'.join([self.name, *(str(kwargs[arg]) for arg in self.coalesce_by)])
+
+    def enqueue(self, **kwargs):
+        return enqueue(self, kwargs)
+
+    def enqueue_many(self, kwargs_list):
+        return enqueue_many(self, kwargs_list)
+
+
+def task(name=None, *, priority=0, max_attempts=None, coalesce_by=None):
+    """
+    Register a function as a background task.
+
+    ``coalesce_by`` names the keyword argument(s) identifying the object the
+    task works on; queued jobs with the same values are merged.
+    """
+    def decorator(func):
+        registered = Task(
+            func, name or f'{func.__module__}.{func.__qualname__}', priority,
+            max_attempts or perf_setting('JOBS_MAX_ATTEMPTS'), coalesce_by,
+        )
+        _registry[registered.name] = registered
+        return registered
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'No task registered as {name!r}.') from None
+
+
+def autodiscover():
+    """Import ``tasks`` modules of all installed apps so their tasks register."""
+    autodiscover_modules('tasks')
+
+
+def enqueue(task, kwargs=None, *, priority=None, delay=None, dedup_key=None, max_attempts=None):
+    """
+    Queue ``task`` (a ``Task`` or its name) to run with ``kwargs``.
+
+    ``kwargs`` must be JSON serializable; pass ids, not model instances.
+    ``delay`` is a ``timedelta`` or a number of seconds. Returns the new
+    ``Job``, or ``None`` when it was merged into an already queued one.
+    """
+    if isinstance(task, str):
+        task = get_task(task)
+    kwargs = kwargs or {}
+    priority = task.priority if priority is None else priority
+    if delay is not None and not isinstance(delay, timedelta):
+        delay = timedelta(seconds=delay)
+    run_at = timezone.now() + (delay or timedelta())
+    dedup_key = dedup_key or task.dedup_key(kwargs)
+
+    if dedup_key is None:
+        return Job.objects.create(
+            task=task.name, kwargs=kwargs, priority=priority, run_at=run_at,
+            max_attempts=max_attempts or task.max_attempts,
+        )
+
+    merge = {
+        'kwargs': kwargs,
+        'priority': Greatest(F('priority'), Value(priority)),
+        'run_at': Least(F('run_at'), Value(run_at)),
+    }
+    queued = Job.objects.filter(dedup_key=dedup_key, status=Job.QUEUED)
+    while True:
+        if queued.update(**merge):
+            return None
+        try:
+            with transaction.atomic():
+                return Job.objects.create(
+                    task=task.name, kwargs=kwargs, priority=priority, run_at=run_at,
+                    dedup_key=dedup_key, max_attempts=max_attempts or task.max_attempts,
+                )
+        except IntegrityError:
+            # Another process queued the same key in between; merge into it.
+            continue
+
+
+def enqueue_many(task, kwargs_list):
+    """
+    ``enqueue(task, kwargs)`` for each of ``kwargs_list``. When the task is
+    coalesced by all of its arguments, merging leaves nothing to update but
+    the priority and ``run_at``, so the jobs are queued with one ``UPDATE``
+    and one ``INSERT`` however many there are; otherwise one by one.
+    """
+    if isinstance(task, str):
+        task = get_task(task)
+    kwargs_list = list(kwargs_list)
+    if not task.coalesce_by or any(set(kwargs) != set(task.coalesce_by) for kwargs in kwargs_list):
+        for kwargs in kwargs_list:
+            enqueue(task, kwargs)
+        return
+    if not kwargs_list:
+        return
+    jobs = {}
+    run_at = timezone.now()
+    for kwargs in kwargs_list:
+        dedup_key = task.dedup_key(kwargs)
+        jobs[dedup_key] = Job(
+            task=task.name, kwargs=kwargs, priority=task.priority, run_at=run_at,
+            dedup_key=dedup_key, max_attempts=task.max_attempts,
+        )
+    Job.objects.filter(dedup_key__in=jobs, status=Job.QUEUED).update(
+        priority=Greatest(F('priority'), Value(task.priority)),
+        run_at=Least(F('run_at'), Value(run_at)),
+    )
+    # Keys already queued conflict with core_job_unique_queued_key: skipped.
+    Job.objects.bulk_create(jobs.values(), ignore_conflicts=True)
+
+
+def claim(worker_id, limit):
+    """
+    Mark up to ``limit`` due jobs as running for ``worker_id`` and return them,
+    highest priority first.
+    """
+    now = timezone.now()
+    token = f'{worker_id}/{uuid.uuid4().hex[:8]}'
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('-priority', 'run_at', 'id')
+    claimed = {
+        'status': Job.RUNNING,
+        'locked_by': token,
+        'locked_at': now,
+        'attempts': F('attempts') + 1,
+    }
+    connection = connections[router.db_for_write(Job)]
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=connection.alias):
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**claimed)
+    else:
+        Job.objects.filter(
+            pk__in=due.values('id')[:limit], status=Job.QUEUED
+        ).update(**claimed)
+    return list(
+        Job.objects.filter(status=Job.RUNNING, locked_at=now, locked_by=token)
+        .order_by('-priority', 'run_at', 'id')
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts``: exponential, jittered, capped."""
+    delay = min(
+        perf_setting('JOBS_BACKOFF_BASE') * 2 ** (attempts - 1),
+        perf_setting('JOBS_BACKOFF_MAX'),
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def complete(jobs):
+    """Mark finished jobs done with one UPDATE."""
+    Job.objects.filter(
+        pk__in=[job.pk for job in jobs],
+        locked_by__in={job.locked_by for job in jobs},
+        status=Job.RUNNING,
+    ).update(status=Job.DONE, finished_at=timezone.now(), last_error='')
+
+
+def fail(job, error):
+    """Schedule a retry of ``job``, or mark it failed once out of attempts."""
+    current = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+    if job.attempts >= job.max_attempts:
+        logger.error('Job %s (%s) failed for good after %d attempts:\n%s',
+                     job.pk, job.task, job.attempts, error)
+        current.update(status=Job.FAILED, finished_at=timezone.now(), last_error=error)
+        return
+
+    delay = backoff(job.attempts)
+    logger.warning('Job %s (%s) failed, retrying in %.0fs:\n%s', job.pk, job.task, delay, error)
+    try:
+        with transaction.atomic():
+            current.update(
+                status=Job.QUEUED, run_at=timezone.now() + timedelta(seconds=delay),
+                locked_by='', locked_at=None, last_error=error,
+            )
+    except IntegrityError:
+        # A newer job for the same key is already queued and will do the work.
+        current.delete()
+
+
+def release(jobs):
+    """Put claimed jobs that never started back in the queue, attempt uncounted."""
+    for job in jobs:
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=Job.QUEUED, locked_by='', locked_at=None, attempts=F('attempts') - 1
+        )
+
+
+def requeue_expired(lease):
+    """Retry jobs whose worker has held them longer than ``lease`` seconds."""
+    cutoff = timezone.now() - timedelta(seconds=lease)
+    expired = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    for job in expired:
+        fail(job, f'Lease of {lease}s expired while held by {job.locked_by}.')
+
+
+def execute(name, kwargs):
+    """
+    Run one task inside a pool worker. Returns ``None`` on success or the
+    formatted traceback, which (unlike the exception) always pickles.
+    """
+    close_old_connections()
+    try:
+        get_task(name)(**kwargs)
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        close_old_connections()
+    return None
+
+
+def _outcome(future):
+    try:
+        return future.result()
+    except Exception:
+        # The pool itself failed, e.g. a worker process was killed.
+        return traceback.format_exc()
+
+
+class Worker:
+    """
+    Claim due jobs and run them on ``concurrency`` threads or processes.
+
+    Up to ``batch_size`` jobs are claimed per query and handed to the pool;
+    a new batch is claimed once fewer than ``concurrency`` are in flight.
+    """
+
+    def __init__(self, concurrency=4, pool='thread', batch_size=None, poll_interval=1.0,
+                 lease=None):
+        self.concurrency = concurrency
+        self.pool = pool
+        self.batch_size = batch_size or concurrency * 2
+        self.poll_interval = poll_interval
+        self.lease = lease or perf_setting('JOBS_LEASE')
+        self.worker_id = f'{socket.gethostname()[:40]}:{os.getpid()}'
+        self.processed = 0
+        self.failed = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def _target(self):
+        return jobprocess.execute if self.pool == 'process' else execute
+
+    def _executor(self):
+        if self.pool == 'process':
+            # Forked children would share the parent's database sockets.
+            return ProcessPoolExecutor(
+                self.concurrency, mp_context=multiprocessing.get_context('spawn'),
+                initializer=jobprocess.init_process,
+            )
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+
+    def _record(self, finished):
+        succeeded = []
+        for job, error in finished:
+            if error is None:
+                succeeded.append(job)
+            else:
+                fail(job, error)
+                self.failed += 1
+        if succeeded:
+            complete(succeeded)
+            self.processed += len(succeeded)
+
+    def run(self, burst=False):
+        """Process jobs until ``stop()``; with ``burst``, until the queue is empty."""
+        autodiscover()
+        running = {}
+        last_lease_check = None
+        with self._executor() as executor:
+            try:
+                while not self._stop.is_set():
+                    now = timezone.now()
+                    if last_lease_check is None or (now - last_lease_check).total_seconds() > self.lease / 2:
+                        requeue_expired(self.lease)
+                        last_lease_check = now
+
+                    if len(running) < self.concurrency:
+                        jobs = claim(self.worker_id, self.batch_size - len(running))
+                        for index, job in enumerate(jobs):
+                            try:
+                                future = executor.submit(self._target, job.task, job.kwargs)
+                            except Exception:
+                                release(jobs[index:])
+                                raise
+                            running[future] = job
+
+                    if not running:
+                        close_old_connections()
+                        if burst:
+                            break
+                        self._stop.wait(self.poll_interval)
+                        continue
+
+                    done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    self._record([(running.pop(future), _outcome(future)) for future in done])
+            finally:
+                # Let in-flight jobs finish and record them before exiting.
+                done = wait(running).done
+                self._record([(running.pop(future), _outcome(future)) for future in done])
+                close_old_connections()
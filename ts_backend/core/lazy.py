@@ -0,0 +1,85 @@
+"""
+Views imported on first use rather than when the URLconf loads.
+
+Every worker imports the URLconf, and with it every view module, before it
+serves its first request. Views that are rarely requested and import heavy
+modules, the schema views and drf-spectacular behind them above all, are
+routed through ``lazy_view`` instead::
+
+    path('api/v1/schema/', lazy_view('core.schema.CachedSchemaView'), name='schema'),
+
+The module is imported, and ``as_view()`` called, by the first request to
+the URL or the first lookup of an attribute of the real view, such as the
+``cls`` drf-spectacular and DRF's schema generators look for. Reversing the
+URL needs only its name and doesn't import anything.
+
+DRF imports the schema class too when the URLconf loads: routers list the
+attributes of every viewset, ``schema`` among them, and ``APIView.schema``
+imports ``DEFAULT_SCHEMA_CLASS`` (drf-spectacular's ``AutoSchema``) to answer.
+``defer_schema_class()``, called from ``CoreConfig.ready()``, replaces it with
+a ``DeferredSchema`` that imports it only for a view instance, which only
+schema generation asks for. On the class it answers as before as soon as
+drf-spectacular's ``utils`` is loaded: ``extend_schema`` subclasses the
+schema it finds there, so once it can have been used, it must find the real
+one.
+"""
+import sys
+import threading
+
+from django.utils.module_loading import import_string
+from rest_framework.schemas.inspectors import DefaultSchema
+
+
+class LazyView:
+    """Stands in for ``import_string(path).as_view(**initkwargs)`` until needed."""
+
+    def __init__(self, path, **initkwargs):
+        self._path = path
+        self._initkwargs = initkwargs
+        self._view = None
+        self._lock = threading.Lock()
+        # What URLPattern.lookup_str and ResolverMatch read: the real view's path.
+        self.__module__, _, self.__name__ = path.rpartition('.')
+        self.__qualname__ = self.__name__
+
+    @property
+    def view(self):
+        if self._view is None:
+            with self._lock:
+                if self._view is None:
+                    self._view = import_string(self._path).as_view(**self._initkwargs)
+        return self._view
+
+    def __call__(self, request, *args, **kwargs):
+        return self.view(request, *args, **kwargs)
+
+    def __getattr__(self, name):
+        if name == 'view_class' and self._view is None:
+            # Django's URL resolver prefers it to __qualname__ when present.
+            raise AttributeError(name)
+        return getattr(self.view, name)
+
+    def __repr__(self):
+        return f'<LazyView {self._path}>'
+
+
+def lazy_view(path, **initkwargs):
+    """The class-based view at dotted ``path``, as a view imported on first use."""
+    return LazyView(path, **initkwargs)
+
+
+class DeferredSchema(DefaultSchema):
+    """``DefaultSchema`` that doesn't import the schema class for the view class."""
+
+    def __get__(self, instance, owner):
+        if instance is None and 'drf_spectacular.utils' not in sys.modules:
+            return self
+        return super().__get__(instance, owner)
+
+
+def defer_schema_class():
+    """Install ``DeferredSchema`` as ``APIView.schema``. Safe to call more than once."""
+    from rest_framework.views import APIView
+
+    if not isinstance(APIView.__dict__['schema'], DeferredSchema):
+        APIView.schema = DeferredSchema()
@@ -0,0 +1,34 @@
+import json
+import logging
+import logging.handlers
+import os
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. Structured fields are passed as
+    ``extra={'data': {...}}`` and merged into the top level.
+    """
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        payload.update(getattr(record, 'data', {}))
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    ``RotatingFileHandler`` that creates the log's directory when it opens
+    the file; with ``delay`` that is on the first record, not at startup.
+    """
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
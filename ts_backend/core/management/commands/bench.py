@@ -0,0 +1,92 @@
+import platform
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.benchmarks import runner
+from core.benchmarks.dataset import SCALES, benchmark_database
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main API endpoints against a generated dataset in a '
+        'throwaway test database, and check them against stored budgets.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                            help='Size of the generated dataset.')
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Measured requests per endpoint.')
+        parser.add_argument('--only', nargs='+', metavar='NAME',
+                            help='Only run the named endpoints.')
+        parser.add_argument('--output', '-o', help='Write results as JSON to this file.')
+        parser.add_argument('--compare', metavar='FILE',
+                            help='Print the change against a previous results file.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                            help='Budget file to check against (default: %(default)s).')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed p90 latency regression over the baseline.')
+        parser.add_argument('--slack-ms', type=float, default=5.0,
+                            help='Absolute p90 slack added on top of --tolerance.')
+        parser.add_argument('--no-check', action='store_true',
+                            help='Report only, never fail on budgets.')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Store the results of this run as the new baseline.')
+
+    def handle(self, *args, **options):
+        results = self.run(options)
+
+        meta = {
+            'scale': options['scale'],
+            'iterations': options['iterations'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'timestamp': timezone.now().isoformat(),
+        }
+        if options['output']:
+            runner.save(options['output'], {'meta': meta, 'results': results})
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            previous = runner.load(options['compare'])['results']
+            for line in runner.compare(previous, results):
+                self.stdout.write(line)
+        else:
+            for name, result in results.items():
+                self.stdout.write(
+                    f"{name:<18} p50 {result['p50_ms']:8.2f}ms  p90 {result['p90_ms']:8.2f}ms  "
+                    f"p99 {result['p99_ms']:8.2f}ms  queries {result['queries']:4}  "
+                    f"peak {result['peak_kib']:9.1f}KiB"
+                )
+
+        if options['update_baseline']:
+            runner.update_baseline(options['baseline'], runner.make_baseline(results))
+            self.stdout.write(self.style.SUCCESS(f"Baseline updated: {options['baseline']}"))
+            return
+
+        if options['no_check'] or not Path(options['baseline']).exists():
+            return
+        failures = runner.check_budgets(
+            results, runner.load(options['baseline']), options['tolerance'], options['slack_ms']
+        )
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} endpoint(s) over budget.')
+        self.stdout.write(self.style.SUCCESS('All endpoints within budget.'))
+
+    def run(self, options):
+        self.stdout.write(f"Building {options['scale']} dataset...")
+        with benchmark_database(options['scale']) as fixtures:
+            scenarios = runner.default_scenarios(fixtures)
+            if options['only']:
+                unknown = set(options['only']) - {s.name for s in scenarios}
+                if unknown:
+                    raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+                scenarios = [s for s in scenarios if s.name in options['only']]
+            return runner.run_all(scenarios, options['iterations'])
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.benchmarks import runner
+from core.benchmarks.concurrency import hold_streams, run_asgi, run_wsgi
+from core.benchmarks.dataset import SCALES, benchmark_database
+from troubleshoots.events import entry_channel
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and latency of the async read endpoints under the '
+        'ASGI application with the DRF endpoints under WSGI, at several '
+        'concurrency levels.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                            help='Concurrent requests in flight.')
+        parser.add_argument('--requests', type=int, default=64,
+                            help='Requests per endpoint and concurrency level.')
+        parser.add_argument('--streams', type=int, default=0,
+                            help='Also hold this many idle entry event streams open '
+                                 'and time one event fanning out to all of them.')
+        parser.add_argument('--output', '-o', help='Write results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        from ts_backend.asgi import application as asgi_application
+        from ts_backend.wsgi import application as wsgi_application
+
+        results = {}
+        with benchmark_database(options['scale']) as fixtures:
+            headers = {'Authorization': f"Bearer {AccessToken.for_user(fixtures['user'])}"}
+            endpoints = {
+                'department-list': '/api/v1/departments/',
+                'user-me': '/api/v1/users/me/',
+                'entry-list': '/api/v1/entries/',
+                'entry-detail': f"/api/v1/entries/{fixtures['entry'].pk}/",
+                'entry-search': f"/api/v1/entries/?search={fixtures['search_term']}",
+            }
+            self.stdout.write(
+                f"{'endpoint':<16}{'conc':>5}  {'WSGI req/s':>11}{'p90 ms':>9}"
+                f"  {'ASGI req/s':>11}{'p90 ms':>9}"
+            )
+            for name, path in endpoints.items():
+                for concurrency in options['concurrency']:
+                    wsgi = run_wsgi(wsgi_application, path, headers, concurrency, options['requests'])
+                    asgi = run_asgi(asgi_application, path, headers, concurrency, options['requests'])
+                    results[f'{name}@{concurrency}'] = {'wsgi': wsgi, 'asgi': asgi}
+                    self.stdout.write(
+                        f"{name:<16}{concurrency:>5}  {wsgi['throughput_rps']:>11.1f}{wsgi['p90_ms']:>9.1f}"
+                        f"  {asgi['throughput_rps']:>11.1f}{asgi['p90_ms']:>9.1f}"
+                        + ('  (errors)' if wsgi['errors'] or asgi['errors'] else '')
+                    )
+
+            if options['streams']:
+                entry = fixtures['entry']
+                streams = hold_streams(
+                    asgi_application, f'/api/v1/entries/{entry.pk}/events/', headers,
+                    entry_channel(entry.pk), options['streams'],
+                )
+                results['entry-events'] = streams
+                self.stdout.write(
+                    f"\nentry-events: {streams['streams']} streams opened in {streams['open_s']}s, "
+                    f"{streams['bytes_per_stream']} bytes each, "
+                    f"one event reached all in {streams['fanout_ms']} ms"
+                )
+
+        if options['output']:
+            runner.save(options['output'], {'results': results})
+            self.stdout.write(f"Results written to {options['output']}")
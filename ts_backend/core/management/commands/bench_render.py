@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from core import encoding
+from core.benchmarks import runner
+from core.benchmarks.dataset import SCALES, benchmark_database
+from core.benchmarks.encoding import collect, default_payloads, measure
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare encode/decode time and size of the department, user and entry '
+        'list payloads with the DRF JSON renderer, the fast JSON renderer and '
+        'MessagePack.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+        parser.add_argument('--rows', type=int, default=100,
+                            help='Results per payload, collected over as many pages as needed.')
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Encodes and decodes timed per payload and format.')
+        parser.add_argument('--output', '-o', help='Write results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'JSON backend: {encoding.JSON_BACKEND}, MessagePack backend: {encoding.MSGPACK_BACKEND}'
+        )
+        results = {}
+        with benchmark_database(options['scale']) as fixtures:
+            payloads = {
+                name: collect(path, user, options['rows'])
+                for name, (path, user) in default_payloads(fixtures).items()
+            }
+
+        self.stdout.write(
+            f"{'payload':<16}{'rows':>5}  {'format':<10}{'bytes':>9}{'gzip':>8}"
+            f"{'encode us':>11}{'decode us':>11}"
+        )
+        for name, data in payloads.items():
+            results[name] = measure(data, options['iterations'])
+            for format_name, result in results[name].items():
+                self.stdout.write(
+                    f"{name:<16}{data['count']:>5}  {format_name:<10}{result['bytes']:>9}"
+                    f"{result['gzip_bytes']:>8}{result['encode_us']:>11.1f}{result['decode_us']:>11.1f}"
+                )
+
+        if options['output']:
+            runner.save(options['output'], {
+                'backends': {'json': encoding.JSON_BACKEND, 'msgpack': encoding.MSGPACK_BACKEND},
+                'results': results,
+            })
+            self.stdout.write(f"Results written to {options['output']}")
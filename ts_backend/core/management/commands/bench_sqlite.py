@@ -0,0 +1,69 @@
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.benchmarks import runner
+from core.benchmarks.dataset import SCALES, benchmark_database
+from core.benchmarks.mixedload import PROFILES, run_mixed, sqlite_profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure write throughput and read latency under mixed load on an '
+        'SQLite file, with SQLite defaults and with the production profile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+        parser.add_argument('--profile', choices=PROFILES, nargs='+', default=list(PROFILES))
+        parser.add_argument('--readers', type=int, default=4, help='Reader threads.')
+        parser.add_argument('--writers', type=int, default=4, help='Writer threads, one user each.')
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Seconds of load per profile.')
+        parser.add_argument('--output', '-o', help='Write results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        from ts_backend.wsgi import application
+
+        results = {}
+        self.stdout.write(
+            f"{'profile':<9}{'writes/s':>10}{'errors':>8}{'write p90':>11}"
+            f"{'reads/s':>10}{'errors':>8}{'read p50':>10}{'read p90':>10}{'read p99':>10}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in options['profile']:
+                try:
+                    with sqlite_profile(profile, Path(directory) / f'{profile}.sqlite3'), \
+                            benchmark_database(options['scale']) as fixtures:
+                        writers = get_user_model().objects.filter(
+                            username__startswith='user'
+                        ).order_by('pk')[:options['writers']]
+                        result = run_mixed(
+                            application, fixtures['entry_ids'],
+                            _headers(fixtures['user']), [_headers(user) for user in writers],
+                            options['readers'], options['duration'],
+                        )
+                except ValueError as exc:
+                    raise CommandError(exc)
+                results[profile] = result
+                write, read = result['write'], result['read']
+                self.stdout.write(
+                    f"{profile:<9}{write['per_second']:>10.1f}{write['errors']:>8}"
+                    f"{_ms(write['p90_ms']):>11}{read['per_second']:>10.1f}{read['errors']:>8}"
+                    f"{_ms(read['p50_ms']):>10}{_ms(read['p90_ms']):>10}{_ms(read['p99_ms']):>10}"
+                )
+
+        if options['output']:
+            runner.save(options['output'], {'results': results})
+            self.stdout.write(f"Results written to {options['output']}")
+
+
+def _headers(user):
+    return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+
+def _ms(value):
+    return '-' if value is None else f'{value:.1f}'
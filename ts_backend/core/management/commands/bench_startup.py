@@ -0,0 +1,83 @@
+import statistics
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import runner
+from core.benchmarks.startup import DEFAULT_PATH, STEPS, run_startup
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Time new worker processes from process start to their first served '
+        'request, and check the median against the stored budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=7, help='Worker processes to start.')
+        parser.add_argument('--path', default=DEFAULT_PATH,
+                            help='The first request (default: %(default)s).')
+        parser.add_argument('--output', '-o', help='Write results as JSON to this file.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                            help='Budget file to check against (default: %(default)s).')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed regression of the median over the baseline.')
+        parser.add_argument('--slack-ms', type=float, default=50.0,
+                            help='Absolute slack added on top of --tolerance.')
+        parser.add_argument('--no-check', action='store_true',
+                            help='Report only, never fail on the budget.')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Store the median of this run as the new budget.')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be positive.')
+        try:
+            results = [run_startup(options['path']) for _ in range(options['runs'])]
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        summary = {
+            'path': options['path'],
+            'status': results[0]['status'],
+            'runs': len(results),
+            'p50_ms': round(statistics.median(r['total_ms'] for r in results), 1),
+            'min_ms': min(r['total_ms'] for r in results),
+            'max_ms': max(r['total_ms'] for r in results),
+            'steps_p50_ms': {
+                step: round(statistics.median(r['steps'][step] for r in results), 1) for step in STEPS
+            },
+        }
+        steps = '  '.join(f'{step} {ms:.1f}' for step, ms in summary['steps_p50_ms'].items())
+        self.stdout.write(
+            f"start to first response ({summary['status']}): p50 {summary['p50_ms']:.1f}ms  "
+            f"min {summary['min_ms']:.1f}ms  max {summary['max_ms']:.1f}ms  over {summary['runs']} runs"
+        )
+        self.stdout.write(f'p50 per step (ms): {steps}')
+
+        if options['output']:
+            runner.save(options['output'], {'summary': summary, 'results': results})
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['update_baseline']:
+            runner.update_baseline(options['baseline'], {
+                'startup': {'path': options['path'], 'p50_ms': summary['p50_ms']},
+            })
+            self.stdout.write(self.style.SUCCESS(f"Baseline updated: {options['baseline']}"))
+            return
+
+        budget = None
+        if not options['no_check'] and Path(options['baseline']).exists():
+            budget = runner.load(options['baseline']).get('startup')
+        if budget is None or budget['path'] != options['path']:
+            # No budget, or one for another first request.
+            return
+        limit = budget['p50_ms'] * (1 + options['tolerance']) + options['slack_ms']
+        if summary['p50_ms'] > limit:
+            raise CommandError(
+                f"Startup p50 {summary['p50_ms']:.1f}ms exceeds baseline {budget['p50_ms']:.1f}ms "
+                f"(+{options['tolerance']:.0%}, +{options['slack_ms']:g}ms)."
+            )
+        self.stdout.write(self.style.SUCCESS('Startup within budget.'))
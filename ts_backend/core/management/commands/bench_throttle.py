@@ -0,0 +1,57 @@
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import runner
+from core.benchmarks.throttleload import MODES, run_throttle_load
+from core.throttling import PERIODS, parse_rate
+
+
+class Command(BaseCommand):
+    help = (
+        'Check one client against one limit from several processes at once, '
+        'with the DRF request-history throttle and with the token-bucket one, '
+        'and report how many requests each let through and what a check costs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, nargs='+', default=list(MODES))
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes.')
+        parser.add_argument('--rate', default='500/minute',
+                            help='The limit, as in DEFAULT_THROTTLE_RATES (default: %(default)s).')
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Seconds of load per mode.')
+        parser.add_argument('--output', '-o', help='Write results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        try:
+            parse_rate(options['rate'])
+        except (ValueError, KeyError):
+            raise CommandError(f"--rate must look like '500/minute', periods {', '.join(PERIODS)}.")
+        if options['workers'] < 1 or options['duration'] <= 0:
+            raise CommandError('--workers and --duration must be positive.')
+
+        results = {}
+        self.stdout.write(
+            f"{'mode':<9}{'workers':>8}{'checks/s':>10}{'admitted':>10}{'allowed':>9}"
+            f"{'over':>6}{'p50 us':>9}{'p99 us':>9}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for mode in options['mode']:
+                result = run_throttle_load(
+                    mode, directory, options['workers'], options['rate'], options['duration']
+                )
+                results[mode] = result
+                self.stdout.write(
+                    f"{mode:<9}{result['workers']:>8}{result['checks_per_second']:>10.1f}"
+                    f"{result['admitted']:>10}{_value(result['allowed']):>9}"
+                    f"{_value(result['over_admitted']):>6}{result['p50_us']:>9.1f}{result['p99_us']:>9.1f}"
+                )
+
+        if options['output']:
+            runner.save(options['output'], {'results': results})
+            self.stdout.write(f"Results written to {options['output']}")
+
+
+def _value(value):
+    return '-' if value is None else str(value)
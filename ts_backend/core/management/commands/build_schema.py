@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+
+from core import schema
+from core.conf import perf_setting
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate the OpenAPI schema of this code version into '
+        "PERFORMANCE['SCHEMA_CACHE_DIR'], as YAML and JSON, so no request has "
+        'to; run it at deploy time. Documents of other versions are deleted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-old', action='store_true',
+                            help='Keep the documents of other versions, for processes still running them.')
+
+    def handle(self, *args, **options):
+        if perf_setting('SCHEMA_CACHE_DIR') is None:
+            self.stderr.write(self.style.WARNING(
+                "PERFORMANCE['SCHEMA_CACHE_DIR'] is not set: the schema is cached in memory only."
+            ))
+        version = schema.schema_version()
+        for renderer in (OpenApiYamlRenderer(), OpenApiJsonRenderer()):
+            started = time.perf_counter()
+            document = schema.get_document(renderer, renderer.media_type)
+            self.stdout.write(
+                f'{renderer.format}: {len(document.body)} bytes, {len(document.compressed)} gzipped, '
+                f'in {(time.perf_counter() - started) * 1000:.0f}ms'
+            )
+        pruned = 0 if options['keep_old'] else schema.prune(version)
+        self.stdout.write(self.style.SUCCESS(f'Schema {version} cached; {pruned} old documents deleted'))
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import runner
+from core.benchmarks.startup import DEFAULT_PATH, STEPS, by_package, run_startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Start a new worker process under python -X importtime and serve one '
+        'request, and report where the time to the first response went: per '
+        'step, per app (import, models, ready()), per package and per import.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=DEFAULT_PATH,
+                            help='The first request (default: %(default)s).')
+        parser.add_argument('--top', type=int, default=15,
+                            help='Packages and imports to list.')
+        parser.add_argument('--output', '-o', help='Write the full profile as JSON to this file.')
+
+    def handle(self, *args, **options):
+        if options['top'] < 1:
+            raise CommandError('--top must be positive.')
+        try:
+            result = run_startup(options['path'], importtime=True)
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        imports = result['imports']
+        top = options['top']
+
+        self.stdout.write(f"{'step':<22}{'ms':>9}{'imports ms':>12}")
+        for step in STEPS:
+            imported = sum(entry['self_us'] for entry in imports if entry['step'] == step) / 1000
+            self.stdout.write(f"{step:<22}{result['steps'][step]:>9.1f}{imported:>12.1f}")
+
+        self.stdout.write(f"\n{'app':<22}{'import ms':>11}{'models ms':>11}{'ready ms':>10}")
+        apps = result['apps']
+        for label, phases in sorted(apps.items(), key=lambda item: -sum(item[1].values())):
+            self.stdout.write(
+                f"{label:<22}{phases['import_ms']:>11.1f}"
+                f"{phases.get('models_ms', 0):>11.1f}{phases.get('ready_ms', 0):>10.1f}"
+            )
+        accounted = sum(sum(phases.values()) for phases in apps.values())
+        self.stdout.write(f"{'(settings, django)':<22}{result['steps']['setup'] - accounted:>11.1f}")
+
+        self.stdout.write(f"\n{'package':<40}{'self ms':>9}")
+        for package, micros in by_package(imports)[:top]:
+            self.stdout.write(f'{package:<40}{micros / 1000:>9.1f}')
+
+        # Depth 0: what the code imported, with everything that import pulled in.
+        self.stdout.write(f"\n{'import':<40}{'step':<10}{'cumulative ms':>14}")
+        requested = sorted(
+            (entry for entry in imports if entry['depth'] == 0),
+            key=lambda entry: entry['cumulative_us'], reverse=True,
+        )
+        for entry in requested[:top]:
+            self.stdout.write(f"{entry['module']:<40}{entry['step']:<10}{entry['cumulative_us'] / 1000:>14.1f}")
+
+        if options['output']:
+            runner.save(options['output'], result)
+            self.stdout.write(f"\nProfile written to {options['output']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"\nFirst response ({result['status']}) {result['total_ms']:.1f}ms after process start, "
+            f"{len(imports)} modules imported."
+        ))
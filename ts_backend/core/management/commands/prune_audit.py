@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import AuditEvent
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the audit events older than a number of days, oldest first, a '
+        'batch at a time along the time index so writers are never held up long.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS',
+                            help='Delete the events created more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Events deleted per statement (default: %(default)s).')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--older-than must be at least 0 and --batch-size at least 1.')
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        expired = AuditEvent.objects.filter(created_at__lt=cutoff).order_by('created_at', 'id')
+        deleted = 0
+        while ids := list(expired.values_list('id', flat=True)[:options['batch_size']]):
+            # Nothing refers to an event, so this is one DELETE, no collection.
+            deleted += AuditEvent.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} audit events older than {cutoff:%Y-%m-%d %H:%M}'))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.conf import perf_setting
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the jobs that finished, done or failed, more than a number of days '
+        'ago, oldest first, a batch at a time so workers are never held up long.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, metavar='DAYS',
+                            help='Delete the jobs finished more than this many days ago '
+                                 '(default: the JOBS_RETENTION_DAYS setting).')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Jobs deleted per statement (default: %(default)s).')
+
+    def handle(self, *args, **options):
+        older_than = options['older_than']
+        if older_than is None:
+            older_than = perf_setting('JOBS_RETENTION_DAYS')
+        if older_than < 0 or options['batch_size'] < 1:
+            raise CommandError('--older-than must be at least 0 and --batch-size at least 1.')
+        cutoff = timezone.now() - timedelta(days=older_than)
+        deleted = 0
+        for status in (Job.DONE, Job.FAILED):
+            expired = Job.objects.filter(status=status, finished_at__lt=cutoff).order_by('finished_at')
+            while ids := list(expired.values_list('id', flat=True)[:options['batch_size']]):
+                # Nothing refers to a job, so this is one DELETE, no collection.
+                deleted += Job.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} jobs finished before {cutoff:%Y-%m-%d %H:%M}'))
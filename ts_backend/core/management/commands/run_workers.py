@@ -0,0 +1,50 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs from the database queue on a pool of threads or '
+        'processes until interrupted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', '-c', type=int, default=4,
+                            help='Jobs run at the same time.')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='Use processes for CPU-bound tasks.')
+        parser.add_argument('--batch-size', type=int,
+                            help='Jobs claimed per query (default: twice the concurrency).')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--lease', type=int,
+                            help='Seconds before a running job counts as abandoned.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no due jobs are left.')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options['concurrency'],
+            pool=options['pool'],
+            batch_size=options['batch_size'],
+            poll_interval=options['poll_interval'],
+            lease=options['lease'],
+        )
+
+        def shutdown(signum, frame):
+            self.stdout.write('Finishing running jobs...')
+            worker.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(
+            f"Worker {worker.worker_id}: {options['concurrency']} {options['pool']}(s)"
+        )
+        worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stopped: {worker.processed} job(s) done, {worker.failed} failed.'
+        ))
@@ -0,0 +1,49 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.conf import perf_setting
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database over each replica in '
+        "PERFORMANCE['REPLICA_DATABASES'], standing in for replication when "
+        'trying the replica router locally.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float,
+                            help='Keep copying, this many seconds apart (the simulated lag).')
+
+    def handle(self, *args, **options):
+        aliases = perf_setting('REPLICA_DATABASES')
+        if not aliases:
+            raise CommandError("No replicas: PERFORMANCE['REPLICA_DATABASES'] is empty.")
+        for alias in (DEFAULT_DB_ALIAS, *aliases):
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias} is not an SQLite database; use real replication.')
+
+        while True:
+            started = time.perf_counter()
+            for alias in aliases:
+                self.copy(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'],
+                          connections[alias].settings_dict['NAME'])
+            self.stdout.write(
+                f'Synced {", ".join(aliases)} in {(time.perf_counter() - started) * 1000:.1f}ms'
+            )
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+
+    def copy(self, source, target):
+        # The backup API takes a consistent snapshot even while the primary
+        # is being written to.
+        src, dst = sqlite3.connect(source), sqlite3.connect(target)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
@@ -0,0 +1,114 @@
+"""
+In-process metrics registry rendered in the Prometheus text exposition format.
+
+Histograms are kept per route (the URL name, e.g. ``entry-detail``) so the
+label cardinality stays bounded no matter how many ids are requested. The
+numbers are per worker process; Prometheus aggregates across workers.
+"""
+import bisect
+import threading
+
+from .conf import perf_setting
+from .instrumentation import PHASES
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self, buckets=None):
+        self._buckets = tuple(buckets or perf_setting('HISTOGRAM_BUCKETS'))
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._phases = {}
+        self._queries = {}
+        self._duplicates = {}
+        self._responses = {}
+
+    def _histogram(self, table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram(self._buckets)
+        return histogram
+
+    def observe_request(self, route, method, status, timings, total):
+        with self._lock:
+            self._histogram(self._durations, (route, method)).observe(total)
+            for name in PHASES:
+                self._histogram(self._phases, (route, name)).observe(timings.phases[name])
+            self._queries[route] = self._queries.get(route, 0) + timings.queries
+            self._duplicates[route] = self._duplicates.get(route, 0) + timings.duplicates
+            key = (route, method, str(status))
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            for table in (self._durations, self._phases, self._queries,
+                          self._duplicates, self._responses):
+                table.clear()
+
+    def render(self):
+        """Return all metrics as Prometheus text format."""
+        lines = []
+        with self._lock:
+            self._render_histograms(
+                lines, 'http_request_duration_seconds',
+                'Total request wall time.', ('route', 'method'), self._durations)
+            self._render_histograms(
+                lines, 'http_request_phase_seconds',
+                'Time spent per request phase (auth, perm, db, serialize, render).',
+                ('route', 'phase'), self._phases)
+            self._render_counter(
+                lines, 'http_requests_total', 'Responses by status code.',
+                ('route', 'method', 'status'), self._responses)
+            self._render_counter(
+                lines, 'db_queries_total', 'SQL queries executed.',
+                ('route',), {(k,): v for k, v in self._queries.items()})
+            self._render_counter(
+                lines, 'db_duplicate_queries_total',
+                'SQL queries repeated with identical parameters within a request.',
+                ('route',), {(k,): v for k, v in self._duplicates.items()})
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _labels(names, values, **extra):
+        pairs = list(zip(names, values)) + list(extra.items())
+        inner = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return '{' + inner + '}'
+
+    def _render_histograms(self, lines, name, help_text, label_names, table):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in sorted(table.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{self._labels(label_names, key, le=bound)} {cumulative}')
+            lines.append(f'{name}_bucket{self._labels(label_names, key, le="+Inf")} {histogram.count}')
+            lines.append(f'{name}_sum{self._labels(label_names, key)} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{self._labels(label_names, key)} {histogram.count}')
+
+    def _render_counter(self, lines, name, help_text, label_names, table):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key, value in sorted(table.items()):
+            lines.append(f'{name}{self._labels(label_names, key)} {value}')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
@@ -0,0 +1,149 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import instrumentation, replicas
+from .conf import perf_setting
+from .metrics import registry
+from .querylog import QueryAnalyzer
+
+
+class PerformanceMiddleware:
+    """
+    Time each request by phase and publish the result.
+
+    Adds a ``Server-Timing`` header (auth, perm, db, serialize, render, total)
+    and feeds the per-route histograms served by ``core.views.metrics``. The
+    per-request cost is two context variables, a pass through the execute
+    wrappers ``core.apps`` installs on each connection and a handful of
+    ``perf_counter`` calls, so it is meant to stay enabled in production.
+    Context variables follow the request into ``sync_to_async`` threads, so
+    queries run by async views are counted too.
+
+    It also runs a ``QueryAnalyzer``: slow queries are always logged, and with
+    ``NPLUSONE_DETECTION`` on, repeated per-row queries are reported at the
+    end of the request (or raised, with ``NPLUSONE_STRICT``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.enabled = perf_setting('INSTRUMENTATION')
+        self.server_timing = perf_setting('SERVER_TIMING')
+        self.metrics = perf_setting('METRICS')
+        if self.enabled:
+            instrumentation.install()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        analyzer, timings, token = self._begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            self._end(analyzer, token)
+        return self._finish(request, response, analyzer, timings)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        analyzer, timings, token = self._begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._end(analyzer, token)
+        return self._finish(request, response, analyzer, timings)
+
+    def _begin(self):
+        analyzer = QueryAnalyzer(track_repeats=perf_setting('NPLUSONE_DETECTION'))
+        analyzer.activate()
+        timings, token = instrumentation.start()
+        return analyzer, timings, token
+
+    def _end(self, analyzer, token):
+        instrumentation.stop(token)
+        analyzer.deactivate()
+
+    def _finish(self, request, response, analyzer, timings):
+        total = timings.total
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        if analyzer.track_repeats:
+            analyzer.report(f'{request.method} {route}')
+        if self.server_timing:
+            response['Server-Timing'] = timings.server_timing()
+        if self.metrics:
+            registry.observe_request(route, request.method, response.status_code, timings, total)
+        return response
+
+    def process_template_response(self, request, response):
+        """Time ``response.render()``; DRF responses are rendered right after this hook."""
+        timings = instrumentation.current()
+        if timings is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: timings.add('render', time.perf_counter() - started)
+            )
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Route the reads of safe-method requests to a replica (see ``core.replicas``).
+
+    Requests from a client pinned by a recent write, and every other method,
+    run on the primary; a request that wrote pins its client. Unused, and so
+    free, while ``REPLICA_DATABASES`` is empty.
+    """
+
+    sync_capable = True
+    async_capable = True
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not perf_setting('REPLICA_DATABASES'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        key = replicas.client_key(request)
+        if request.method in self.safe_methods and not replicas.is_pinned(key):
+            token = replicas.use_replicas()
+        else:
+            token = replicas.use_primary()
+        try:
+            response = self.get_response(request)
+            if replicas.current_state().wrote:
+                replicas.pin(key)
+        finally:
+            replicas.reset(token)
+        return response
+
+    async def __acall__(self, request):
+        key = replicas.client_key(request)
+        if request.method in self.safe_methods and not await replicas.ais_pinned(key):
+            token = replicas.use_replicas()
+        else:
+            token = replicas.use_primary()
+        try:
+            response = await self.get_response(request)
+            if replicas.current_state().wrote:
+                await replicas.apin(key)
+        finally:
+            replicas.reset(token)
+        return response
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A unit of background work stored in the project database.
+
+    Enqueued with ``core.jobs.enqueue`` and executed by ``manage.py run_workers``.
+    """
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=200, help_text='Registered task name')
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0, help_text='Higher runs first')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    dedup_key = models.CharField(
+        max_length=200, null=True, blank=True,
+        help_text='At most one queued job per key; repeated enqueues are merged into it'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_at', 'id']
+        indexes = [
+            # Claim order: the next due jobs, highest priority first.
+            models.Index(fields=['status', '-priority', 'run_at', 'id'], name='core_job_claim_idx'),
+            models.Index(fields=['status', 'locked_at'], name='core_job_lease_idx'),
+            # manage.py prune_jobs: finished jobs, oldest first.
+            models.Index(fields=['status', 'finished_at'], name='core_job_finished_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'], condition=Q(status='QUEUED'),
+                name='core_job_unique_queued_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} ({self.get_status_display()})'
+
+
+class AuditEvent(models.Model):
+    """
+    One audited change, written in batches by ``core.audit``; never updated.
+
+    The actor and the object are references without foreign key constraints,
+    so events outlive what they refer to and writing them locks nothing else.
+    """
+    created_at = models.DateTimeField(default=timezone.now)
+    action = models.CharField(max_length=40, help_text="What happened, e.g. 'user.verified'")
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, related_name='+',
+        on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    object_type = models.ForeignKey(
+        'contenttypes.ContentType', null=True, blank=True, related_name='+',
+        on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Each lookup of the query API, newest first, and retention.
+            models.Index(fields=['created_at', 'id'], name='core_audit_time_idx'),
+            models.Index(fields=['actor', 'created_at', 'id'], name='core_audit_actor_idx'),
+            models.Index(
+                fields=['object_type', 'object_id', 'created_at', 'id'], name='core_audit_object_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.action} #{self.pk}'
@@ -0,0 +1,34 @@
+"""
+Request parsers matching ``core.renderers``, for bulk writes.
+
+``FastJSONParser`` replaces DRF's ``JSONParser`` (``orjson`` when installed)
+and ``MessagePackParser`` reads ``Content-Type: application/msgpack`` bodies.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .encoding import json_loads, msgpack_loads
+from .renderers import MSGPACK_MEDIA_TYPE, FastJSONRenderer, MessagePackRenderer
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            return json_loads(stream.read(), encoding, strict=self.strict)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackParser(BaseParser):
+    media_type = MSGPACK_MEDIA_TYPE
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack_loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
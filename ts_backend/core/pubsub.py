@@ -0,0 +1,114 @@
+"""
+Publish/subscribe fan-out for the live event streams.
+
+Publishers are ordinary sync code (views, serializers, ``on_commit``
+callbacks) running on any thread; subscribers are async stream views waiting
+on the event loop. A broker only needs two methods:
+
+* ``publish(channel, event)`` -- thread-safe, never blocks the caller.
+* ``subscribe(channel)`` -- returns a ``Subscription`` to read from and
+  ``close()`` when the stream ends.
+
+``LocalBroker`` fans out inside one process, which covers a single ASGI
+server handling both the writes and the streams. With several processes, a
+backend that relays ``LISTEN/NOTIFY`` or a spool directory into a
+``LocalBroker`` can be plugged in through ``PERFORMANCE['PUBSUB_BACKEND']``
+without touching the publishers or the stream views.
+"""
+import asyncio
+import threading
+
+from django.utils.module_loading import import_string
+
+from .conf import perf_setting
+
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    """
+    One reader of one channel, bound to the event loop that created it.
+
+    The queue is bounded: a reader that falls too far behind has its backlog
+    replaced by a single ``resync`` event, telling the client to refetch
+    instead of replaying stale deltas.
+    """
+
+    __slots__ = ('broker', 'channel', 'queue', 'loop')
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize)
+        self.loop = asyncio.get_running_loop()
+
+    def deliver(self, event):
+        """Hand ``event`` to the reader's loop; callable from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is closed: the stream is gone.
+            self.close()
+
+    def _put(self, event):
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process broker: a set of subscriptions per channel."""
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or perf_setting('PUBSUB_QUEUE_SIZE')
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = tuple(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker configured by ``PERFORMANCE['PUBSUB_BACKEND']``."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(perf_setting('PUBSUB_BACKEND'))()
+    return _broker
@@ -0,0 +1,227 @@
+"""
+N+1 query detection and slow-query logging.
+
+A ``QueryAnalyzer`` is a database execute wrapper. It groups the queries run
+while it is active by normalized SQL and by the project call site that issued
+them; a group that repeats ``threshold`` times or more is almost always a
+per-row lookup (``obj.members.count()`` in a loop, a ``SerializerMethodField``
+querying per object) and is reported as an N+1.
+
+Queries slower than ``slow_ms`` are logged on the spot with their parameters
+and the database's EXPLAIN output. Both kinds of event go to the
+``core.queries`` logger, which ``settings.LOGGING`` sends to a rotating JSON
+log file.
+
+In tests, use it as a context manager in strict mode::
+
+    with QueryAnalyzer(strict=True, threshold=3):
+        self.client.get('/api/v1/entries/')
+
+Analyzers nest: one activated while another is active (the middleware's,
+inside the test's above) passes every query on to the outer one as well.
+"""
+import contextvars
+import functools
+import logging
+import re
+import sys
+import time
+
+from django.conf import settings
+
+from .conf import perf_setting
+
+logger = logging.getLogger('core.queries')
+
+_active = contextvars.ContextVar('query_analyzer', default=None)
+
+_CORE_DIR = str(settings.BASE_DIR / 'core')
+_PROJECT_DIR = str(settings.BASE_DIR)
+
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+\b')
+_SPACE = re.compile(r'\s+')
+
+
+class NPlusOneError(Exception):
+    """Raised in strict mode when a query repeats above the threshold."""
+
+
+def normalize_sql(sql):
+    """Collapse literals and ``IN (...)`` lists so per-row queries share one key."""
+    sql = _IN_LIST.sub('(%s, ...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def call_site(depth=3):
+    """
+    Return the innermost ``depth`` project frames as ``path:line:function``.
+
+    Walks raw frames instead of ``traceback.extract_stack`` so no source
+    lines are read. Frames from site-packages and from this app are skipped.
+    """
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < depth:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_DIR) and not filename.startswith(_CORE_DIR):
+            frames.append(
+                f'{filename[len(_PROJECT_DIR) + 1:]}:{frame.f_lineno}:{frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return tuple(frames)
+
+
+class QueryGroup:
+    __slots__ = ('sql', 'call_site', 'count', 'duration', 'params')
+
+    def __init__(self, sql, site, params):
+        self.sql = sql
+        self.call_site = site
+        self.count = 0
+        self.duration = 0.0
+        self.params = params
+
+    def as_dict(self):
+        return {
+            'sql': self.sql,
+            'call_site': list(self.call_site),
+            'count': self.count,
+            'duration_ms': round(self.duration * 1000, 3),
+            'sample_params': _jsonable(self.params),
+        }
+
+
+class QueryAnalyzer:
+    """
+    Execute wrapper that groups queries and logs slow ones.
+
+    ``track_repeats=False`` keeps only the slow-query log, which costs nothing
+    per query until a query is actually slow.
+    """
+
+    def __init__(self, threshold=None, strict=None, slow_ms=None, explain=None,
+                 track_repeats=True):
+        self.threshold = threshold or perf_setting('NPLUSONE_THRESHOLD')
+        self.strict = perf_setting('NPLUSONE_STRICT') if strict is None else strict
+        self.slow_ms = perf_setting('SLOW_QUERY_MS') if slow_ms is None else slow_ms
+        self.explain = perf_setting('SLOW_QUERY_EXPLAIN') if explain is None else explain
+        self.track_repeats = track_repeats
+        self.groups = {}
+        self._token = None
+        self._outer = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._outer is not None:
+            execute = functools.partial(self._outer, execute)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            site = call_site() if self.track_repeats else None
+            if self.track_repeats:
+                key = (normalize_sql(sql), site)
+                group = self.groups.get(key)
+                if group is None:
+                    group = self.groups[key] = QueryGroup(key[0], site, params)
+                group.count += 1
+                group.duration += duration
+            if self.slow_ms and duration * 1000 >= self.slow_ms:
+                self._log_slow(context['connection'], sql, params, many, duration, site)
+
+    def activate(self):
+        """
+        Receive every query run in the current context (thread or task),
+        along with the analyzer that was active, if any.
+        """
+        self._outer = _active.get()
+        self._token = _active.set(self)
+
+    def deactivate(self):
+        _active.reset(self._token)
+        self._outer = None
+
+    def __enter__(self):
+        self.activate()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.deactivate()
+        if exc_type is None:
+            self.report()
+        return False
+
+    def repeated(self):
+        """Query groups at or above the threshold, worst first."""
+        return sorted(
+            (group for group in self.groups.values() if group.count >= self.threshold),
+            key=lambda group: group.count, reverse=True,
+        )
+
+    def report(self, label=''):
+        """Log every repeated group; in strict mode raise ``NPlusOneError``."""
+        offenders = self.repeated()
+        for group in offenders:
+            logger.warning(
+                'Repeated query (%d times) in %s', group.count, label or 'block',
+                extra={'data': {'event': 'n_plus_one', 'label': label, **group.as_dict()}},
+            )
+        if offenders and self.strict:
+            worst = offenders[0]
+            raise NPlusOneError(
+                f'{len(offenders)} repeated query group(s) in {label or "block"}; worst ran '
+                f'{worst.count} times from {" <- ".join(worst.call_site) or "unknown"}: {worst.sql}'
+            )
+        return offenders
+
+    def _log_slow(self, connection, sql, params, many, duration, site):
+        data = {
+            'event': 'slow_query',
+            'alias': connection.alias,
+            'sql': sql,
+            'params': _jsonable(params),
+            'duration_ms': round(duration * 1000, 3),
+            'call_site': list(site if site is not None else call_site()),
+        }
+        if self.explain and not many and sql.lstrip()[:6].upper() == 'SELECT':
+            data['explain'] = self._explain(connection, sql, params)
+        logger.warning('Slow query (%.1f ms)', duration * 1000, extra={'data': data})
+
+    def _explain(self, connection, sql, params):
+        # Run on the backend's cursor, beneath Django's execute wrappers: the
+        # EXPLAIN is not one of the request's queries, so neither this
+        # analyzer nor the request timings (core.instrumentation) count it.
+        try:
+            with connection.cursor() as wrapper:
+                cursor = wrapper.cursor
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                return [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+        except Exception as exc:
+            return [f'EXPLAIN failed: {exc}']
+
+
+def analyze_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection (see ``core.apps``); hands
+    the query to the analyzer active in this context, if any.
+    """
+    analyzer = _active.get()
+    if analyzer is None:
+        return execute(sql, params, many, context)
+    return analyzer(execute, sql, params, many, context)
+
+
+def _jsonable(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _jsonable(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_jsonable(value) for value in params]
+    if isinstance(params, (str, int, float, bool)):
+        return params
+    return str(params)
@@ -0,0 +1,145 @@
+"""
+Read replicas with read-your-writes stickiness.
+
+``ReplicaRouter`` sends writes to the primary (``default``) and reads to the
+aliases in ``REPLICA_DATABASES``, but only while a request has opted in:
+``ReplicaMiddleware`` does that for safe-method requests, so management
+commands, job workers and anything outside a request always use the primary.
+Within a request reads switch to the primary as soon as it writes or opens a
+transaction there, and one replica serves all of a request's reads.
+
+Replicas trail the primary, so a client that has just written would not see
+its own change on the next read. After a request that wrote, the client is
+pinned to the primary for ``REPLICA_PIN_SECONDS``, which should be longer than
+the replicas' worst replication lag. Pins are kept in the ``REPLICA_PIN_CACHE``
+cache, keyed by the JWT user id or the session; the cache has to be shared by
+every process serving the API (the default local-memory cache is only good
+for a single process).
+"""
+import base64
+import binascii
+import json
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .conf import perf_setting
+
+PIN_KEY_PREFIX = 'replica-pin:'
+
+
+class RoutingState:
+    """Per-request routing: the replica chosen for reads, if any, and whether it wrote."""
+
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+def use_replicas(replicas=None):
+    """
+    Let reads in the current context go to one of ``replicas`` (default:
+    ``REPLICA_DATABASES``). Returns a token for ``reset()``.
+    """
+    replicas = tuple(perf_setting('REPLICA_DATABASES') if replicas is None else replicas)
+    return _state.set(RoutingState(random.choice(replicas) if replicas else None))
+
+
+def use_primary():
+    """Send every query in the current context to the primary. Returns a token for ``reset()``."""
+    return _state.set(RoutingState())
+
+
+def reset(token):
+    _state.reset(token)
+
+
+def current_state():
+    return _state.get()
+
+
+class ReplicaRouter:
+    """Database router for one primary and any number of read replicas."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db is not None:
+            # Related objects come from the database their parent was read from.
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *perf_setting('REPLICA_DATABASES')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        return db not in perf_setting('REPLICA_DATABASES')
+
+
+# Pins
+
+def client_key(request):
+    """
+    The key pinning ``request``'s client to the primary: the user id claim of
+    its bearer token, else its session, else ``None``.
+
+    The token is not verified here, only decoded: a forged one can at worst
+    send some reads to the primary. Authentication proper happens in the view.
+    """
+    header = request.META.get(jwt_settings.AUTH_HEADER_NAME, '').split()
+    if len(header) == 2 and header[0] in jwt_settings.AUTH_HEADER_TYPES:
+        try:
+            payload = header[1].split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            user_id = claims[jwt_settings.USER_ID_CLAIM]
+        except (IndexError, KeyError, TypeError, ValueError, binascii.Error):
+            return None
+        return f'user:{user_id}'
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return f'session:{session_key}' if session_key else None
+
+
+def _pin_cache():
+    return caches[perf_setting('REPLICA_PIN_CACHE')]
+
+
+def is_pinned(key):
+    return key is not None and _pin_cache().get(PIN_KEY_PREFIX + key) is not None
+
+
+def pin(key):
+    """Keep ``key``'s reads on the primary for the next ``REPLICA_PIN_SECONDS``."""
+    if key is not None:
+        _pin_cache().set(PIN_KEY_PREFIX + key, 1, perf_setting('REPLICA_PIN_SECONDS'))
+
+
+async def ais_pinned(key):
+    return key is not None and await _pin_cache().aget(PIN_KEY_PREFIX + key) is not None
+
+
+async def apin(key):
+    if key is not None:
+        await _pin_cache().aset(PIN_KEY_PREFIX + key, 1, perf_setting('REPLICA_PIN_SECONDS'))
@@ -0,0 +1,194 @@
+"""
+The OpenAPI schema, generated once per code version instead of per request.
+
+``SpectacularAPIView`` introspects every view and serializer on each request
+and then renders the result, about half a second for the YAML document, all
+to produce the same bytes until the code changes. ``CachedSchemaView``
+serves them from a cache instead:
+
+* in memory, per process, as rendered bytes and their gzip, per format;
+* on disk, in ``PERFORMANCE['SCHEMA_CACHE_DIR']``, so new processes and the
+  other workers read the document rather than generate it again.
+  ``manage.py build_schema`` writes it at deploy time; otherwise the first
+  request that needs a format does.
+
+Both are keyed by ``schema_version()``: ``PERFORMANCE['SCHEMA_VERSION']`` if
+the deployment sets one (a release tag or commit), else a hash of the
+project's Python sources, the settings the schema depends on and the versions
+of the packages generating it. A new deploy therefore gets a new document and
+never serves a stale one.
+
+Responses carry a weak ``ETag`` of the version and format, so a client that
+has the document gets a ``304``, and are sent gzipped to clients accepting
+it. The Swagger and Redoc pages load the document from a URL with the
+version in it (``?v=``), which responses then mark as cacheable for good.
+
+Requests for another document than the default one (``?lang=``, an API
+version) are generated as before.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+from importlib.metadata import version as package_version
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from drf_spectacular.plumbing import set_query_parameters
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+
+from .conf import perf_setting
+
+VERSION_PARAM = 'v'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+PACKAGES = ('django', 'djangorestframework', 'drf-spectacular')
+
+_version = None
+_documents = {}
+_lock = threading.Lock()
+
+
+def schema_version():
+    """The key of the current schema: the configured one, else a source hash."""
+    global _version
+    if _version is None:
+        _version = perf_setting('SCHEMA_VERSION') or _source_hash()
+    return _version
+
+
+def _source_hash():
+    digest = hashlib.sha256()
+    base = Path(settings.BASE_DIR)
+    for path in sorted(base.rglob('*.py')):
+        digest.update(str(path.relative_to(base)).encode())
+        digest.update(path.read_bytes())
+    for name in PACKAGES:
+        digest.update(f'{name}=={package_version(name)}'.encode())
+    for name in ('REST_FRAMEWORK', 'SPECTACULAR_SETTINGS', 'INSTALLED_APPS'):
+        digest.update(repr(getattr(settings, name, None)).encode())
+    return digest.hexdigest()[:16]
+
+
+class SchemaDocument:
+    """One rendering of the schema: the bytes, gzipped too, and its ETag."""
+
+    def __init__(self, version, fmt, body, compressed):
+        self.etag = f'W/"{version}-{fmt}"'
+        self.body = body
+        self.compressed = compressed
+
+
+def get_document(renderer, media_type):
+    """
+    The schema rendered by ``renderer``, from memory, else from disk, else
+    generated and stored in both.
+    """
+    version = schema_version()
+    key = (version, renderer.format)
+    document = _documents.get(key)
+    if document is None:
+        with _lock:
+            document = _documents.get(key)
+            if document is None:
+                document = _load(version, renderer.format) or _build(version, renderer, media_type)
+                _documents[key] = document
+    return document
+
+
+def _path(version, fmt):
+    directory = perf_setting('SCHEMA_CACHE_DIR')
+    return None if directory is None else Path(directory) / f'schema-{version}.{fmt}.gz'
+
+
+def _load(version, fmt):
+    path = _path(version, fmt)
+    if path is None:
+        return None
+    try:
+        compressed = path.read_bytes()
+    except OSError:
+        return None
+    return SchemaDocument(version, fmt, gzip.decompress(compressed), compressed)
+
+
+def _build(version, renderer, media_type):
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    data = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+    body = renderer.render(data, media_type, {})
+    compressed = gzip.compress(body, mtime=0)
+    path = _path(version, renderer.format)
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so other processes never read half a file.
+        fd, temporary = tempfile.mkstemp(dir=path.parent, prefix='.schema-')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(compressed)
+        os.replace(temporary, path)
+    return SchemaDocument(version, renderer.format, body, compressed)
+
+
+def prune(keep):
+    """Delete the documents on disk of every version but ``keep``."""
+    directory = perf_setting('SCHEMA_CACHE_DIR')
+    if directory is None:
+        return 0
+    stale = [
+        path for path in Path(directory).glob('schema-*.gz')
+        if not path.name.startswith(f'schema-{keep}.')
+    ]
+    for path in stale:
+        path.unlink(missing_ok=True)
+    return len(stale)
+
+
+# No docstring: the schema describes this endpoint with SpectacularAPIView's.
+class CachedSchemaView(SpectacularAPIView):
+
+    def _get_schema_response(self, request):
+        if (
+            self.api_version or request.version or self._get_version_parameter(request)
+            or request.GET.get('lang') or self.custom_settings or self.urlconf or self.patterns
+        ):
+            # Not the document the cache holds.
+            return super()._get_schema_response(request)
+        document = get_document(request.accepted_renderer, request.accepted_media_type)
+
+        if document.etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(document.compressed, content_type=self._content_type(request))
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(document.body, content_type=self._content_type(request))
+        response['ETag'] = document.etag
+        response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        if request.GET.get(VERSION_PARAM) == schema_version():
+            response['Cache-Control'] = IMMUTABLE
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
+
+    @staticmethod
+    def _content_type(request):
+        charset = request.accepted_renderer.charset
+        media_type = request.accepted_media_type
+        return f'{media_type}; charset={charset}' if charset else media_type
+
+
+class _VersionedSchemaURLMixin:
+    """Load the schema from a URL naming its version, cacheable for good."""
+
+    def _get_schema_url(self, request):
+        return set_query_parameters(super()._get_schema_url(request), **{VERSION_PARAM: schema_version()})
+
+
+class CachedSwaggerView(_VersionedSchemaURLMixin, SpectacularSwaggerView):
+    pass
+
+
+class CachedRedocView(_VersionedSchemaURLMixin, SpectacularRedocView):
+    pass
@@ -0,0 +1,44 @@
+from django.contrib.contenttypes.models import ContentType
+from rest_framework import serializers
+
+from .models import AuditEvent
+
+
+class AuditQuerySerializer(serializers.Serializer):
+    """Query parameters of ``GET /audit/events/``; all optional, all ANDed"""
+    actor = serializers.IntegerField(min_value=1, required=False)
+    object_type = serializers.RegexField(
+        r'^\w+\.\w+$', required=False, help_text="'app_label.model', e.g. 'accounts.user'"
+    )
+    object_id = serializers.IntegerField(min_value=1, required=False)
+    action = serializers.CharField(max_length=40, required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate_object_type(self, value):
+        try:
+            return ContentType.objects.get_by_natural_key(*value.lower().split('.'))
+        except ContentType.DoesNotExist:
+            raise serializers.ValidationError(f"Unknown object type '{value}'.")
+
+    def validate(self, attrs):
+        if 'object_id' in attrs and 'object_type' not in attrs:
+            raise serializers.ValidationError({'object_type': ['Required with object_id.']})
+        return attrs
+
+
+class AuditEventSerializer(serializers.ModelSerializer):
+    actor = serializers.IntegerField(source='actor_id', read_only=True)
+    object_type = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AuditEvent
+        fields = ['id', 'created_at', 'action', 'actor', 'object_type', 'object_id', 'data']
+        read_only_fields = fields
+
+    def get_object_type(self, obj):
+        if obj.object_type_id is None:
+            return None
+        # Cached per process after the first lookup of each type.
+        content_type = ContentType.objects.get_for_id(obj.object_type_id)
+        return f'{content_type.app_label}.{content_type.model}'
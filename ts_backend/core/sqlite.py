@@ -0,0 +1,30 @@
+"""
+SQLite tuning for serving the API.
+
+With the default rollback journal a writer locks readers out while it
+commits, and a transaction that reads before it writes can fail with
+"database is locked" without waiting. The production profile in
+``settings.py`` combines:
+
+* the pragmas in ``SQLITE_PRAGMAS``, run on every new connection:
+  write-ahead logging (readers and the writer no longer block each other),
+  ``synchronous=NORMAL`` (in WAL mode this only fsyncs at checkpoints and
+  stays safe from corruption; a power cut can lose the last commits),
+  a busy timeout, a larger page cache and memory-mapped reads;
+* ``OPTIONS['transaction_mode'] = 'IMMEDIATE'``, so ``transaction.atomic()``
+  takes the write lock on ``BEGIN``. Every atomic block in the project writes,
+  and waiting for the lock up front, under the busy timeout, cannot deadlock
+  the way upgrading a read lock inside the transaction can;
+* ``CONN_MAX_AGE``, so the pragmas run once per connection, not per request.
+"""
+from .conf import perf_setting
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver applying ``SQLITE_PRAGMAS`` to SQLite connections."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = perf_setting('SQLITE_PRAGMAS')
+    # On the DB-API connection, so the pragmas do not count as request queries.
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
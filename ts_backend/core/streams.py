@@ -0,0 +1,183 @@
+"""
+Server-Sent Event streams, served next to Django rather than through it.
+
+Django's ASGI handler gives every request its own thread for sync code (the
+``MiddlewareMixin`` hooks, the async ORM) and keeps it, together with that
+thread's database connection, until the response is closed. A stream opened
+through it would pin a thread and a connection per idle client.
+
+``StreamRouter`` sits in front of the Django ASGI application and answers the
+stream URLs itself. The stream view authenticates and validates on the shared
+sync thread, returns an ``EventStream``, and from then on the client costs one
+parked coroutine and a broker subscription. Every other request goes to Django
+untouched.
+
+Stream views take a ``StreamRequest`` and return either an ``EventStream`` or
+an ordinary ``HttpResponse`` for errors, so ``authentication_required`` and
+``json_response`` from ``core.async_api`` work with them as they are.
+"""
+import asyncio
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from django.http.cookie import parse_cookie
+from django.utils.functional import SimpleLazyObject
+
+from .async_api import json_response
+from .conf import perf_setting
+from .encoding import json_dumps
+from .pubsub import get_broker
+
+
+class StreamRequest(HttpRequest):
+    """
+    An ``HttpRequest`` built from the ASGI scope with what a stream view and
+    the DRF authentication classes read: the query string, the headers, the
+    cookies, and the session and user the middleware would set, both loaded
+    on first use.
+    """
+
+    def __init__(self, scope):
+        super().__init__()
+        self.scope = scope
+        self.method = scope['method']
+        self.path = self.path_info = scope['path']
+        query_string = scope.get('query_string', b'').decode('latin-1')
+        self.GET = QueryDict(query_string)
+        self.META = {
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'QUERY_STRING': query_string,
+        }
+        for name, value in scope.get('headers', ()):
+            key = 'HTTP_' + name.decode('latin-1').upper().replace('-', '_')
+            self.META[key] = value.decode('latin-1')
+        self.COOKIES = parse_cookie(self.META.get('HTTP_COOKIE', ''))
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        self.session = session_store(self.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        self.user = SimpleLazyObject(lambda: auth.get_user(self))
+
+
+class EventStream:
+    """Return value of a stream view: relay ``channel`` to the client."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def relay(self, receive, send):
+        """
+        Send broker events on the channel as SSE messages until the client
+        disconnects, with a comment line every ``SSE_KEEPALIVE`` seconds so
+        proxies keep the connection open.
+        """
+        keepalive = perf_setting('SSE_KEEPALIVE')
+        subscription = get_broker().subscribe(self.channel)
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        pending = None
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    # Stop nginx from buffering the stream.
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            await _send_chunk(send, 'retry: 3000\n\n')
+            event_id = 0
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    (pending, disconnected), timeout=keepalive,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    break
+                if pending in done:
+                    event_id += 1
+                    await _send_chunk(send, _sse_message(pending.result(), event_id))
+                    pending = None
+                else:
+                    await _send_chunk(send, ': keepalive\n\n')
+        finally:
+            subscription.close()
+            disconnected.cancel()
+            if pending is not None:
+                pending.cancel()
+
+
+def event_stream(channel):
+    return EventStream(channel)
+
+
+def _sse_message(event, event_id):
+    data = json_dumps(event.get('data', {})).decode()
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def _send_chunk(send, text):
+    await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _send_response(response, send):
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in response.items()
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': response.content})
+
+
+class StreamRouter:
+    """
+    ASGI application that serves ``urlpatterns`` (``path()`` entries whose
+    views are stream views) and passes everything else to ``application``.
+    """
+
+    def __init__(self, application, urlpatterns):
+        self.application = application
+        self.urlpatterns = urlpatterns
+
+    def resolve(self, path):
+        for pattern in self.urlpatterns:
+            match = pattern.resolve(path.lstrip('/'))
+            if match:
+                return match
+        return None
+
+    async def __call__(self, scope, receive, send):
+        match = self.resolve(scope['path']) if scope['type'] == 'http' else None
+        if match is None:
+            return await self.application(scope, receive, send)
+
+        if scope['method'] != 'GET':
+            response = json_response({'detail': f'Method "{scope["method"]}" not allowed.'}, 405)
+            response['Allow'] = 'GET'
+            return await _send_response(response, send)
+
+        # Mirror Django's request_started / request_finished connection handling
+        # for the queries the view runs on the shared sync thread.
+        await sync_to_async(close_old_connections)()
+        try:
+            result = await match.func(StreamRequest(scope), *match.args, **match.kwargs)
+        finally:
+            await sync_to_async(close_old_connections)()
+
+        if isinstance(result, EventStream):
+            await result.relay(receive, send)
+        else:
+            await _send_response(result, send)
@@ -0,0 +1,679 @@
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import re
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+from drf_spectacular.drainage import GENERATOR_STATS
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import Department
+
+from . import audit, jobs, replicas, schema
+from .benchmarks.runner import check_budgets
+from .cache_backends import SQLiteCache
+from .caching import LocalCache, cached, get_cache, invalidate, invalidate_on_commit
+from .encoding import json_dumps, json_loads, msgpack_dumps, msgpack_loads
+from .lazy import lazy_view
+from .logformat import RotatingFileHandler
+from .middleware import ReplicaMiddleware
+from .models import AuditEvent, Job
+from .pubsub import RESYNC, LocalBroker
+from .querylog import NPlusOneError, QueryAnalyzer
+from .sqlite import configure_connection
+from .throttling import SQLiteBucketStore, parse_rate
+
+User = get_user_model()
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                           'LOCATION': 'core-tests'}}
+
+
+class BenchmarkBudgetTests(SimpleTestCase):
+    baseline = {'endpoints': {'entry-list': {'max_queries': 4, 'p90_ms': 20.0}}}
+
+    def result(self, queries=4, p90_ms=20.0):
+        return {'entry-list': {'queries': queries, 'p90_ms': p90_ms}}
+
+    def test_within_budget(self):
+        self.assertEqual(check_budgets(self.result(p90_ms=29.9), self.baseline, tolerance=0.25, slack_ms=5), [])
+
+    def test_more_queries_than_the_budget_fail(self):
+        [failure] = check_budgets(self.result(queries=5), self.baseline)
+
+        self.assertIn('5 queries exceeds budget of 4', failure)
+
+    def test_latency_over_tolerance_and_slack_fails(self):
+        [failure] = check_budgets(self.result(p90_ms=30.1), self.baseline, tolerance=0.25, slack_ms=5)
+
+        self.assertIn('p90 30.1ms exceeds baseline 20.0ms', failure)
+
+    def test_endpoints_not_run_are_skipped(self):
+        self.assertEqual(check_budgets({}, self.baseline), [])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class InstrumentationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_authenticate(self.user)
+
+    def test_responses_carry_server_timing(self):
+        response = self.client.get('/api/v1/users/me/')
+
+        phases = re.findall(r'(\w+);dur=', response['Server-Timing'])
+        self.assertEqual(phases, ['auth', 'perm', 'db', 'serialize', 'render', 'total'])
+
+    @override_settings(INTERNAL_IPS=[])
+    def test_metrics_are_served_to_staff_only(self):
+        self.client.get('/api/v1/users/me/')
+
+        self.assertEqual(self.client.get('/metrics/').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(self.user)
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'http_request_duration_seconds_bucket{route="user-me",method="GET"', response.content)
+
+
+class LogFileTests(SimpleTestCase):
+
+    def test_the_log_directory_is_created_with_the_first_record(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'logs' / 'queries.log'
+            handler = RotatingFileHandler(path, delay=True)
+            self.assertFalse(path.parent.exists())
+
+            handler.emit(logging.makeLogRecord({'msg': 'Slow query'}))
+            handler.close()
+
+            self.assertEqual(path.read_text(), 'Slow query\n')
+
+
+def department_names(request):
+    # One department query per user: the N+1 the analyzer should catch.
+    return JsonResponse({'names': [user.department.name for user in User.objects.order_by('pk')]})
+
+
+urlpatterns = [path('department-names/', department_names)]
+
+
+class StrictQueryAnalyzerTests(TestCase):
+
+    def setUp(self):
+        for index, name in enumerate(('NETWORK', 'CYBER_SECURITY', 'DEPARTMENT')):
+            department = Department.objects.create(name=name)
+            User.objects.create_user(f'user{index}', f'user{index}@example.com', 'pass', department=department)
+
+    def test_per_row_queries_raise(self):
+        with self.assertRaises(NPlusOneError):
+            with QueryAnalyzer(strict=True, threshold=3, slow_ms=0):
+                [user.department.name for user in User.objects.order_by('pk')]
+
+    def test_joined_rows_pass(self):
+        with QueryAnalyzer(strict=True, threshold=3, slow_ms=0) as analyzer:
+            [user.department.name for user in User.objects.select_related('department')]
+
+        self.assertEqual(analyzer.repeated(), [])
+
+    @override_settings(ROOT_URLCONF='core.tests')
+    def test_sees_the_queries_of_requests_made_within(self):
+        with self.assertRaises(NPlusOneError):
+            with QueryAnalyzer(strict=True, threshold=3, slow_ms=0):
+                self.client.get('/department-names/')
+
+
+class PubSubTests(SimpleTestCase):
+
+    async def test_events_reach_the_subscribers_of_their_channel(self):
+        broker = LocalBroker(queue_size=10)
+        subscription = broker.subscribe('entry:1')
+        other = broker.subscribe('entry:2')
+
+        self.assertEqual(broker.publish('entry:1', {'type': 'votes'}), 1)
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 1), {'type': 'votes'})
+        self.assertTrue(other.queue.empty())
+
+        subscription.close()
+        other.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+        self.assertEqual(broker.publish('entry:1', {'type': 'votes'}), 0)
+
+    async def test_a_reader_that_falls_behind_gets_a_resync(self):
+        broker = LocalBroker(queue_size=2)
+        subscription = broker.subscribe('entry:1')
+        for index in range(3):
+            broker.publish('entry:1', {'type': 'votes', 'data': index})
+        # Deliveries are scheduled on the loop; let them run.
+        await asyncio.sleep(0)
+
+        self.assertEqual(await subscription.get(), RESYNC)
+        self.assertTrue(subscription.queue.empty())
+        subscription.close()
+
+
+@jobs.task('core.tests.refresh', priority=1, coalesce_by='item_id')
+def refresh(item_id, reason=''):
+    pass
+
+
+@jobs.task('core.tests.report')
+def report(day):
+    pass
+
+
+class JobQueueTests(TestCase):
+
+    def test_enqueues_of_a_queued_key_are_merged(self):
+        job = refresh.enqueue(item_id=1, reason='first')
+
+        self.assertIsNone(jobs.enqueue(refresh, {'item_id': 1, 'reason': 'second'}, priority=5))
+        self.assertIsNone(jobs.enqueue(refresh, {'item_id': 1, 'reason': 'third'}, priority=2, delay=60))
+        job.refresh_from_db()
+        self.assertEqual(job.dedup_key, 'core.tests.refresh:1')
+        self.assertEqual(job.kwargs, {'item_id': 1, 'reason': 'third'})
+        self.assertEqual(job.priority, 5)
+        self.assertEqual(Job.objects.filter(task=refresh.name).count(), 1)
+
+    def test_enqueue_after_a_claim_queues_a_new_job(self):
+        job = refresh.enqueue(item_id=1)
+        self.assertEqual(jobs.claim('worker', 10), [job])
+
+        again = refresh.enqueue(item_id=1)
+
+        self.assertIsNotNone(again)
+        self.assertEqual(again.status, Job.QUEUED)
+
+    def test_tasks_without_coalesce_by_are_not_merged(self):
+        report.enqueue(day='monday')
+        report.enqueue(day='monday')
+
+        self.assertEqual(Job.objects.filter(task=report.name, dedup_key=None).count(), 2)
+
+    def test_claim_takes_due_jobs_highest_priority_first(self):
+        low = jobs.enqueue(report, {'day': 'monday'}, priority=0)
+        high = jobs.enqueue(report, {'day': 'tuesday'}, priority=9)
+        later = jobs.enqueue(report, {'day': 'wednesday'}, priority=9, delay=timedelta(hours=1))
+
+        claimed = jobs.claim('worker', 10)
+
+        self.assertEqual(claimed, [high, low])
+        self.assertTrue(all(job.status == Job.RUNNING and job.attempts == 1 for job in claimed))
+        self.assertEqual(jobs.claim('other', 10), [])
+        later.refresh_from_db()
+        self.assertEqual(later.status, Job.QUEUED)
+
+    def test_claim_respects_the_limit(self):
+        for day in ('monday', 'tuesday', 'wednesday'):
+            report.enqueue(day=day)
+
+        self.assertEqual(len(jobs.claim('worker', 2)), 2)
+        self.assertEqual(len(jobs.claim('worker', 2)), 1)
+
+    def test_enqueue_many_merges_into_queued_jobs(self):
+        existing = jobs.enqueue(refresh, {'item_id': 1}, priority=0, delay=60)
+
+        refresh.enqueue_many([{'item_id': 1}, {'item_id': 2}, {'item_id': 2}])
+
+        queued = Job.objects.filter(task=refresh.name, status=Job.QUEUED)
+        self.assertEqual(sorted(queued.values_list('dedup_key', flat=True)),
+                         ['core.tests.refresh:1', 'core.tests.refresh:2'])
+        existing.refresh_from_db()
+        self.assertEqual(existing.priority, refresh.priority)
+        self.assertLess(existing.run_at, existing.created_at + timedelta(seconds=60))
+
+    def test_prune_jobs_deletes_jobs_finished_before_the_retention(self):
+        now = timezone.now()
+        old = now - timedelta(days=20)
+        kept = [
+            Job.objects.create(task=report.name, status=Job.DONE, finished_at=now),
+            Job.objects.create(task=report.name, status=Job.QUEUED, run_at=old),
+            Job.objects.create(task=report.name, status=Job.RUNNING, locked_at=old),
+        ]
+        for finished in (Job.DONE, Job.FAILED, Job.DONE):
+            Job.objects.create(task=report.name, status=finished, finished_at=old)
+
+        with override_settings(PERFORMANCE={**settings.PERFORMANCE, 'JOBS_RETENTION_DAYS': 30}):
+            call_command('prune_jobs', stdout=StringIO())
+        self.assertEqual(Job.objects.count(), 6)
+        call_command('prune_jobs', '--batch-size', '1', stdout=StringIO())
+
+        self.assertEqual(sorted(Job.objects.values_list('pk', flat=True)), [job.pk for job in kept])
+
+
+class EncodingTests(SimpleTestCase):
+    data = {
+        'id': 7, 'title': 'Ünïcode   line', 'score': 1.5, 'ok': True, 'none': None,
+        'tags': ['dns', 'vpn'], 'big': 2 ** 40, 'negative': -300,
+        'created_at': datetime(2024, 5, 1, 12, 30, tzinfo=dt_timezone.utc),
+    }
+
+    def test_json_matches_drf(self):
+        self.assertEqual(json_dumps(self.data), JSONRenderer().render(self.data))
+
+    def test_json_round_trip_and_errors(self):
+        self.assertEqual(json_loads(b'{"a":[1,2]}'), {'a': [1, 2]})
+        with self.assertRaises(ValueError):
+            json_loads(b'{"a":')
+        with self.assertRaises(ValueError):
+            json_loads(b'NaN')
+
+    def test_msgpack_round_trip(self):
+        decoded = msgpack_loads(msgpack_dumps(self.data))
+
+        self.assertEqual(decoded, {**self.data, 'created_at': '2024-05-01T12:30:00Z'})
+
+    def test_msgpack_rejects_truncated_and_trailing_data(self):
+        packed = msgpack_dumps({'a': 'b'})
+
+        with self.assertRaises(ValueError):
+            msgpack_loads(packed[:-1])
+        with self.assertRaises(ValueError):
+            msgpack_loads(packed + b'\x01')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ContentNegotiationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+        Department.objects.create(name='NETWORK')
+        self.client.force_authenticate(self.user)
+
+    def test_msgpack_responses_carry_the_json_data(self):
+        as_json = self.client.get('/api/v1/departments/')
+        as_msgpack = self.client.get('/api/v1/departments/', HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(as_msgpack['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack_loads(as_msgpack.content), json.loads(as_json.content))
+        self.assertEqual(self.client.get('/api/v1/departments/?format=msgpack').content, as_msgpack.content)
+
+    def test_msgpack_request_bodies_are_parsed(self):
+        self.client.force_authenticate(None)
+        response = self.client.post('/api/v1/token/', {'username': 'user', 'password': 'pass'}, format='msgpack')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+
+    def test_malformed_bodies_are_rejected(self):
+        response = self.client.generic(
+            'PATCH', '/api/v1/profile/', b'\x81\xa1', content_type='application/msgpack'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def bearer(user_id):
+    """An ``Authorization`` header with a token for ``user_id``; only its claims are read."""
+    claims = base64.urlsafe_b64encode(json.dumps({'user_id': user_id}).encode()).decode().rstrip('=')
+    return f'Bearer header.{claims}.signature'
+
+
+REPLICA_PERFORMANCE = {**settings.PERFORMANCE, 'REPLICA_DATABASES': ('replica',)}
+
+
+@override_settings(CACHES=TEST_CACHES, PERFORMANCE=REPLICA_PERFORMANCE)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Routing decisions; no query runs, so no replica database is needed."""
+
+    def setUp(self):
+        cache.clear()
+        self.router = replicas.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, writes=False):
+        """The database ``request``'s reads go to, through ``ReplicaMiddleware``."""
+        routed = []
+
+        def view(request):
+            if writes:
+                self.router.db_for_write(Job)
+            routed.append(self.router.db_for_read(Job))
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(request)
+        return routed[0]
+
+    def test_reads_use_the_primary_unless_opted_in(self):
+        self.assertEqual(self.router.db_for_read(Job), 'default')
+        token = replicas.use_replicas()
+        try:
+            self.assertEqual(self.router.db_for_read(Job), 'replica')
+        finally:
+            replicas.reset(token)
+
+    def test_reads_after_a_write_use_the_primary(self):
+        token = replicas.use_replicas()
+        try:
+            self.assertEqual(self.router.db_for_write(Job), 'default')
+            self.assertEqual(self.router.db_for_read(Job), 'default')
+        finally:
+            replicas.reset(token)
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self.route(self.factory.get('/', HTTP_AUTHORIZATION=bearer(1))), 'replica')
+        self.assertEqual(self.route(self.factory.post('/', HTTP_AUTHORIZATION=bearer(1))), 'default')
+
+    def test_a_write_pins_its_client_to_the_primary(self):
+        self.route(self.factory.post('/', HTTP_AUTHORIZATION=bearer(1)), writes=True)
+
+        self.assertEqual(self.route(self.factory.get('/', HTTP_AUTHORIZATION=bearer(1))), 'default')
+        self.assertEqual(self.route(self.factory.get('/', HTTP_AUTHORIZATION=bearer(2))), 'replica')
+
+    def test_pins_expire(self):
+        with override_settings(PERFORMANCE={**REPLICA_PERFORMANCE, 'REPLICA_PIN_SECONDS': 0}):
+            self.route(self.factory.post('/', HTTP_AUTHORIZATION=bearer(1)), writes=True)
+
+        self.assertEqual(self.route(self.factory.get('/', HTTP_AUTHORIZATION=bearer(1))), 'replica')
+
+    def test_clients_are_keyed_by_token_user_or_session(self):
+        self.assertEqual(replicas.client_key(self.factory.get('/', HTTP_AUTHORIZATION=bearer(5))), 'user:5')
+        request = self.factory.get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'abc'
+        self.assertEqual(replicas.client_key(request), 'session:abc')
+        self.assertIsNone(replicas.client_key(self.factory.get('/', HTTP_AUTHORIZATION='Bearer garbage')))
+
+    def test_middleware_is_unused_without_replicas(self):
+        with override_settings(PERFORMANCE=settings.PERFORMANCE | {'REPLICA_DATABASES': ()}):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaMiddleware(lambda request: HttpResponse())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ReplicaDatabaseTests(TransactionTestCase):
+    """
+    Requests against a real replica: run with
+    ``manage.py test --settings=ts_backend.settings_replicas``, where a
+    second SQLite database mirrors the primary.
+    """
+    databases = {'default', 'replica'} if 'replica' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        if 'replica' not in settings.DATABASES:
+            self.skipTest('needs ts_backend.settings_replicas')
+        cache.clear()
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'pass')
+        Department.objects.create(name='NETWORK')
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def queries_on(self, alias, method, path, data=None):
+        with CaptureQueriesContext(connections[alias]) as context:
+            response = getattr(self.client, method)(path, data, content_type='application/json', **self.headers)
+        self.assertLess(response.status_code, 400)
+        return len(context.captured_queries)
+
+    def test_reads_use_the_replica_until_the_client_writes(self):
+        self.assertGreater(self.queries_on('replica', 'get', '/api/v1/departments/'), 0)
+
+        self.queries_on('default', 'patch', '/api/v1/profile/', {'first_name': 'Ada'})
+
+        self.assertEqual(self.queries_on('replica', 'get', '/api/v1/departments/'), 0)
+
+
+class SQLitePragmaTests(SimpleTestCase):
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        with tempfile.TemporaryDirectory() as directory:
+            raw = sqlite3.connect(Path(directory) / 'db.sqlite3')
+            wrapper = mock.Mock(vendor='sqlite', connection=raw)
+            pragmas = {'journal_mode': 'WAL', 'busy_timeout': 1234}
+            with override_settings(PERFORMANCE={**settings.PERFORMANCE, 'SQLITE_PRAGMAS': pragmas}):
+                configure_connection(sender=None, connection=wrapper)
+
+            self.assertEqual(raw.execute('PRAGMA journal_mode').fetchone(), ('wal',))
+            self.assertEqual(raw.execute('PRAGMA busy_timeout').fetchone(), (1234,))
+            raw.close()
+
+    def test_other_databases_are_left_alone(self):
+        wrapper = mock.Mock(vendor='postgresql')
+
+        configure_connection(sender=None, connection=wrapper)
+
+        wrapper.connection.execute.assert_not_called()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TaggedCacheTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_cached_values_last_until_a_tag_is_invalidated(self):
+        self.assertEqual(cached('value', self.compute, tags=['a', 'b'], timeout=300), 1)
+        self.assertEqual(cached('value', self.compute, tags=['a', 'b'], timeout=300), 1)
+
+        invalidate('b')
+
+        self.assertEqual(cached('value', self.compute, tags=['a', 'b'], timeout=300), 2)
+        invalidate('c')
+        self.assertEqual(cached('value', self.compute, tags=['a', 'b'], timeout=300), 2)
+
+    def test_invalidate_on_commit_waits_for_the_commit(self):
+        cached('value', self.compute, tags=['a'], timeout=300)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            invalidate_on_commit('a')
+            self.assertEqual(cached('value', self.compute, tags=['a'], timeout=300), 1)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(cached('value', self.compute, tags=['a'], timeout=300), 2)
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = SQLiteCache(Path(directory.name) / 'cache.sqlite3', {'OPTIONS': {'CULL_EVERY': 10}})
+
+    def test_culls_every_cull_every_writes_from_any_thread(self):
+        def write(thread):
+            for i in range(50):
+                self.cache.set(f'{thread}:{i}', i)
+
+        with mock.patch.object(SQLiteCache, '_cull') as cull, ThreadPoolExecutor(8) as pool:
+            list(pool.map(write, range(8)))
+
+        self.assertEqual(cull.call_count, 40)
+
+
+class LocalCacheTests(SimpleTestCase):
+
+    def test_entries_expire_and_the_least_recent_is_evicted(self):
+        local = LocalCache(maxsize=2)
+        with mock.patch('core.caching.time.monotonic', return_value=100.0):
+            local.set('a', 1, ttl=10)
+            local.set('b', 2, ttl=10)
+            local.get('a')
+            local.set('c', 3, ttl=10)
+            self.assertEqual((local.get('a'), local.get('b'), local.get('c')), (1, None, 3))
+        with mock.patch('core.caching.time.monotonic', return_value=111.0):
+            self.assertIsNone(local.get('a'))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AuditTests(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.user = User.objects.create_user('user', 'user@example.com', 'pass')
+
+    def test_events_are_buffered_until_commit_and_flushed_in_a_batch(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            audit.record('user.verified', self.user, actor=self.admin, source='test')
+            audit.record_many('user.deactivated', User, [self.user.pk, self.admin.pk])
+        audit.flush()
+        self.assertFalse(AuditEvent.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        audit.flush()
+
+        events = AuditEvent.objects.order_by('id')
+        self.assertEqual(
+            [(event.action, event.object_id, event.actor_id) for event in events],
+            [('user.verified', self.user.pk, self.admin.pk),
+             ('user.deactivated', self.user.pk, None), ('user.deactivated', self.admin.pk, None)],
+        )
+        self.assertEqual(events[0].data, {'source': 'test'})
+        self.assertEqual(events[0].object_type.model, 'user')
+
+    def test_events_are_queried_by_actor_and_object_newest_first(self):
+        now = timezone.now()
+        for minutes, actor in ((3, self.admin), (2, self.user), (1, self.admin)):
+            AuditEvent.objects.create(
+                created_at=now - timedelta(minutes=minutes), action='user.updated', actor=actor,
+            )
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get('/api/v1/audit/events/', {'actor': self.admin.pk, 'page_size': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [newest] = response.data['results']
+        self.assertEqual(newest['actor'], self.admin.pk)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_the_query_api_is_for_admins(self):
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(self.client.get('/api/v1/audit/events/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_prune_audit_deletes_old_events(self):
+        old = AuditEvent.objects.create(created_at=timezone.now() - timedelta(days=40), action='old')
+        recent = AuditEvent.objects.create(created_at=timezone.now(), action='recent')
+
+        call_command('prune_audit', '--older-than', '30', '--batch-size', '1', stdout=StringIO())
+
+        self.assertEqual(list(AuditEvent.objects.all()), [recent])
+        self.assertFalse(AuditEvent.objects.filter(pk=old.pk).exists())
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = SQLiteBucketStore(Path(directory.name) / 'throttle.sqlite3')
+
+    def take(self, at, key='client'):
+        with mock.patch('core.throttling.time.time', return_value=at):
+            return self.store.take(key, capacity=2, rate=1.0)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('5/minute'), (5, 60))
+        self.assertEqual(parse_rate('100/hour'), (100, 3600))
+        self.assertEqual(parse_rate('1/s'), (1, 1))
+
+    def test_capacity_is_spent_then_refilled_over_time(self):
+        self.assertEqual([self.take(1000.0), self.take(1000.0)], [0, 0])
+        self.assertAlmostEqual(self.take(1000.0), 1.0)
+        self.assertAlmostEqual(self.take(1000.5), 0.5)
+        self.assertEqual(self.take(1001.0), 0)
+        self.assertGreater(self.take(1001.0), 0)
+
+    def test_buckets_are_per_key_and_cleared(self):
+        self.take(1000.0)
+        self.take(1000.0)
+
+        self.assertEqual(self.take(1000.0, key='other'), 0)
+        self.store.clear()
+        self.assertEqual(self.take(1000.0), 0)
+
+
+class SchemaCacheTests(TestCase):
+    url = '/api/v1/schema/'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        overrides = override_settings(
+            PERFORMANCE={**settings.PERFORMANCE, 'SCHEMA_VERSION': 'v1', 'SCHEMA_CACHE_DIR': self.directory},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Generation warnings are the spectacular command's to report.
+        self.enterContext(GENERATOR_STATS.silence())
+        for patcher in (mock.patch.object(schema, '_version', None), mock.patch.object(schema, '_documents', {})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_serves_the_document_with_an_etag(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('W/"v1-'))
+        self.assertIn(b'openapi:', response.content)
+        self.assertEqual(len(list(self.directory.glob('schema-v1.*.gz'))), 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_gzipped_for_clients_accepting_it(self):
+        plain = self.client.get(self.url)
+        compressed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+    def test_versioned_urls_are_cacheable_for_good(self):
+        self.assertNotIn('Cache-Control', self.client.get(self.url))
+        self.assertEqual(self.client.get(self.url, {'v': 'v1'})['Cache-Control'], schema.IMMUTABLE)
+        # The page embeds the URL as JSON, '=' escaped.
+        self.assertContains(self.client.get('/api/v1/schema/swagger-ui/'), '/api/v1/schema/?v\\u003Dv1')
+
+    def test_documents_are_read_back_from_disk(self):
+        first = self.client.get(self.url)
+        schema._documents.clear()
+
+        with mock.patch.object(schema, '_build', side_effect=AssertionError('generated again')):
+            self.assertEqual(self.client.get(self.url).content, first.content)
+
+    def test_build_schema_writes_every_format_and_prunes_old_versions(self):
+        (self.directory / 'schema-v0.openapi.gz').write_bytes(b'')
+
+        call_command('build_schema', stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(len(list(self.directory.glob('schema-v1.*.gz'))), 2)
+        self.assertFalse((self.directory / 'schema-v0.openapi.gz').exists())
+
+
+class LazyViewTests(SimpleTestCase):
+
+    def test_the_view_is_imported_on_first_use(self):
+        view = lazy_view('core.schema.CachedSchemaView')
+
+        self.assertIsNone(view._view)
+        self.assertEqual((view.__module__, view.__name__), ('core.schema', 'CachedSchemaView'))
+        self.assertIs(view.cls, schema.CachedSchemaView)
+        self.assertIsNotNone(view._view)
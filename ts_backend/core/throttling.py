@@ -0,0 +1,175 @@
+"""
+Token-bucket throttling shared by every process on the host.
+
+DRF's ``SimpleRateThrottle`` keeps a list of request times per client in the
+cache: each check reads the whole list, trims it and writes it back. That
+costs time and space in proportion to the rate, and two workers checking the
+same client at once both read the old list, so one of the two requests is
+never counted. The throttles here keep one bucket per client and scope
+instead: ``capacity`` tokens (the number in ``'5/minute'``), refilled
+continuously at ``capacity`` per period, one taken per request. A bucket is
+one fixed-size row, and checking it is a single ``INSERT ... ON CONFLICT DO
+UPDATE ... RETURNING`` statement that refills and takes under SQLite's write
+lock, so concurrent workers never lose a request between them.
+
+The buckets live in the SQLite file ``PERFORMANCE['THROTTLE_LOCATION']``,
+separate from the cache so that clearing the cache does not reset them. Any
+other store with ``take()`` and ``clear()`` can be plugged in through
+``PERFORMANCE['THROTTLE_STORE']``.
+
+Views opt in with ``ScopedBucketThrottle`` and a ``throttle_scope``, whose
+rate is looked up in DRF's ``DEFAULT_THROTTLE_RATES``, so an endpoint gets
+its own limit and bucket.
+"""
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .conf import perf_setting
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS throttle_buckets ('
+    'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS throttle_buckets_full_at ON throttle_buckets (full_at)',
+)
+# A process may reach the write lock after one that read the clock later:
+# time never runs backwards for a bucket, or the refill would be counted twice.
+_NOW = 'MAX(updated, :now)'
+# The tokens in the bucket now: what was left, plus the refill since.
+_LEVEL = f'MIN(:capacity, tokens + ({_NOW} - updated) * :rate)'
+_TAKE = (
+    'INSERT INTO throttle_buckets (key, tokens, updated, full_at) '
+    'VALUES (:key, :capacity - 1, :now, :now + 1 / :rate) '
+    'ON CONFLICT (key) DO UPDATE SET '
+    f'tokens = {_LEVEL} - 1, updated = {_NOW}, '
+    f'full_at = {_NOW} + (:capacity - {_LEVEL} + 1) / :rate '
+    f'WHERE {_LEVEL} >= 1 '
+    'RETURNING tokens'
+)
+
+
+def parse_rate(rate):
+    """``'5/minute'`` -> ``(5, 60)``: requests, per this many seconds."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class SQLiteBucketStore:
+    """Token buckets in one SQLite file, in WAL mode like ``SQLiteCache``."""
+
+    def __init__(self, path, cull_every=100):
+        self._path = str(path)
+        self._cull_every = cull_every
+        # Atomic, like SQLiteCache's write count.
+        self._takes = itertools.count(1)
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        pid, db = getattr(self._local, 'db', (None, None))
+        if pid != os.getpid():
+            # One connection per thread, and a new one after a fork.
+            db = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode = WAL')
+            db.execute('PRAGMA synchronous = NORMAL')
+            for statement in _SCHEMA:
+                db.execute(statement)
+            self._local.db = (os.getpid(), db)
+        return db
+
+    def take(self, key, capacity, rate):
+        """
+        Take a token from ``key``'s bucket of ``capacity`` tokens, refilled at
+        ``rate`` per second. Returns 0 if there was one, else the seconds
+        until there is.
+        """
+        now = time.time()
+        params = {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+        db = self._db
+        taken = db.execute(_TAKE, params).fetchone() is not None
+        if next(self._takes) % self._cull_every == 0:
+            # A bucket that has filled up again is as good as none.
+            db.execute('DELETE FROM throttle_buckets WHERE full_at <= ?', (now,))
+        if taken:
+            return 0
+        row = db.execute(f'SELECT {_LEVEL} FROM throttle_buckets WHERE key = :key', params).fetchone()
+        level = 0 if row is None else row[0]
+        return max(0.0, (1 - level) / rate)
+
+    def clear(self):
+        self._db.execute('DELETE FROM throttle_buckets')
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store configured by ``PERFORMANCE['THROTTLE_STORE']``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(perf_setting('THROTTLE_STORE'))(perf_setting('THROTTLE_LOCATION'))
+    return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class: ``get_key`` picks the bucket, the rate of ``scope`` sizes it.
+    Requests it returns ``None`` for are not throttled.
+    """
+    scope = None
+    THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+
+    def __init__(self):
+        self.wait_seconds = 0
+
+    def get_key(self, request, view):
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def get_rate(self):
+        if self.scope not in self.THROTTLE_RATES:
+            raise ValueError(f"No throttle rate set for scope '{self.scope}'.")
+        return self.THROTTLE_RATES[self.scope]
+
+    def allow_request(self, request, view):
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        rate = self.get_rate()
+        if rate is None:
+            return True
+        capacity, period = parse_rate(rate)
+        self.wait_seconds = get_store().take(f'{self.scope}:{key}', capacity, capacity / period)
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ScopedBucketThrottle(TokenBucketThrottle):
+    """
+    Requests by user, or by address when anonymous, at the rate of the view's
+    ``throttle_scope``.
+    """
+
+    def get_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None)
+        if self.scope is None:
+            return True
+        return super().allow_request(request, view)
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework import generics
+from rest_framework.permissions import IsAdminUser
+
+from . import audit
+from .metrics import registry
+from .pagination import KeysetPagination
+from .serializers import AuditEventSerializer, AuditQuerySerializer
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint for this worker's request metrics.
+
+    Open to addresses in ``INTERNAL_IPS`` (where the scraper runs) and to
+    staff users; everyone else gets a 403.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class AuditEventPagination(KeysetPagination):
+    page_size = 50
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
+
+
+class AuditEventListView(generics.ListAPIView):
+    """
+    The audit trail, newest first; admins only.
+
+    Filter with ``?actor=<user id>``, ``?object_type=accounts.user&object_id=``,
+    ``?action=``, and ``?since=``/``?until=`` (ISO 8601); each combination is
+    read off an index of ``core.AuditEvent``.
+    """
+    serializer_class = AuditEventSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = AuditEventPagination
+
+    def get_queryset(self):
+        query = AuditQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        return audit.events(**query.validated_data)
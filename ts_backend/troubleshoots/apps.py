@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TroubleshootsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'troubleshoots'
+
+    def ready(self):
+        from . import caching, expertise
+
+        caching.register()
+        expertise.register()
@@ -0,0 +1,210 @@
+"""
+The archive tier: ARCHIVED entries moved out of the live tables.
+
+Entries archived long ago are rarely read, yet they stay in every index of
+the live tables, every search and every list query. Once an entry has been
+ARCHIVED for ``PERFORMANCE['ARCHIVE_AFTER_DAYS']`` (counted from
+``updated_at``, which archiving sets), it is moved to ``ArchivedEntry`` with
+its tags, revisions, attachments, votes and comments (``ArchivedRevision``
+and so on), in batches of ``ARCHIVE_BATCH_SIZE``:
+
+* ``archive_batch()`` moves one batch in one transaction, table by table,
+  with ``INSERT INTO archive SELECT ... FROM live WHERE ... IN (ids)`` and a
+  ``DELETE`` for each: a dozen statements per batch however many rows it
+  holds, with no rows loaded into Python and no delete signals. Rows keep
+  their ids, so links to an entry keep working once it is restored;
+* ``manage.py archive_entries`` moves everything eligible, batch by batch;
+  the ``archive_entries`` task does the same in the background, one batch
+  per job, and queues the next sweep ``ARCHIVE_INTERVAL`` seconds later;
+* ``restore()`` moves entries back, marking them updated now so the next
+  sweep doesn't take them again. Slugs taken in the meantime are freed by
+  renaming the restored entry's to ``<slug>-<id>``.
+
+Reads go to the live tier unless a request asks for archives too with
+``?include_archived=true``: entry details and comment threads then fall back
+to the archive, and lists and searches page through both tiers at once
+(``TieredResults``). Expertise scores and tag usage counts include archived
+entries, so moving them changes neither.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Value
+from django.utils import timezone
+
+from core import audit
+from core.caching import invalidate_on_commit
+from core.conf import perf_setting
+
+from .caching import entry_tag
+from .models import (
+    ArchivedAttachment, ArchivedComment, ArchivedEntry, ArchivedRevision, ArchivedVote,
+    Attachment, Comment, EntryRevision, TroubleshootingEntry, Vote,
+)
+
+INCLUDE_PARAM = 'include_archived'
+
+# (live model, archive model, the field linking each to the entry), in the
+# order rows are copied; they are deleted in reverse.
+TIERS = (
+    (TroubleshootingEntry, ArchivedEntry, 'id', 'id'),
+    (TroubleshootingEntry.tags.through, ArchivedEntry.tags.through, 'troubleshootingentry', 'archivedentry'),
+    (EntryRevision, ArchivedRevision, 'entry', 'entry'),
+    (Attachment, ArchivedAttachment, 'troubleshooting_entry', 'troubleshooting_entry'),
+    (Vote, ArchivedVote, 'troubleshooting_entry', 'troubleshooting_entry'),
+    (Comment, ArchivedComment, 'troubleshooting_entry', 'troubleshooting_entry'),
+)
+
+
+def archives_requested(request):
+    return request.query_params.get(INCLUDE_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def eligible(older_than_days=None):
+    """Live entries ARCHIVED more than ``older_than_days`` days ago."""
+    if older_than_days is None:
+        older_than_days = perf_setting('ARCHIVE_AFTER_DAYS')
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return TroubleshootingEntry.objects.filter(status='ARCHIVED', updated_at__lt=cutoff)
+
+
+def archive_batch(older_than_days=None, batch_size=None):
+    """Move the next batch of eligible entries to the archive; returns their ids."""
+    batch_size = batch_size or perf_setting('ARCHIVE_BATCH_SIZE')
+    with transaction.atomic():
+        ids = list(
+            eligible(older_than_days).select_for_update()
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            _move(ids, to_archive=True, values={'archived_at': timezone.now()})
+            audit.record_many('entry.moved_to_archive', TroubleshootingEntry, ids)
+            invalidate_on_commit(*(entry_tag(entry_id) for entry_id in ids))
+    return ids
+
+
+def restore(ids, actor=None):
+    """Move the archived entries of ``ids`` back to the live tier; returns the ids moved."""
+    with transaction.atomic():
+        ids = list(
+            ArchivedEntry.objects.select_for_update().filter(pk__in=ids)
+            .order_by('id').values_list('id', flat=True)
+        )
+        if ids:
+            _free_slugs(ids)
+            _move(ids, to_archive=False, values={'updated_at': timezone.now()})
+            audit.record_many('entry.restored', TroubleshootingEntry, ids, actor=actor)
+            invalidate_on_commit(*(entry_tag(entry_id) for entry_id in ids))
+    return ids
+
+
+def _free_slugs(ids):
+    """Rename the slugs of archived ``ids`` that live entries have taken since."""
+    taken = ArchivedEntry.objects.filter(
+        pk__in=ids, slug__in=TroubleshootingEntry.objects.values('slug')
+    ).values_list('id', 'slug')
+    for entry_id, slug in taken:
+        suffix = f'-{entry_id}'
+        ArchivedEntry.objects.filter(pk=entry_id).update(slug=slug[:220 - len(suffix)] + suffix)
+
+
+def _move(ids, to_archive, values):
+    """Copy the rows of entries ``ids`` to the other tier, then delete them; ``values`` set entry columns."""
+    moves = []
+    for live, archived, live_key, archived_key in TIERS:
+        source, target = (live, archived) if to_archive else (archived, live)
+        source_key, target_key = (live_key, archived_key) if to_archive else (archived_key, live_key)
+        moves.append((source, target, _column(source, source_key), _column(target, target_key)))
+
+    with connection.cursor() as cursor:
+        for index, (source, target, source_key, target_key) in enumerate(moves):
+            _copy(cursor, source, target, source_key, target_key, ids, values if index == 0 else {})
+        for source, _, source_key, _ in reversed(moves):
+            cursor.execute(
+                f'DELETE FROM {_quote(source._meta.db_table)} WHERE {_quote(source_key)} IN ({_placeholders(ids)})',
+                ids,
+            )
+
+
+def _copy(cursor, source, target, source_key, target_key, ids, values):
+    """
+    ``INSERT INTO target SELECT ... FROM source`` for the rows whose
+    ``source_key`` is in ``ids``: columns by name, ``source_key`` into
+    ``target_key``, and ``values`` (by column) as parameters. Target columns
+    the source doesn't have are left to their default.
+    """
+    source_columns = {field.column for field in source._meta.concrete_fields}
+    targets, selects, params = [], [], []
+    for field in target._meta.concrete_fields:
+        column = field.column
+        if column in values:
+            selects.append('%s')
+            params.append(field.get_db_prep_save(values[column], connection))
+        elif column == target_key:
+            selects.append(_quote(source_key))
+        elif column in source_columns:
+            selects.append(_quote(column))
+        else:
+            continue
+        targets.append(_quote(column))
+    cursor.execute(
+        f'INSERT INTO {_quote(target._meta.db_table)} ({", ".join(targets)}) '
+        f'SELECT {", ".join(selects)} FROM {_quote(source._meta.db_table)} '
+        f'WHERE {_quote(source_key)} IN ({_placeholders(ids)})',
+        [*params, *ids],
+    )
+
+
+def _column(model, field_name):
+    return model._meta.get_field(field_name).column
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+class TieredResults:
+    """
+    The live and archived results of a list, paginated as one list.
+
+    ``keys`` are the two tiers' filtered and ordered querysets, ``querysets``
+    the two querysets to load result rows from, with the annotations and
+    prefetches the response needs. A page is one ``UNION ALL`` of the tiers'
+    ids and sort columns, ordered and sliced by the database, then its rows
+    are loaded by id, one query per tier: a deep page costs no more than the
+    first, beyond the database skipping key rows.
+    """
+
+    def __init__(self, keys, querysets):
+        self.keys = keys
+        self.querysets = querysets
+
+    def count(self):
+        return sum(keys.count() for keys in self.keys)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        live = self.keys[0]
+        # The live tier's ordering, then the id, unique across both tiers.
+        ordering = [*(live.query.order_by or live.model._meta.ordering), 'id']
+        columns = list(dict.fromkeys(['id', *(name.lstrip('-') for name in ordering)]))
+        live_keys, archived_keys = (
+            keys.order_by().annotate(tier=Value(tier)).values_list('tier', *columns)
+            for tier, keys in enumerate(self.keys)
+        )
+        page = list(live_keys.union(archived_keys, all=True).order_by(*ordering)[key])
+
+        loaded = {}
+        for tier, queryset in enumerate(self.querysets):
+            ids = [row[1] for row in page if row[0] == tier]
+            if ids:
+                loaded.update(((tier, row.pk), row) for row in queryset.filter(pk__in=ids))
+        return [loaded[row[0], row[1]] for row in page if (row[0], row[1]) in loaded]
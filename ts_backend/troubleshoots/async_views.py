@@ -0,0 +1,134 @@
+"""
+Async read endpoints for troubleshooting entries.
+
+These serve the same URLs and payloads as the list/retrieve actions of
+``TroubleshootingEntryViewSet`` when the project runs under ASGI (see
+``ts_backend/asgi_urls.py``). Everything a serializer needs is loaded up front
+with the async ORM, so serialization itself never touches the database.
+
+``entry_events`` is the live stream of changes to one entry, served by
+``core.streams.StreamRouter`` under ASGI only.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from django.db.models import aprefetch_related_objects
+
+from core.async_api import (
+    api_response,
+    async_read_view,
+    filter_queryset,
+    invalid_page,
+    json_response,
+    authentication_required,
+    paginate,
+)
+from core.fieldsets import field_requested, optimize_queryset, query_plan, selection_from_request
+from core.streams import event_stream
+from .models import TroubleshootingEntry, Vote, Comment
+from .serializers import (
+    TroubleshootingEntryListSerializer,
+    TroubleshootingEntryDetailSerializer,
+)
+from .caching import active_categories
+from .events import entry_channel
+from .views import TroubleshootingEntryViewSet, annotate_entries, group_subcategories
+
+
+async def category_children(selection):
+    """
+    Load every active category once and return {parent_id: [children]}, or
+    ``None`` when the response has no subcategories.
+    """
+    if not field_requested(selection, 'category', 'subcategories'):
+        return None
+    return group_subcategories(await sync_to_async(active_categories)())
+
+
+@async_read_view
+@authentication_required
+async def entry_list(request):
+    """Async ``GET /entries/``, including ``?search=``, ``?fields=``, filters and ordering."""
+    selection = selection_from_request(request)
+    queryset = annotate_entries(
+        optimize_queryset(
+            TroubleshootingEntry.objects.all(), TroubleshootingEntryListSerializer, **selection
+        ),
+        request.user, selection,
+    )
+    queryset = await filter_queryset(TroubleshootingEntryViewSet, request, queryset)
+    try:
+        (entries, envelope), children = await asyncio.gather(
+            paginate(request, queryset), category_children(selection)
+        )
+    except InvalidPage:
+        return invalid_page(request)
+
+    serializer = TroubleshootingEntryListSerializer(
+        entries, many=True,
+        context={'request': request, 'category_children': children},
+        **selection
+    )
+    return api_response(request, {**envelope, 'results': serializer.data})
+
+
+async def _comments_count(entry):
+    entry.comments_count_annotation = await Comment.objects.filter(
+        troubleshooting_entry=entry, is_deleted=False
+    ).acount()
+
+
+async def _user_vote(entry, user):
+    entry.user_vote_annotation = await Vote.objects.filter(
+        troubleshooting_entry=entry, user=user
+    ).values_list('vote_type', flat=True).afirst()
+
+
+@async_read_view
+@authentication_required
+async def entry_detail(request, pk):
+    """Async ``GET /entries/<pk>/`` with attachments and revisions."""
+    selection = selection_from_request(request)
+    plan = query_plan(TroubleshootingEntryDetailSerializer, TroubleshootingEntry, **selection)
+    try:
+        entry = await plan.apply(TroubleshootingEntry.objects.all(), prefetch=False).aget(pk=pk)
+    except (TroubleshootingEntry.DoesNotExist, ValueError):
+        return api_response(
+            request, {'detail': 'No TroubleshootingEntry matches the given query.'}, 404
+        )
+
+    # Independent lookups, issued together.
+    lookups = [
+        aprefetch_related_objects([entry], *plan.prefetch_related),
+        category_children(selection),
+    ]
+    if field_requested(selection, 'comments_count'):
+        lookups.append(_comments_count(entry))
+    if field_requested(selection, 'user_vote'):
+        lookups.append(_user_vote(entry, request.user))
+    _, children, *_ = await asyncio.gather(*lookups)
+
+    serializer = TroubleshootingEntryDetailSerializer(
+        entry,
+        context={
+            'request': request,
+            'category_children': children,
+        },
+        **selection
+    )
+    return api_response(request, serializer.data)
+
+
+@authentication_required
+async def entry_events(request, pk):  # request is a core.streams.StreamRequest
+    """
+    ``GET /entries/<pk>/events/``: Server-Sent Events for one entry.
+
+    Events are ``comment.created``, ``comment.updated``, ``comment.deleted``,
+    ``votes`` and ``review`` (see ``troubleshoots.events``), plus ``resync``
+    when the client fell behind and should refetch the detail.
+    """
+    if not await TroubleshootingEntry.objects.filter(pk=pk).aexists():
+        return json_response({'detail': 'No TroubleshootingEntry matches the given query.'}, 404)
+    return event_stream(entry_channel(pk))
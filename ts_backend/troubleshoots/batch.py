@@ -0,0 +1,469 @@
+"""
+Batch writes: many entry, vote and comment operations in one request.
+
+``POST /batch/`` takes ``{"operations": [...], "atomic": false}``. Each
+operation is ``{"op": "create" | "update", "type": "entry" | "vote" |
+"comment", "id": <pk, updates only>, "data": {...}}`` where ``data`` is what
+the single-object endpoint takes; updates are partial, like ``PATCH``. Votes
+are only created and, like ``POST /entries/<id>/vote/``, creating one changes
+the user's existing vote; a batch votes at most once per entry.
+
+The batch is validated as a whole, with one query per kind of object the
+operations refer to (categories, entries, comments, the user's votes, entry
+slugs) rather than one per operation, then applied in a single transaction:
+``bulk_create``/``bulk_update`` per model (votes are changed with one
+``UPDATE`` per vote type), one ``UPDATE`` recounting the upvotes of every
+voted entry, one usage recount job per tag touched and one expertise
+recompute job per user whose expertise changed. Entry events are published
+together, with one cache invalidation for all the entries they touch. The number of
+queries depends on the kinds of operations in a batch and the users they
+touch, not on how many there are.
+
+Invalid operations are reported in the per-item results and the others are
+applied, unless ``atomic`` is set: then any invalid operation rejects the
+whole batch. Operations cannot refer to objects created in the same batch.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import slugify
+from rest_framework import serializers, status
+
+from core import audit
+from core.caching import invalidate_on_commit
+
+from . import events, expertise
+from .caching import entry_tag
+from .models import Category, Comment, EntryRevision, Tag, TroubleshootingEntry, Vote
+from .serializers import (
+    CommentCreateUpdateSerializer,
+    TroubleshootingEntryCreateUpdateSerializer,
+    VoteCreateUpdateSerializer,
+)
+from .tasks import recount_tag_usage
+
+MAX_OPERATIONS = 500
+
+OPERATIONS = {
+    ('create', 'entry'), ('update', 'entry'),
+    ('create', 'vote'),
+    ('create', 'comment'), ('update', 'comment'),
+}
+
+EntryTag = TroubleshootingEntry.tags.through
+ENTRY_TAG_SOURCE = f'{TroubleshootingEntry.tags.field.m2m_field_name()}_id'
+
+
+class LookupRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    ``PrimaryKeyRelatedField`` resolving ids from ``context['lookups'][lookup]``,
+    loaded once for the whole batch, instead of with a query per value.
+    """
+
+    def __init__(self, lookup, **kwargs):
+        self.lookup = lookup
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.context['lookups'][self.lookup][int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BatchEntrySerializer(TroubleshootingEntryCreateUpdateSerializer):
+    category = LookupRelatedField('categories', queryset=Category.objects.all())
+
+
+class BatchVoteSerializer(VoteCreateUpdateSerializer):
+    troubleshooting_entry = LookupRelatedField('entries', queryset=TroubleshootingEntry.objects.all())
+
+
+class BatchCommentSerializer(CommentCreateUpdateSerializer):
+    troubleshooting_entry = LookupRelatedField('entries', queryset=TroubleshootingEntry.objects.all())
+    parent = LookupRelatedField(
+        'comments', queryset=Comment.objects.all(), required=False, allow_null=True
+    )
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """Request body of ``POST /batch/``; the operations are checked one by one."""
+    operations = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_OPERATIONS
+    )
+    atomic = serializers.BooleanField(default=False)
+
+
+class Operation:
+    """One item of a batch and, once known, its result."""
+
+    def __init__(self, index, raw):
+        self.index = index
+        self.op = raw.get('op')
+        self.type = raw.get('type')
+        self.pk = raw.get('id')
+        self.data = raw.get('data')
+        self.instance = None
+        self.validated = None
+        self.result = None
+
+    def fail(self, code, errors):
+        self.result = {'index': self.index, 'status': code, 'errors': errors}
+
+    def succeed(self, code, **data):
+        self.result = {'index': self.index, 'status': code, **data}
+
+
+def _ids(values):
+    """The distinct values that can be primary keys, as ints."""
+    ids = set()
+    for value in values:
+        if isinstance(value, bool):
+            continue
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            continue
+        if 0 < value < 2 ** 63:
+            ids.add(value)
+    return ids
+
+
+class BatchWriter:
+    """Validate and apply the operations of one batch on behalf of ``user``."""
+
+    def __init__(self, user):
+        self.user = user
+        self.lookups = {'categories': {}, 'entries': {}, 'comments': {}, 'votes': {}}
+        context = {'lookups': self.lookups}
+        self.serializers = {
+            (kind, partial): serializer_class(context=context, partial=partial)
+            for kind, serializer_class in (
+                ('entry', BatchEntrySerializer),
+                ('vote', BatchVoteSerializer),
+                ('comment', BatchCommentSerializer),
+            )
+            for partial in (False, True)
+        }
+
+    def run(self, operations, atomic=False):
+        """Returns ``(results, applied)``, results in the order of ``operations``."""
+        items = [Operation(index, raw) for index, raw in enumerate(operations)]
+        for item in items:
+            self._check(item)
+        self._load([item for item in items if item.result is None])
+        for item in items:
+            if item.result is None:
+                self._validate(item)
+        self._check_slugs([
+            item for item in items
+            if item.result is None and (item.op, item.type) == ('create', 'entry')
+        ])
+        self._check_votes([item for item in items if item.result is None and item.type == 'vote'])
+
+        valid = [item for item in items if item.result is None]
+        if atomic and len(valid) < len(items):
+            for item in valid:
+                item.fail(status.HTTP_424_FAILED_DEPENDENCY,
+                          {'detail': 'Not applied: another operation in the batch is invalid.'})
+            return [item.result for item in items], 0
+        if valid:
+            with transaction.atomic():
+                self._apply(valid)
+        return [item.result for item in items], len(valid)
+
+    # Validation
+
+    def _check(self, item):
+        key = (item.op, item.type)
+        if not all(isinstance(part, str) for part in key) or key not in OPERATIONS:
+            item.fail(status.HTTP_400_BAD_REQUEST, {
+                'op': [f'Unsupported operation: {item.op!r} on {item.type!r}.']
+            })
+        elif not isinstance(item.data, dict):
+            item.fail(status.HTTP_400_BAD_REQUEST, {'data': ['Expected an object.']})
+        elif item.op == 'update' and not _ids([item.pk]):
+            item.fail(status.HTTP_400_BAD_REQUEST, {'id': ['A valid integer is required.']})
+
+    def _load(self, items):
+        """Fetch everything the operations refer to, one query per model."""
+        category_ids, entry_ids, comment_ids, voted_ids = [], [], [], []
+        for item in items:
+            data = item.data
+            if item.type == 'entry':
+                category_ids.append(data.get('category'))
+                if item.op == 'update':
+                    entry_ids.append(item.pk)
+                continue
+            entry_ids.append(data.get('troubleshooting_entry'))
+            if item.type == 'vote':
+                voted_ids.append(data.get('troubleshooting_entry'))
+            else:
+                comment_ids.append(data.get('parent'))
+                if item.op == 'update':
+                    comment_ids.append(item.pk)
+
+        if category_ids := _ids(category_ids):
+            self.lookups['categories'] = Category.objects.in_bulk(category_ids)
+        if entry_ids := _ids(entry_ids):
+            self.lookups['entries'] = TroubleshootingEntry.objects.in_bulk(entry_ids)
+        if comment_ids := _ids(comment_ids):
+            self.lookups['comments'] = Comment.objects.select_related('author').in_bulk(comment_ids)
+        if voted_ids := _ids(voted_ids):
+            self.lookups['votes'] = {
+                vote.troubleshooting_entry_id: vote
+                for vote in Vote.objects.filter(user=self.user, troubleshooting_entry_id__in=voted_ids)
+            }
+
+    def _validate(self, item):
+        if item.op == 'update':
+            instance = self.lookups['entries' if item.type == 'entry' else 'comments'].get(int(item.pk))
+            if instance is None or getattr(instance, 'is_deleted', False):
+                item.fail(status.HTTP_404_NOT_FOUND, {'detail': 'Not found.'})
+                return
+            if instance.author_id != self.user.pk and self.user.user_type != 'ADMIN':
+                item.fail(status.HTTP_403_FORBIDDEN,
+                          {'detail': 'You do not have permission to perform this action.'})
+                return
+            item.instance = instance
+        serializer = self.serializers[item.type, item.op == 'update']
+        try:
+            item.validated = serializer.run_validation(item.data)
+        except serializers.ValidationError as exc:
+            item.fail(status.HTTP_400_BAD_REQUEST, exc.detail)
+
+    def _check_slugs(self, items):
+        """New entries get their slug from the title; reject titles already taken."""
+        slugs = {item: slugify(item.validated['title']) for item in items}
+        taken = set(
+            TroubleshootingEntry.objects.filter(slug__in=slugs.values()).values_list('slug', flat=True)
+        ) if slugs else set()
+        for item, slug in slugs.items():
+            if slug in taken:
+                item.fail(status.HTTP_400_BAD_REQUEST,
+                          {'title': ['An entry with this title already exists.']})
+            taken.add(slug)
+            item.slug = slug
+
+    def _check_votes(self, items):
+        """One vote per entry: a later one would silently replace the earlier."""
+        voted = set()
+        for item in items:
+            entry_id = item.validated['troubleshooting_entry'].pk
+            if entry_id in voted:
+                item.fail(status.HTTP_400_BAD_REQUEST, {
+                    'troubleshooting_entry': ['This entry is already voted on in this batch.']
+                })
+            voted.add(entry_id)
+
+    # Writes
+
+    def _apply(self, items):
+        groups = defaultdict(list)
+        for item in items:
+            groups[item.op, item.type].append(item)
+        now = timezone.now()
+        touched_tags = set()
+        # Users whose expertise the batch changes.
+        experts = set()
+        # Entry events, published together once the batch is applied.
+        published = []
+        tags = self._tags(groups['create', 'entry'] + groups['update', 'entry'])
+
+        self._create_entries(groups['create', 'entry'], tags, touched_tags, experts)
+        self._update_entries(groups['update', 'entry'], tags, touched_tags, experts, now)
+        self._vote(groups['create', 'vote'], experts, published, now)
+        self._create_comments(groups['create', 'comment'], experts, published)
+        self._update_comments(groups['update', 'comment'], experts, published, now)
+        for tag_id in touched_tags:
+            recount_tag_usage.enqueue(tag_id=tag_id)
+        expertise.users_changed(experts)
+        events.publish_many(published)
+
+    def _tags(self, items):
+        """Tags named by the entry operations by name, created if missing."""
+        names = {name.strip() for item in items for name in item.validated.get('tag_names') or ()}
+        if not names:
+            return {}
+        tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+        missing = {name: name.lower().replace(' ', '-') for name in names - tags.keys()}
+        if missing:
+            Tag.objects.bulk_create(
+                [Tag(name=name, slug=slug) for name, slug in missing.items()],
+                ignore_conflicts=True
+            )
+            invalidate_on_commit('tag')
+            # A name whose slug another tag already has gets that tag.
+            created = list(Tag.objects.filter(Q(name__in=missing) | Q(slug__in=missing.values())))
+            by_slug = {tag.slug: tag for tag in created}
+            tags.update({tag.name: tag for tag in created})
+            for name, slug in missing.items():
+                tags.setdefault(name, by_slug.get(slug))
+        return tags
+
+    @staticmethod
+    def _tag_list(tags, names):
+        found = (tags.get(name.strip()) for name in names)
+        return list({tag.pk: tag for tag in found if tag is not None}.values())
+
+    def _create_entries(self, items, tags, touched_tags, experts):
+        if not items:
+            return
+        links = []
+        for item in items:
+            data = dict(item.validated)
+            tag_names = data.pop('tag_names', None) or []
+            item.instance = TroubleshootingEntry(author=self.user, slug=item.slug, **data)
+            item.instance.priority_rank = TroubleshootingEntry.PRIORITY_RANKS.get(item.instance.priority, 0)
+            links.append((item.instance, self._tag_list(tags, tag_names)))
+        TroubleshootingEntry.objects.bulk_create([item.instance for item in items])
+
+        EntryTag.objects.bulk_create([
+            EntryTag(**{ENTRY_TAG_SOURCE: entry.pk, 'tag_id': tag.pk})
+            for entry, entry_tags in links for tag in entry_tags
+        ])
+        touched_tags.update(tag.pk for _, entry_tags in links for tag in entry_tags)
+        experts.add(self.user.pk)
+        for item in items:
+            item.succeed(status.HTTP_201_CREATED, id=item.instance.pk)
+
+    def _update_entries(self, items, tags, touched_tags, experts, now):
+        if not items:
+            return
+        entries = {item.instance.pk: item.instance for item in items}
+        revision_numbers = dict(
+            EntryRevision.objects.filter(entry_id__in=entries)
+            .values('entry_id')
+            .annotate(latest=Max('revision_number'))
+            .values_list('entry_id', 'latest')
+        )
+        revisions = []
+        fields = {'updated_at', 'priority_rank'}
+        new_tags = {}
+        moved = {}
+        for item in items:
+            entry = item.instance
+            data = dict(item.validated)
+            if data.get('status', entry.status) != entry.status:
+                moved[entry.pk] = {'old': entry.status, 'new': data['status']}
+            tag_names = data.pop('tag_names', None)
+            revision_numbers[entry.pk] = revision_numbers.get(entry.pk, 0) + 1
+            revisions.append(EntryRevision(
+                entry=entry,
+                revised_by=self.user,
+                title=entry.title,
+                problem_description=entry.problem_description,
+                solution=entry.solution,
+                change_summary=f'Updated on {entry.updated_at}',
+                revision_number=revision_numbers[entry.pk],
+            ))
+            for attr, value in data.items():
+                setattr(entry, attr, value)
+            fields.update(data)
+            entry.updated_at = now
+            entry.priority_rank = TroubleshootingEntry.PRIORITY_RANKS.get(entry.priority, 0)
+            if tag_names is not None:
+                new_tags[entry.pk] = self._tag_list(tags, tag_names)
+
+        EntryRevision.objects.bulk_create(revisions)
+        TroubleshootingEntry.objects.bulk_update(list(entries.values()), sorted(fields))
+        audit.record_each('entry.status_changed', TroubleshootingEntry, moved, actor=self.user)
+        invalidate_on_commit(*(entry_tag(entry_id) for entry_id in entries))
+        if new_tags:
+            current = EntryTag.objects.filter(**{f'{ENTRY_TAG_SOURCE}__in': new_tags})
+            previous = defaultdict(set)
+            for entry_id, tag_id in current.values_list(ENTRY_TAG_SOURCE, 'tag_id'):
+                previous[entry_id].add(tag_id)
+            current.delete()
+            EntryTag.objects.bulk_create([
+                EntryTag(**{ENTRY_TAG_SOURCE: entry_id, 'tag_id': tag.pk})
+                for entry_id, entry_tags in new_tags.items() for tag in entry_tags
+            ])
+            for entry_id, entry_tags in new_tags.items():
+                touched_tags.update(previous[entry_id].symmetric_difference(tag.pk for tag in entry_tags))
+        experts.update(user_id for entry in entries.values() for user_id in expertise.entry_users(entry))
+        for item in items:
+            item.succeed(status.HTTP_200_OK, id=item.instance.pk)
+
+    def _vote(self, items, experts, published, now):
+        if not items:
+            return
+        votes = self.lookups['votes']
+        # Changed votes by their new type: one UPDATE per type, not a CASE per vote.
+        created, changed = {}, defaultdict(list)
+        for item in items:
+            entry = item.validated['troubleshooting_entry']
+            vote_type = item.validated['vote_type']
+            vote = votes.get(entry.pk)
+            if vote is None:
+                vote = votes[entry.pk] = created[entry.pk] = Vote(
+                    troubleshooting_entry=entry, user=self.user
+                )
+            elif vote.pk is not None:
+                changed[vote_type].append(vote.pk)
+                vote.updated_at = now
+            vote.vote_type = vote_type
+        Vote.objects.bulk_create(created.values())
+        for vote_type, vote_ids in changed.items():
+            Vote.objects.filter(pk__in=vote_ids).update(vote_type=vote_type, updated_at=now)
+
+        # Recount every voted entry in one statement.
+        entry_ids = {item.validated['troubleshooting_entry'].pk for item in items}
+        upvotes = (
+            Vote.objects.filter(troubleshooting_entry=OuterRef('pk'), vote_type='UP')
+            .order_by()
+            .values('troubleshooting_entry')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        TroubleshootingEntry.objects.filter(pk__in=entry_ids).update(
+            upvotes_count=Coalesce(Subquery(upvotes), 0)
+        )
+        counts = dict(
+            TroubleshootingEntry.objects.filter(pk__in=entry_ids).values_list('id', 'upvotes_count')
+        )
+        published.extend(events.votes_event(entry_id, counts[entry_id]) for entry_id in entry_ids)
+        experts.update(item.validated['troubleshooting_entry'].author_id for item in items)
+        for item in items:
+            entry_id = item.validated['troubleshooting_entry'].pk
+            item.succeed(status.HTTP_200_OK, vote_type=item.validated['vote_type'],
+                         upvotes_count=counts[entry_id])
+
+    def _create_comments(self, items, experts, published):
+        if not items:
+            return
+        for item in items:
+            item.instance = Comment(author=self.user, **item.validated)
+        Comment.objects.bulk_create([item.instance for item in items])
+        if any(item.instance.is_solution for item in items):
+            experts.add(self.user.pk)
+        for item in items:
+            published.append(events.comment_event(item.instance, created=True))
+            item.succeed(status.HTTP_201_CREATED, id=item.instance.pk)
+
+    def _update_comments(self, items, experts, published, now):
+        if not items:
+            return
+        comments = {}
+        fields = {'is_edited', 'updated_at'}
+        for item in items:
+            comment = comments[item.instance.pk] = item.instance
+            for attr, value in item.validated.items():
+                setattr(comment, attr, value)
+            fields.update(item.validated)
+            comment.is_edited = True
+            comment.updated_at = now
+        Comment.objects.bulk_update(list(comments.values()), sorted(fields))
+        experts.update(comment.author_id for comment in comments.values())
+        published.extend(events.comment_event(comment) for comment in comments.values())
+        for item in items:
+            item.succeed(status.HTTP_200_OK, id=item.instance.pk)
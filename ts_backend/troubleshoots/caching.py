@@ -0,0 +1,29 @@
+"""
+Cache tags of the troubleshooting models and the reference data cached with them.
+
+``'category'`` and ``'tag'`` cover every row of their model, ``'entry:<pk>'``
+one entry. Saves and deletes invalidate them through model signals; the
+bulk paths (batch writes, reviews, vote and comment counters, tag recounts)
+invalidate explicitly.
+"""
+from core.caching import cached, invalidate_on_change
+
+from .models import Category, Tag, TroubleshootingEntry
+
+
+def entry_tag(entry_id):
+    return f'entry:{entry_id}'
+
+
+def register():
+    invalidate_on_change(Category, lambda category: ('category', f'category:{category.pk}'))
+    invalidate_on_change(Tag, lambda tag: ('tag', f'tag:{tag.pk}'))
+    invalidate_on_change(TroubleshootingEntry, lambda entry: (entry_tag(entry.pk),))
+
+
+def active_categories():
+    """All active categories, read by every entry and category response with subcategories."""
+    return cached(
+        'categories:active', lambda: list(Category.objects.filter(is_active=True)),
+        tags=('category',),
+    )
@@ -0,0 +1,89 @@
+"""
+Live updates for a troubleshooting entry.
+
+Write paths call these after changing a comment, a vote or an entry's review
+state. Each event is a small delta published to the entry's channel once the
+transaction commits, and relayed to open ``/entries/<pk>/events/`` streams.
+Clients apply the deltas to the detail they already loaded instead of
+polling it. Publishing an event also invalidates the entry's cache tag, since
+these write paths change the entry without saving it; bulk writes publish
+their events together with ``publish_many``.
+"""
+from django.db import transaction
+
+from core.caching import invalidate
+from core.pubsub import get_broker
+
+from .caching import entry_tag
+
+
+def entry_channel(entry_id):
+    return f'entry:{entry_id}'
+
+
+def publish(entry_id, event_type, data):
+    """Publish ``data`` to the entry's stream after the current transaction commits."""
+    publish_many([(entry_id, event_type, data)])
+
+
+def publish_many(events):
+    """
+    ``publish()`` each of ``events``, ``(entry_id, event_type, data)``
+    triples, invalidating their entries' tags with one cache write.
+    """
+    events = [(entry_id, {'type': event_type, 'data': data}) for entry_id, event_type, data in events]
+    if not events:
+        return
+
+    def send():
+        invalidate(*dict.fromkeys(entry_tag(entry_id) for entry_id, _ in events))
+        broker = get_broker()
+        for entry_id, event in events:
+            broker.publish(entry_channel(entry_id), event)
+
+    transaction.on_commit(send)
+
+
+def comment_event(comment, created=False):
+    """The ``(entry_id, event_type, data)`` event for a changed comment."""
+    if comment.is_deleted:
+        return comment.troubleshooting_entry_id, 'comment.deleted', {'id': comment.pk}
+    return (
+        comment.troubleshooting_entry_id,
+        'comment.created' if created else 'comment.updated',
+        {
+            'id': comment.pk,
+            'parent': comment.parent_id,
+            'author': {'id': comment.author_id, 'username': comment.author.username},
+            'content': comment.content,
+            'is_solution': comment.is_solution,
+            'is_edited': comment.is_edited,
+            'created_at': comment.created_at,
+            'updated_at': comment.updated_at,
+        },
+    )
+
+
+def comment_changed(comment, created=False):
+    publish(*comment_event(comment, created))
+
+
+def votes_event(entry_id, upvotes_count):
+    return entry_id, 'votes', {'upvotes_count': upvotes_count}
+
+
+def votes_changed(entry_id, upvotes_count):
+    publish(*votes_event(entry_id, upvotes_count))
+
+
+def review_changed(entry_ids, changes):
+    """One event per reviewed entry; ``changes`` is the bulk update applied."""
+    verified_by = changes.get('verified_by')
+    data = {
+        'status': changes['status'],
+        'is_verified': changes.get('is_verified'),
+        'verified_by': verified_by.pk if verified_by is not None else None,
+        'verified_at': changes.get('verified_at'),
+    }
+    data = {key: value for key, value in data.items() if value is not None}
+    publish_many([(entry_id, 'review', data) for entry_id in entry_ids])
@@ -0,0 +1,304 @@
+"""
+Who can solve this: users ranked by expertise per category and per tag.
+
+``CategoryExpertise`` and ``TagExpertise`` hold one row per user and category
+or tag the user has contributed to, with the signals counted there and their
+weighted ``score``:
+
+* ``entries``: published or archived entries the user wrote;
+* ``verified_entries``: those of them a reviewer verified;
+* ``upvotes``: the upvotes those entries received;
+* ``solutions``: alternative solutions the user posted as comments;
+* ``verifications``: entries the user verified as a reviewer.
+
+The rows are maintained, not aggregated when read: every write that changes a
+user's signals queues ``recompute_expertise`` for that user when its
+transaction commits, with one ``enqueue_many`` for all the users the
+transaction touched and coalesced so a burst of votes recomputes once, and the
+job rewrites the user's rows from six
+grouped queries per tier over the user's own entries and comments, live and
+archived (``troubleshoots.archive``). Saves and deletes
+of entries, votes and comments queue it through signals; the bulk write paths
+(``troubleshoots.batch``, reviews), which send none, call ``users_changed``.
+``manage.py rebuild_expertise`` computes every row at once.
+
+``top_experts`` then reads a category's or tag's best users in order off the
+``(category|tag, -score, user)`` indexes, and ``experts_for_text`` those of the
+categories and tags a problem description names.
+"""
+import re
+import threading
+from collections import Counter, defaultdict
+from itertools import product
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.text import slugify
+
+from .models import (
+    ArchivedComment, ArchivedEntry, Category, CategoryExpertise, Comment, Tag, TagExpertise,
+    TroubleshootingEntry, Vote,
+)
+
+WEIGHTS = {
+    'entries': 3,
+    'verified_entries': 5,
+    'upvotes': 1,
+    'solutions': 4,
+    'verifications': 2,
+}
+SIGNALS = tuple(WEIGHTS)
+COUNTED_STATUSES = ('PUBLISHED', 'ARCHIVED')
+
+# Longest tag or category name matched in problem text, in words.
+MAX_NAME_WORDS = 3
+MAX_TEXT_LENGTH = 2000
+
+
+# The users and entries changed in this thread's current transaction, if any.
+_pending = threading.local()
+
+
+def users_changed(user_ids=(), entry_ids=()):
+    """
+    Queue a recompute of each of ``user_ids`` and of the authors of
+    ``entry_ids`` when the current transaction commits, together with the
+    rest of the transaction's changes (``None``s are skipped).
+    """
+    changes = getattr(_pending, 'changes', None)
+    if changes is None:
+        changes = _pending.changes = (set(), set())
+    changes[0].update(user_ids)
+    changes[1].update(entry_ids)
+    # The first callback to run queues everything; the others find nothing.
+    # Registered every time, as a rollback drops the callbacks of what it
+    # undoes. Users it leaves pending are recomputed with the next commit,
+    # which is harmless.
+    transaction.on_commit(_queue_pending)
+
+
+def _queue_pending():
+    from .tasks import recompute_expertise
+
+    changes = getattr(_pending, 'changes', None)
+    if changes is None:
+        return
+    del _pending.changes
+    user_ids, entry_ids = changes
+    if entry_ids:
+        user_ids.update(
+            TroubleshootingEntry.objects.filter(pk__in=entry_ids).values_list('author_id', flat=True)
+        )
+    recompute_expertise.enqueue_many({'user_id': user_id} for user_id in user_ids - {None})
+
+
+def entry_users(entry):
+    return (entry.author_id, entry.verified_by_id)
+
+
+# Computing
+
+def _signals(user_ids=None):
+    """
+    ``{(user_id, target_id): Counter}`` of the signals per category and per
+    tag, for ``user_ids`` or, given ``None``, every user.
+    """
+    def of(field):
+        return Q() if user_ids is None else Q(**{f'{field}__in': user_ids})
+
+    tiers = (
+        (
+            TroubleshootingEntry.objects.filter(status__in=COUNTED_STATUSES).order_by(),
+            Comment.objects.filter(
+                is_solution=True, is_deleted=False, troubleshooting_entry__status__in=COUNTED_STATUSES
+            ).order_by(),
+        ),
+        # The archive tier (troubleshoots.archive) holds ARCHIVED entries only.
+        (
+            ArchivedEntry.objects.order_by(),
+            ArchivedComment.objects.filter(is_solution=True, is_deleted=False).order_by(),
+        ),
+    )
+    signals = {'category': defaultdict(Counter), 'tag': defaultdict(Counter)}
+    for (kind, entry_target, comment_target), (entries, solutions) in product((
+        ('category', 'category_id', 'troubleshooting_entry__category_id'),
+        ('tag', 'tags', 'troubleshooting_entry__tags'),
+    ), tiers):
+        counts = signals[kind]
+        rows = (
+            entries.filter(of('author_id'), **{f'{entry_target}__isnull': False})
+            .values_list('author_id', entry_target)
+            .annotate(
+                written=Count('id'),
+                verified=Count('id', filter=Q(is_verified=True)),
+                received=Sum('upvotes_count'),
+            )
+        )
+        for user_id, target_id, written, verified, upvotes in rows:
+            counts[user_id, target_id].update(
+                entries=written, verified_entries=verified, upvotes=upvotes or 0
+            )
+        rows = (
+            entries.filter(of('verified_by_id'), is_verified=True, **{f'{entry_target}__isnull': False})
+            .values_list('verified_by_id', entry_target)
+            .annotate(verified=Count('id'))
+        )
+        for user_id, target_id, verified in rows:
+            counts[user_id, target_id]['verifications'] += verified
+        rows = (
+            solutions.filter(of('author_id'), **{f'{comment_target}__isnull': False})
+            .values_list('author_id', comment_target)
+            .annotate(posted=Count('id'))
+        )
+        for user_id, target_id, posted in rows:
+            counts[user_id, target_id]['solutions'] += posted
+    return signals
+
+
+def _rows(model, target_field, counts):
+    rows = []
+    for (user_id, target_id), signals in counts.items():
+        score = sum(WEIGHTS[name] * signals[name] for name in SIGNALS)
+        if score:
+            rows.append(model(
+                user_id=user_id, score=score,
+                **{f'{target_field}_id': target_id},
+                **{name: signals[name] for name in SIGNALS},
+            ))
+    return rows
+
+
+def rebuild(user_ids=None):
+    """
+    Recompute the expertise rows of ``user_ids``, or of every user given
+    ``None``. Returns how many rows there are now.
+    """
+    if user_ids is not None:
+        user_ids = list(user_ids)
+    signals = _signals(user_ids)
+    rows = {
+        CategoryExpertise: _rows(CategoryExpertise, 'category', signals['category']),
+        TagExpertise: _rows(TagExpertise, 'tag', signals['tag']),
+    }
+    with transaction.atomic():
+        for model, new in rows.items():
+            existing = model.objects.all()
+            if user_ids is not None:
+                existing = existing.filter(user_id__in=user_ids)
+            existing.delete()
+            model.objects.bulk_create(new, batch_size=500)
+    return sum(len(new) for new in rows.values())
+
+
+# Reading
+
+def top_experts(model, target_ids, limit):
+    """
+    The ``limit`` active users with the highest total score over the
+    ``target_ids`` categories (``CategoryExpertise``) or tags
+    (``TagExpertise``), as dicts of ``user_id``, the signals and ``score``.
+    """
+    target_field = 'category_id' if model is CategoryExpertise else 'tag_id'
+    target_ids = list(target_ids)
+    if not target_ids:
+        return []
+    rows = model.objects.filter(user__is_active=True, **{f'{target_field}__in': target_ids})
+    if len(target_ids) == 1:
+        # Straight off the index, in order, no grouping.
+        rows = rows.values('user_id', *SIGNALS, 'score').order_by('-score', 'user_id')
+        return list(rows[:limit])
+    names = (*SIGNALS, 'score')
+    rows = (
+        rows.values('user_id')
+        .annotate(**{f'total_{name}': Sum(name) for name in names})
+        .order_by('-total_score', 'user_id')
+    )
+    return [
+        {'user_id': row['user_id'], **{name: row[f'total_{name}'] for name in names}}
+        for row in rows[:limit]
+    ]
+
+
+def matched_names(text):
+    """Active categories and tags whose name (as a slug) ``text`` contains."""
+    words = re.findall(r'\w+', text[:MAX_TEXT_LENGTH].lower())
+    slugs = {
+        slugify(' '.join(words[start:start + size]))
+        for size in range(1, MAX_NAME_WORDS + 1)
+        for start in range(len(words) - size + 1)
+    } - {''}
+    if not slugs:
+        return [], []
+    categories = list(Category.objects.filter(slug__in=slugs, is_active=True))
+    tags = list(Tag.objects.filter(slug__in=slugs))
+    return categories, tags
+
+
+def experts_for_text(text, limit):
+    """
+    ``(categories, tags, experts)``: the categories and tags ``text`` names
+    and the ``limit`` best experts across all of them.
+    """
+    categories, tags = matched_names(text)
+    totals = {}
+    for model, targets in ((CategoryExpertise, categories), (TagExpertise, tags)):
+        # Every matching row, not the top ``limit``: a user's scores add up.
+        for row in top_experts(model, [target.pk for target in targets], None):
+            total = totals.setdefault(row['user_id'], dict.fromkeys((*SIGNALS, 'score'), 0))
+            for name in (*SIGNALS, 'score'):
+                total[name] += row[name]
+    experts = sorted(
+        ({'user_id': user_id, **total} for user_id, total in totals.items()),
+        key=lambda row: (-row['score'], row['user_id'])
+    )
+    return categories, tags, experts[:limit]
+
+
+# Signals: single-object writes
+
+def _entry_changed(sender, instance, **kwargs):
+    users_changed(entry_users(instance))
+
+
+def _entry_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        users_changed(entry_users(instance))
+    elif pk_set:
+        users_changed(
+            user_id
+            for pair in TroubleshootingEntry.objects.filter(pk__in=pk_set).values_list('author_id', 'verified_by_id')
+            for user_id in pair
+        )
+
+
+def _vote_changed(sender, instance, origin=None, **kwargs):
+    # Votes deleted with their entry: _entry_changed queues its author.
+    if isinstance(origin, TroubleshootingEntry) or getattr(origin, 'model', None) is TroubleshootingEntry:
+        return
+    users_changed(entry_ids=[instance.troubleshooting_entry_id])
+
+
+def _comment_saved(sender, instance, created, **kwargs):
+    # An edit may have unmarked a solution.
+    if instance.is_solution or not created:
+        users_changed([instance.author_id])
+
+
+def _comment_deleted(sender, instance, **kwargs):
+    if instance.is_solution:
+        users_changed([instance.author_id])
+
+
+def register():
+    uid = 'troubleshoots.expertise'
+    for signal in (post_save, post_delete):
+        signal.connect(_entry_changed, sender=TroubleshootingEntry, dispatch_uid=f'{uid}:entry')
+        signal.connect(_vote_changed, sender=Vote, dispatch_uid=f'{uid}:vote')
+    post_save.connect(_comment_saved, sender=Comment, dispatch_uid=f'{uid}:comment')
+    post_delete.connect(_comment_deleted, sender=Comment, dispatch_uid=f'{uid}:comment')
+    m2m_changed.connect(
+        _entry_tags_changed, sender=TroubleshootingEntry.tags.through, dispatch_uid=f'{uid}:tags'
+    )
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.conf import perf_setting
+from troubleshoots import archive
+from troubleshoots.tasks import schedule_archiving
+
+
+class Command(BaseCommand):
+    help = (
+        'Move entries ARCHIVED more than ARCHIVE_AFTER_DAYS days ago, with their '
+        'tags, revisions, attachments, votes and comments, to the archive tables, '
+        'one batch per transaction. --enqueue leaves it to the archive_entries task.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, metavar='DAYS',
+                            help='Archived at least this many days ago (default: ARCHIVE_AFTER_DAYS).')
+        parser.add_argument('--batch-size', type=int,
+                            help='Entries per transaction (default: ARCHIVE_BATCH_SIZE).')
+        parser.add_argument('--limit', type=int, help='Move at most this many entries.')
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Queue a background sweep instead of moving entries now.')
+
+    def handle(self, *args, **options):
+        for name in ('batch_size', 'limit'):
+            if options[name] is not None and options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive.")
+        if options['older_than'] is not None and options['older_than'] < 0:
+            raise CommandError('--older-than must not be negative.')
+        if options['enqueue']:
+            schedule_archiving()
+            self.stdout.write(self.style.SUCCESS('Archive sweep queued.'))
+            return
+
+        batch_size = options['batch_size'] or perf_setting('ARCHIVE_BATCH_SIZE')
+        limit = options['limit']
+        started = time.perf_counter()
+        moved = batches = 0
+        while limit is None or moved < limit:
+            size = batch_size if limit is None else min(batch_size, limit - moved)
+            ids = archive.archive_batch(options['older_than'], size)
+            moved += len(ids)
+            batches += bool(ids)
+            if len(ids) < size:
+                break
+        self.stdout.write(self.style.SUCCESS(
+            f'{moved} entries moved to the archive in {batches} batches, '
+            f'{(time.perf_counter() - started) * 1000:.1f}ms'
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from troubleshoots import expertise
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the expertise matrix behind /experts/ from entries, votes and '
+        'comments, for every user or the given ones. Run it once to fill the '
+        'matrix; recompute_expertise jobs keep it up to date afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Only these users.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = expertise.rebuild(options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} expertise rows in {(time.perf_counter() - started) * 1000:.1f}ms'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from troubleshoots import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Move entries back from the archive tables to the live ones, with their '
+        'tags, revisions, attachments, votes and comments.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('entry_ids', nargs='+', type=int, help='Archived entries to restore.')
+
+    def handle(self, *args, **options):
+        requested = set(options['entry_ids'])
+        restored = archive.restore(requested)
+        missing = sorted(requested.difference(restored))
+        if missing and not restored:
+            raise CommandError(f"No archived entries with ids {', '.join(map(str, missing))}.")
+        if missing:
+            self.stderr.write(f"Not archived, skipped: {', '.join(map(str, missing))}")
+        self.stdout.write(self.style.SUCCESS(f'{len(restored)} entries restored.'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+PRIORITY_RANKS = {'LOW': 0, 'MEDIUM': 1, 'HIGH': 2, 'CRITICAL': 3}
+
+
+def populate_priority_rank(apps, schema_editor):
+    TroubleshootingEntry = apps.get_model('troubleshoots', 'TroubleshootingEntry')
+    for priority, rank in PRIORITY_RANKS.items():
+        TroubleshootingEntry.objects.filter(priority=priority).update(priority_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troubleshoots', '0002_alter_tag_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='troubleshootingentry',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(populate_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='troubleshootingentry',
+            index=models.Index(fields=['status', '-priority_rank', 'created_at', 'id'], name='entry_review_queue_idx'),
+        ),
+    ]
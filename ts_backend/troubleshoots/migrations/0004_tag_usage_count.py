@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_usage_count(apps, schema_editor):
+    Tag = apps.get_model('troubleshoots', 'Tag')
+    counts = Tag.objects.annotate(entry_count=Count('entries')).values_list('id', 'entry_count')
+    for tag_id, entry_count in counts:
+        if entry_count:
+            Tag.objects.filter(pk=tag_id).update(usage_count=entry_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troubleshoots', '0003_troubleshootingentry_priority_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_usage_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troubleshoots', '0004_tag_usage_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['troubleshooting_entry', 'parent', '-is_solution', 'created_at', 'id'], name='comment_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent', '-is_solution', 'created_at', 'id'], name='comment_replies_idx'),
+        ),
+    ]
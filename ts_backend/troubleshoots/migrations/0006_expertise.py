@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troubleshoots', '0005_comment_thread_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryExpertise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('verified_entries', models.PositiveIntegerField(default=0)),
+                ('upvotes', models.PositiveIntegerField(default=0)),
+                ('solutions', models.PositiveIntegerField(default=0)),
+                ('verifications', models.PositiveIntegerField(default=0)),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expertise', to='troubleshoots.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', '-score', 'user'], name='category_expertise_rank_idx')],
+                'unique_together': {('user', 'category')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TagExpertise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('verified_entries', models.PositiveIntegerField(default=0)),
+                ('upvotes', models.PositiveIntegerField(default=0)),
+                ('solutions', models.PositiveIntegerField(default=0)),
+                ('verifications', models.PositiveIntegerField(default=0)),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expertise', to='troubleshoots.tag')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', '-score', 'user'], name='tag_expertise_rank_idx')],
+                'unique_together': {('user', 'tag')},
+            },
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troubleshoots', '0006_expertise'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('slug', models.SlugField(max_length=220)),
+                ('problem_description', models.TextField()),
+                ('solution', models.TextField()),
+                ('steps_to_reproduce', models.TextField(blank=True)),
+                ('environment_details', models.TextField(blank=True)),
+                ('error_messages', models.TextField(blank=True)),
+                ('prerequisites', models.TextField(blank=True)),
+                ('estimated_time', models.PositiveIntegerField(blank=True, null=True)),
+                ('priority', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('CRITICAL', 'Critical')], max_length=10)),
+                ('priority_rank', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('DRAFT', 'Draft'), ('PUBLISHED', 'Published'), ('ARCHIVED', 'Archived'), ('PENDING_REVIEW', 'Pending Review')], max_length=15)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+                ('verification_notes', models.TextField(blank=True)),
+                ('upvotes_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_entries', to='troubleshoots.category')),
+                ('tags', models.ManyToManyField(blank=True, related_name='archived_entries', to='troubleshoots.tag')),
+                ('verified_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('content', models.TextField()),
+                ('is_solution', models.BooleanField(default=False)),
+                ('is_edited', models.BooleanField(default=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='troubleshoots.archivedcomment')),
+                ('troubleshooting_entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='troubleshoots.archivedentry')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttachment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('file', models.FileField(upload_to='troubleshooting_attachments/%Y/%m/')),
+                ('original_filename', models.CharField(max_length=255)),
+                ('file_type', models.CharField(choices=[('IMAGE', 'Image'), ('DOCUMENT', 'Document'), ('VIDEO', 'Video'), ('AUDIO', 'Audio'), ('ARCHIVE', 'Archive'), ('OTHER', 'Other')], max_length=10)),
+                ('file_size', models.PositiveIntegerField()),
+                ('mime_type', models.CharField(max_length=100)),
+                ('description', models.CharField(blank=True, max_length=200)),
+                ('uploaded_at', models.DateTimeField()),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('troubleshooting_entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='troubleshoots.archivedentry')),
+            ],
+            options={
+                'ordering': ['uploaded_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedRevision',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('problem_description', models.TextField()),
+                ('solution', models.TextField()),
+                ('change_summary', models.CharField(blank=True, max_length=200)),
+                ('revision_number', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='troubleshoots.archivedentry')),
+                ('revised_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedVote',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('vote_type', models.CharField(choices=[('UP', 'Upvote'), ('DOWN', 'Downvote')], max_length=4)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('troubleshooting_entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='troubleshoots.archivedentry')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -56,6 +56,8 @@ class Tag(models.Model):
     slug = models.SlugField(max_length=50, unique=True)
     description = models.CharField(max_length=200, blank=True)
     is_featured = models.BooleanField(default=False)
+    # Entries using the tag; kept up to date by the recount_tag_usage task.
+    usage_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -78,6 +80,10 @@ class TroubleshootingEntry(models.Model):
         ("CRITICAL", "Critical"),
     ]
 
+    # Numeric rank of each priority, stored in ``priority_rank`` so the
+    # review queue can be ordered straight from an index.
+    PRIORITY_RANKS = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
+
     STATUS_CHOICES = [
         ("DRAFT", "Draft"),
         ("PUBLISHED", "Published"),
@@ -121,6 +127,7 @@ class TroubleshootingEntry(models.Model):
     priority = models.CharField(
         max_length=10, choices=PRIORITY_CHOICES, default="MEDIUM"
     )
+    priority_rank = models.PositiveSmallIntegerField(default=1, editable=False)
     status = models.CharField(
         max_length=15, choices=STATUS_CHOICES, default="PUBLISHED"
     )
@@ -157,11 +164,19 @@ class TroubleshootingEntry(models.Model):
             models.Index(fields=["-upvotes_count"]),
             models.Index(fields=["status", "-created_at"]),
             models.Index(fields=["is_verified", "status"]),
+            # Review queue: one status, highest priority first, then oldest.
+            # Composite rather than partial so it also matches when the status
+            # is a bound parameter (SQLite skips partial indexes for those).
+            models.Index(
+                fields=["status", "-priority_rank", "created_at", "id"],
+                name="entry_review_queue_idx",
+            ),
         ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        self.priority_rank = self.PRIORITY_RANKS.get(self.priority, 0)
 
         # Update the search vector
         """
@@ -327,8 +342,179 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # Thread pages: top-level comments of an entry, then replies per
+            # parent, both in the -is_solution, created_at, id thread order.
+            models.Index(
+                fields=["troubleshooting_entry", "parent", "-is_solution", "created_at", "id"],
+                name="comment_thread_idx",
+            ),
+            models.Index(
+                fields=["parent", "-is_solution", "created_at", "id"],
+                name="comment_replies_idx",
+            ),
+        ]
 
     def __str__(self):
         return (
             f"Comment by {self.author.username} on {self.troubleshooting_entry.title}"
         )
+
+
+class Expertise(models.Model):
+    """
+    How much a user has contributed in one category or tag, the signals and
+    the score weighing them (see ``troubleshoots.expertise``, which keeps
+    these rows up to date).
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    entries = models.PositiveIntegerField(default=0)
+    verified_entries = models.PositiveIntegerField(default=0)
+    upvotes = models.PositiveIntegerField(default=0)
+    solutions = models.PositiveIntegerField(default=0)
+    verifications = models.PositiveIntegerField(default=0)
+    score = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class CategoryExpertise(Expertise):
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="expertise"
+    )
+
+    class Meta:
+        unique_together = ["user", "category"]
+        indexes = [
+            # Top experts of a category, read in order off the index.
+            models.Index(
+                fields=["category", "-score", "user"],
+                name="category_expertise_rank_idx",
+            ),
+        ]
+
+
+class TagExpertise(Expertise):
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="expertise")
+
+    class Meta:
+        unique_together = ["user", "tag"]
+        indexes = [
+            models.Index(
+                fields=["tag", "-score", "user"],
+                name="tag_expertise_rank_idx",
+            ),
+        ]
+
+
+# Archive tier: ARCHIVED entries moved out of the live tables with their
+# revisions, attachments, votes and comments (see troubleshoots.archive). The
+# rows keep their ids, and fields and related names match the live models, so
+# the entry serializers read either.
+
+
+class ArchivedEntry(models.Model):
+    """A ``TroubleshootingEntry`` in the archive tier, and when it moved there."""
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=220)
+    problem_description = models.TextField()
+    solution = models.TextField()
+    steps_to_reproduce = models.TextField(blank=True)
+    environment_details = models.TextField(blank=True)
+    error_messages = models.TextField(blank=True)
+    prerequisites = models.TextField(blank=True)
+    estimated_time = models.PositiveIntegerField(null=True, blank=True)
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="archived_entries"
+    )
+    tags = models.ManyToManyField(Tag, blank=True, related_name="archived_entries")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    priority = models.CharField(
+        max_length=10, choices=TroubleshootingEntry.PRIORITY_CHOICES
+    )
+    priority_rank = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=15, choices=TroubleshootingEntry.STATUS_CHOICES)
+    is_verified = models.BooleanField(default=False)
+    verified_by = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    verified_at = models.DateTimeField(null=True, blank=True)
+    verification_notes = models.TextField(blank=True)
+    upvotes_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedRevision(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    entry = models.ForeignKey(
+        ArchivedEntry, on_delete=models.CASCADE, related_name="revisions"
+    )
+    revised_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    title = models.CharField(max_length=200)
+    problem_description = models.TextField()
+    solution = models.TextField()
+    change_summary = models.CharField(max_length=200, blank=True)
+    revision_number = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+
+
+class ArchivedAttachment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    troubleshooting_entry = models.ForeignKey(
+        ArchivedEntry, on_delete=models.CASCADE, related_name="attachments"
+    )
+    file = models.FileField(upload_to="troubleshooting_attachments/%Y/%m/")
+    original_filename = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=10, choices=Attachment.ATTACHMENT_TYPES)
+    file_size = models.PositiveIntegerField()
+    mime_type = models.CharField(max_length=100)
+    description = models.CharField(max_length=200, blank=True)
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    uploaded_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["uploaded_at"]
+
+
+class ArchivedVote(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    troubleshooting_entry = models.ForeignKey(
+        ArchivedEntry, on_delete=models.CASCADE, related_name="votes"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    vote_type = models.CharField(max_length=4, choices=Vote.VOTE_TYPES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    troubleshooting_entry = models.ForeignKey(
+        ArchivedEntry, on_delete=models.CASCADE, related_name="comments"
+    )
+    parent = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.CASCADE, related_name="replies"
+    )
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    content = models.TextField()
+    is_solution = models.BooleanField(default=False)
+    is_edited = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["created_at"]
@@ -0,0 +1,41 @@
+from rest_framework import permissions
+
+
+class IsAuthorOrReadOnly(permissions.BasePermission):
+    """
+    Permission to only allow the author of an entry or comment, or admins, to edit it.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        # Read permissions for authenticated users
+        if request.method in permissions.SAFE_METHODS:
+            return request.user.is_authenticated
+
+        # Write permissions only for the author or admin
+        return (
+            obj.author_id == request.user.pk or
+            request.user.user_type == 'ADMIN'
+        )
+
+
+class IsAdminOrReadOnly(permissions.BasePermission):
+    """
+    Permission for reference data (categories, tags) that only admins may change.
+    """
+
+    def has_permission(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return request.user.is_authenticated
+        return request.user.is_authenticated and request.user.user_type == 'ADMIN'
+
+
+class IsReviewer(permissions.BasePermission):
+    """
+    Permission for the verification workflow: admins and senior technicians.
+    """
+
+    def has_permission(self, request, view):
+        return (
+            request.user.is_authenticated and
+            request.user.user_type in ('ADMIN', 'SENIOR_TECH')
+        )
@@ -1,6 +1,13 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core import audit
+from core.fieldsets import SparseFieldsMixin
 from .models import (
     Category,
     Tag,
@@ -10,11 +17,13 @@ from .models import (
     Vote,
     Comment,
 )
+from . import archive, events, expertise
+from .tasks import recount_tag_usage
 
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Basic user serializer for nested representations"""
     
     class Meta:
@@ -23,7 +32,7 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Category model"""
     total_entries = serializers.ReadOnlyField()
     subcategories = serializers.SerializerMethodField()
@@ -37,14 +46,22 @@ class CategorySerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
+        field_sources = {'subcategories': []}
     
     def get_subcategories(self, obj):
         """Get subcategories for this category"""
-        subcategories = obj.subcategories.filter(is_active=True)
-        return CategorySerializer(subcategories, many=True, context=self.context).data
+        # Callers that already loaded the category tree pass it in the
+        # context as {parent_id: [active children]} to avoid a query per node.
+        children = self.context.get('category_children')
+        if children is not None:
+            subcategories = children.get(obj.pk, [])
+        else:
+            subcategories = obj.subcategories.filter(is_active=True)
+        # Reuse this serializer so the subtree keeps the requested fields.
+        return [self.to_representation(subcategory) for subcategory in subcategories]
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Tag model"""
     usage_count = serializers.ReadOnlyField()
     
@@ -57,7 +74,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'slug', 'created_at']
 
 
-class AttachmentSerializer(serializers.ModelSerializer):
+class AttachmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Attachment model"""
     uploaded_by = UserSerializer(read_only=True)
     file_url = serializers.SerializerMethodField()
@@ -70,6 +87,7 @@ class AttachmentSerializer(serializers.ModelSerializer):
             'uploaded_at'
         ]
         read_only_fields = ['id', 'original_filename', 'file_size', 'uploaded_at']
+        field_sources = {'file_url': ['file']}
     
     def get_file_url(self, obj):
         """Get the full URL for the file"""
@@ -81,7 +99,7 @@ class AttachmentSerializer(serializers.ModelSerializer):
         return None
 
 
-class VoteSerializer(serializers.ModelSerializer):
+class VoteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Vote model"""
     user = UserSerializer(read_only=True)
     
@@ -116,34 +134,46 @@ class VoteSerializer(serializers.ModelSerializer):
         return data
 
 
-class CommentSerializer(serializers.ModelSerializer):
-    """Serializer for Comment model"""
+class CommentThreadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Comment with the replies loaded by ``threads.load_replies`` nested in it.
+
+    ``replies_next`` links to the replies left out by the depth or per-comment
+    limit, or is null when all of them are included.
+    """
     author = UserSerializer(read_only=True)
+    replies_count = serializers.IntegerField(source='replies_count_annotation', read_only=True)
     replies = serializers.SerializerMethodField()
-    replies_count = serializers.SerializerMethodField()
-    
+    replies_next = serializers.SerializerMethodField()
+
     class Meta:
         model = Comment
         fields = [
             'id', 'troubleshooting_entry', 'parent', 'author', 'content',
-            'is_solution', 'is_edited', 'is_deleted', 'replies', 'replies_count',
-            'created_at', 'updated_at'
+            'is_solution', 'is_edited', 'created_at', 'updated_at',
+            'replies_count', 'replies', 'replies_next'
         ]
-        read_only_fields = ['id', 'author', 'is_edited', 'created_at', 'updated_at']
-    
+        read_only_fields = fields
+        field_sources = {'replies': [], 'replies_next': []}
+
     def get_replies(self, obj):
-        """Get replies to this comment"""
-        if obj.replies.exists():
-            replies = obj.replies.filter(is_deleted=False)
-            return CommentSerializer(replies, many=True, context=self.context).data
-        return []
-    
-    def get_replies_count(self, obj):
-        """Get count of replies"""
-        return obj.replies.filter(is_deleted=False).count()
+        # Reuse this serializer's bound fields instead of building new ones per node.
+        return [self.to_representation(reply) for reply in obj.loaded_replies]
+
+    def get_replies_next(self, obj):
+        if obj.replies_count_annotation <= len(obj.loaded_replies):
+            return None
+        request = self.context['request']
+        url = reverse('comment-replies', kwargs={'pk': obj.pk}, request=request)
+        if archive.archives_requested(request):
+            url = replace_query_param(url, archive.INCLUDE_PARAM, 'true')
+        if obj.loaded_replies:
+            cursor = self.context['paginator'].encode_cursor(obj.loaded_replies[-1])
+            url = replace_query_param(url, 'cursor', cursor)
+        return url
 
 
-class EntryRevisionSerializer(serializers.ModelSerializer):
+class EntryRevisionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for EntryRevision model"""
     revised_by = UserSerializer(read_only=True)
     
@@ -156,7 +186,7 @@ class EntryRevisionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'revised_by', 'revision_number', 'created_at']
 
 
-class TroubleshootingEntryListSerializer(serializers.ModelSerializer):
+class TroubleshootingEntryListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Lightweight serializer for listing entries"""
     author = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
@@ -170,18 +200,22 @@ class TroubleshootingEntryListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'slug', 'problem_description', 'priority',
             'status', 'category', 'tags', 'author', 'is_verified',
-            'verified_by', 'upvotes_count', 'downvotes_count',
-            'comments_count', 'user_vote', 'estimated_time',
+            'verified_by', 'upvotes_count', 'comments_count', 'user_vote', 'estimated_time',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
+        field_sources = {'comments_count': [], 'user_vote': []}
     
     def get_comments_count(self, obj):
         """Get count of comments"""
+        if hasattr(obj, 'comments_count_annotation'):
+            return obj.comments_count_annotation
         return obj.comments.filter(is_deleted=False).count()
     
     def get_user_vote(self, obj):
         """Get current user's vote on this entry"""
+        if hasattr(obj, 'user_vote_annotation'):
+            return obj.user_vote_annotation
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             vote = obj.votes.filter(user=request.user).first()
@@ -189,14 +223,14 @@ class TroubleshootingEntryListSerializer(serializers.ModelSerializer):
         return None
 
 
-class TroubleshootingEntryDetailSerializer(serializers.ModelSerializer):
+class TroubleshootingEntryDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Detailed serializer for single entry view"""
     author = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     verified_by = UserSerializer(read_only=True)
     attachments = AttachmentSerializer(many=True, read_only=True)
-    comments = serializers.SerializerMethodField()
+    comments_count = serializers.SerializerMethodField()
     revisions = EntryRevisionSerializer(many=True, read_only=True)
     user_vote = serializers.SerializerMethodField()
     
@@ -208,21 +242,25 @@ class TroubleshootingEntryDetailSerializer(serializers.ModelSerializer):
             'prerequisites', 'estimated_time', 'category', 'tags',
             'author', 'priority', 'status', 'is_verified', 'verified_by',
             'verified_at', 'verification_notes', 'upvotes_count',
-            'downvotes_count', 'attachments', 'comments', 'revisions',
+            'attachments', 'comments_count', 'revisions',
             'user_vote', 'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'slug', 'author', 'upvotes_count', 'downvotes_count',
+            'id', 'slug', 'author', 'upvotes_count',
             'created_at', 'updated_at'
         ]
+        field_sources = {'comments_count': [], 'user_vote': []}
     
-    def get_comments(self, obj):
-        """Get top-level comments (not replies)"""
-        comments = obj.comments.filter(parent=None, is_deleted=False)
-        return CommentSerializer(comments, many=True, context=self.context).data
+    def get_comments_count(self, obj):
+        """Get count of comments; the thread itself is at /entries/<id>/comments/"""
+        if hasattr(obj, 'comments_count_annotation'):
+            return obj.comments_count_annotation
+        return obj.comments.filter(is_deleted=False).count()
     
     def get_user_vote(self, obj):
         """Get current user's vote on this entry"""
+        if hasattr(obj, 'user_vote_annotation'):
+            return obj.user_vote_annotation
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             vote = obj.votes.filter(user=request.user).first()
@@ -267,6 +305,8 @@ class TroubleshootingEntryCreateUpdateSerializer(serializers.ModelSerializer):
                     )
                     tags.append(tag)
                 entry.tags.set(tags)
+                for tag in tags:
+                    recount_tag_usage.enqueue(tag_id=tag.pk)
             
             return entry
     
@@ -286,9 +326,15 @@ class TroubleshootingEntryCreateUpdateSerializer(serializers.ModelSerializer):
             )
             
             # Update the entry
+            previous_status = instance.status
             for attr, value in validated_data.items():
                 setattr(instance, attr, value)
             instance.save()
+            if instance.status != previous_status:
+                audit.record(
+                    'entry.status_changed', instance, actor=self.context['request'].user,
+                    old=previous_status, new=instance.status
+                )
             
             # Handle tags
             if tag_names is not None:
@@ -299,7 +345,10 @@ class TroubleshootingEntryCreateUpdateSerializer(serializers.ModelSerializer):
                         defaults={'slug': tag_name.strip().lower().replace(' ', '-')}
                     )
                     tags.append(tag)
+                previous = set(instance.tags.values_list('id', flat=True))
                 instance.tags.set(tags)
+                for tag_id in previous.symmetric_difference(tag.pk for tag in tags):
+                    recount_tag_usage.enqueue(tag_id=tag_id)
             
             return instance
 
@@ -326,12 +375,11 @@ class VoteCreateUpdateSerializer(serializers.ModelSerializer):
             
             # Update vote counts on the entry
             upvotes = entry.votes.filter(vote_type='UP').count()
-            downvotes = entry.votes.filter(vote_type='DOWN').count()
             
             TroubleshootingEntry.objects.filter(id=entry.id).update(
-                upvotes_count=upvotes,
-                downvotes_count=downvotes
+                upvotes_count=upvotes
             )
+            events.votes_changed(entry.id, upvotes)
             
             return vote
 
@@ -348,7 +396,9 @@ class CommentCreateUpdateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """Create comment with author"""
         validated_data['author'] = self.context['request'].user
-        return Comment.objects.create(**validated_data)
+        comment = Comment.objects.create(**validated_data)
+        events.comment_changed(comment, created=True)
+        return comment
     
     def update(self, instance, validated_data):
         """Update comment and mark as edited"""
@@ -356,4 +406,146 @@ class CommentCreateUpdateSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.is_edited = True
         instance.save()
-        return instance
\ No newline at end of file
+        events.comment_changed(instance)
+        return instance
+
+
+class ReviewQueueEntrySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Compact row for the verification review queue"""
+    author_username = serializers.CharField(source='author.username', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True)
+
+    class Meta:
+        model = TroubleshootingEntry
+        fields = [
+            'id', 'title', 'slug', 'priority', 'status', 'category',
+            'category_name', 'author', 'author_username', 'created_at'
+        ]
+        read_only_fields = fields
+        expandable_fields = {'author': UserSerializer, 'category': CategorySerializer}
+
+
+class ReviewActionSerializer(serializers.Serializer):
+    """Apply one review action to many entries at once"""
+    ACTIONS = {
+        'verify': 'Verified',
+        'publish': 'Published',
+        'archive': 'Archived',
+    }
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+    action = serializers.ChoiceField(choices=list(ACTIONS))
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def create(self, validated_data):
+        """
+        Update every entry with a single UPDATE and record one revision per
+        entry with a single bulk insert. Returns a summary dict.
+        """
+        reviewer = validated_data['reviewer']
+        action = validated_data['action']
+        notes = validated_data['notes']
+        ids = set(validated_data['ids'])
+        now = timezone.now()
+
+        changes = {'updated_at': now}
+        if action == 'verify':
+            changes.update(
+                status='PUBLISHED', is_verified=True, verified_by=reviewer,
+                verified_at=now, verification_notes=notes
+            )
+        elif action == 'publish':
+            changes['status'] = 'PUBLISHED'
+        else:
+            changes['status'] = 'ARCHIVED'
+
+        summary = self.ACTIONS[action]
+        if notes:
+            summary = f'{summary}: {notes}'
+
+        with transaction.atomic():
+            entries = list(
+                TroubleshootingEntry.objects.select_for_update()
+                .filter(pk__in=ids)
+                .only('id', 'title', 'problem_description', 'solution', 'status', 'author', 'verified_by')
+            )
+            found = [entry.pk for entry in entries]
+            latest = dict(
+                EntryRevision.objects.filter(entry_id__in=found)
+                .values('entry_id')
+                .annotate(latest=Max('revision_number'))
+                .values_list('entry_id', 'latest')
+            )
+            updated = TroubleshootingEntry.objects.filter(pk__in=found).update(**changes)
+            EntryRevision.objects.bulk_create([
+                EntryRevision(
+                    entry=entry,
+                    revised_by=reviewer,
+                    title=entry.title,
+                    problem_description=entry.problem_description,
+                    solution=entry.solution,
+                    change_summary=summary[:200],
+                    revision_number=latest.get(entry.pk, 0) + 1,
+                )
+                for entry in entries
+            ])
+            events.review_changed(found, changes)
+            audit.record_each('entry.status_changed', TroubleshootingEntry, {
+                entry.pk: {'old': entry.status, 'new': changes['status']}
+                for entry in entries if entry.status != changes['status']
+            }, actor=reviewer)
+            expertise.users_changed([
+                user_id for entry in entries for user_id in expertise.entry_users(entry)
+            ] + ([reviewer.pk] if action == 'verify' else []))
+
+        return {
+            'action': action,
+            'updated': updated,
+            'ids': sorted(found),
+            'missing': sorted(ids.difference(found)),
+        }
+
+
+class RestoreEntriesSerializer(serializers.Serializer):
+    """Move entries back from the archive tier (see troubleshoots.archive)"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+
+    def create(self, validated_data):
+        ids = set(validated_data['ids'])
+        restored = archive.restore(ids, actor=validated_data['reviewer'])
+        return {
+            'restored': restored,
+            'missing': sorted(ids.difference(restored)),
+        }
+
+
+class ExpertQuerySerializer(serializers.Serializer):
+    """Query parameters of ``GET /experts/``: one of category, tag or q"""
+    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), required=False)
+    tag = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(), required=False)
+    q = serializers.CharField(required=False, max_length=expertise.MAX_TEXT_LENGTH)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+    def validate(self, attrs):
+        if len({'category', 'tag', 'q'}.intersection(attrs)) != 1:
+            raise serializers.ValidationError('Give exactly one of category, tag or q.')
+        return attrs
+
+
+class ExpertSerializer(serializers.Serializer):
+    """A user, the expertise signals counted for them and their weighted score"""
+    user = UserSerializer()
+    entries = serializers.IntegerField()
+    verified_entries = serializers.IntegerField()
+    upvotes = serializers.IntegerField()
+    solutions = serializers.IntegerField()
+    verifications = serializers.IntegerField()
+    score = serializers.IntegerField()
@@ -0,0 +1,44 @@
+"""
+Background tasks for troubleshooting entries, run by ``manage.py run_workers``.
+"""
+from core.caching import invalidate
+from core.conf import perf_setting
+from core.jobs import enqueue, task
+
+from . import archive, expertise
+from .models import ArchivedEntry, Tag
+
+
+@task(coalesce_by='tag_id')
+def recount_tag_usage(tag_id):
+    """Store how many entries use the tag, archived ones included."""
+    Tag.objects.filter(pk=tag_id).update(
+        usage_count=Tag.entries.through.objects.filter(tag_id=tag_id).count()
+        + ArchivedEntry.tags.through.objects.filter(tag_id=tag_id).count()
+    )
+    invalidate('tag', f'tag:{tag_id}')
+
+
+@task(coalesce_by='user_id')
+def recompute_expertise(user_id):
+    """Rewrite the user's expertise rows (see troubleshoots.expertise)."""
+    expertise.rebuild([user_id])
+
+
+@task()
+def archive_entries():
+    """
+    Move a batch of old ARCHIVED entries to the archive tier (see
+    troubleshoots.archive), then queue the next batch if there may be more,
+    else the next sweep in ARCHIVE_INTERVAL seconds.
+    """
+    batch_size = perf_setting('ARCHIVE_BATCH_SIZE')
+    if len(archive.archive_batch(batch_size=batch_size)) == batch_size:
+        schedule_archiving()
+    elif perf_setting('ARCHIVE_INTERVAL') is not None:
+        schedule_archiving(perf_setting('ARCHIVE_INTERVAL'))
+
+
+def schedule_archiving(delay=None):
+    """Queue an archive_entries sweep, merged with any already queued."""
+    return enqueue(archive_entries, delay=delay, dedup_key='archive_entries')
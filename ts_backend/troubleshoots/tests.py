@@ -1,3 +1,603 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import Job
+from core.pubsub import LocalBroker
+from core.querylog import QueryAnalyzer
+from core.streams import StreamRouter
+from ts_backend.asgi_urls import stream_urlpatterns
+
+from . import archive, async_views, events
+from .models import (
+    ArchivedComment, ArchivedEntry, ArchivedVote, Category, Comment, EntryRevision,
+    Tag, TroubleshootingEntry, Vote,
+)
+from .tasks import recompute_expertise
+
+User = get_user_model()
+
+# A cache of the tests' own, emptied before each test.
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                           'LOCATION': 'troubleshoots-tests'}}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class EntryAPITestCase(APITestCase):
+    """Users, a category and a few published entries."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', 'author@example.com', 'pass', user_type='TECH')
+        self.reviewer = User.objects.create_user(
+            'reviewer', 'reviewer@example.com', 'pass', user_type='SENIOR_TECH'
+        )
+        self.category = Category.objects.create(name='Network', slug='network')
+        self.tag = Tag.objects.create(name='dns', slug='dns')
+        self.entries = [self.create_entry(f'Entry {i}') for i in range(3)]
+        self.client.force_authenticate(self.author)
+
+    def create_entry(self, title, **fields):
+        entry = TroubleshootingEntry.objects.create(
+            title=title, problem_description='Problem', solution='Solution',
+            category=self.category, author=self.author, **fields
+        )
+        entry.tags.add(self.tag)
+        return entry
+
+
+class ReviewTests(EntryAPITestCase):
+    url = '/api/v1/entries/review/'
+
+    def setUp(self):
+        super().setUp()
+        TroubleshootingEntry.objects.filter(pk__in=[entry.pk for entry in self.entries]).update(
+            status='PENDING_REVIEW'
+        )
+        self.ids = [entry.pk for entry in self.entries]
+
+    def test_verify_updates_entries_and_records_revisions(self):
+        self.client.force_authenticate(self.reviewer)
+        response = self.client.post(self.url, {
+            'ids': self.ids + [999], 'action': 'verify', 'notes': 'Checked',
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(response.data['missing'], [999])
+        for entry in TroubleshootingEntry.objects.filter(pk__in=self.ids):
+            self.assertEqual(entry.status, 'PUBLISHED')
+            self.assertTrue(entry.is_verified)
+            self.assertEqual(entry.verified_by, self.reviewer)
+        revisions = EntryRevision.objects.filter(entry_id__in=self.ids)
+        self.assertEqual(revisions.count(), 3)
+        self.assertEqual(revisions.first().change_summary, 'Verified: Checked')
+
+    def test_review_queue_lists_pending_entries_by_priority(self):
+        urgent = self.entries[2]
+        TroubleshootingEntry.objects.filter(pk=urgent.pk).update(
+            priority='CRITICAL', priority_rank=TroubleshootingEntry.PRIORITY_RANKS['CRITICAL']
+        )
+        self.client.force_authenticate(self.reviewer)
+        response = self.client.get('/api/v1/entries/review-queue/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['id'], urgent.pk)
+
+    def test_requires_a_reviewer(self):
+        response = self.client.post(self.url, {'ids': self.ids, 'action': 'publish'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(TroubleshootingEntry.objects.filter(status='PUBLISHED').exists())
+
+
+class AsyncViewTests(EntryAPITestCase):
+    """The async read views answer like the DRF views they stand in for."""
+
+    def setUp(self):
+        super().setUp()
+        self.authorization = f'Bearer {AccessToken.for_user(self.author)}'
+
+    def async_get(self, url, params=None, **headers):
+        with override_settings(ROOT_URLCONF='ts_backend.asgi_urls'):
+            return async_to_sync(self.async_client.get)(url, params, headers=headers)
+
+    def test_reads_match_the_drf_views(self):
+        for url, params in (
+            ('/api/v1/entries/', {}),
+            ('/api/v1/entries/', {'search': 'Entry 1', 'ordering': '-created_at'}),
+            (f'/api/v1/entries/{self.entries[0].pk}/', {}),
+            ('/api/v1/entries/999/', {}),
+            ('/api/v1/users/me/', {}),
+        ):
+            with self.subTest(url=url, params=params):
+                expected = self.client.get(url, params)
+                response = self.async_get(url, params, Authorization=self.authorization)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_requires_credentials(self):
+        response = self.async_get('/api/v1/entries/')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rejections_match_drf(self):
+        self.client.force_authenticate(None)
+        for headers in ({}, {'Authorization': 'Bearer not-a-token'}):
+            with self.subTest(headers=headers):
+                expected = self.client.get('/api/v1/entries/', headers=headers)
+                response = self.async_get('/api/v1/entries/', **headers)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response['WWW-Authenticate'], expected['WWW-Authenticate'])
+                self.assertEqual(response.json(), expected.json())
+
+    def test_accepts_a_session(self):
+        self.async_client.force_login(self.author)
+
+        response = self.async_get(f'/api/v1/entries/{self.entries[0].pk}/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_writes_reach_the_drf_viewset(self):
+        request = AsyncRequestFactory().post('/api/v1/entries/', {
+            'title': 'Async entry', 'problem_description': 'Problem', 'solution': 'Solution',
+            'category': self.category.pk,
+        }, content_type='application/json', headers={'Authorization': self.authorization})
+
+        response = async_to_sync(async_views.entry_list)(request)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(TroubleshootingEntry.objects.filter(title='Async entry', author=self.author).exists())
+
+
+class EntryEventTests(EntryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('troubleshoots.events.get_broker')
+        self.broker = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def published(self):
+        return [(call.args[0], call.args[1]['type']) for call in self.broker.publish.call_args_list]
+
+    def test_writes_publish_once_committed(self):
+        entry = self.entries[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/v1/comments/', {
+                'troubleshooting_entry': entry.pk, 'content': 'Flush the resolver cache',
+            }, format='json')
+            self.client.post(f'/api/v1/entries/{entry.pk}/vote/', {'vote_type': 'UP'}, format='json')
+            self.assertFalse(self.broker.publish.called)
+
+        channel = f'entry:{entry.pk}'
+        self.assertEqual(self.published(), [(channel, 'comment.created'), (channel, 'votes')])
+        self.assertEqual(self.broker.publish.call_args.args[1]['data'], {'upvotes_count': 1})
+
+    def test_review_publishes_per_entry(self):
+        ids = [entry.pk for entry in self.entries[:2]]
+        with self.captureOnCommitCallbacks(execute=True):
+            events.review_changed(ids, {'status': 'PUBLISHED', 'verified_by': None})
+
+        self.assertEqual(self.published(), [(f'entry:{pk}', 'review') for pk in ids])
+        self.assertEqual(self.broker.publish.call_args.args[1]['data'], {'status': 'PUBLISHED'})
+
+
+class EntryStreamTests(EntryAPITestCase):
+    """``/entries/<pk>/events/`` through ``StreamRouter``, as the ASGI application serves it."""
+
+    def setUp(self):
+        super().setUp()
+        self.broker = LocalBroker()
+        self.application = mock.AsyncMock()
+        self.router = StreamRouter(self.application, stream_urlpatterns)
+        self.token = str(AccessToken.for_user(self.author))
+        for patcher in (
+            mock.patch('core.streams.get_broker', return_value=self.broker),
+            # The connection holds the test's transaction.
+            mock.patch('core.streams.close_old_connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def request(self, path, method='GET', token=None, publish=None):
+        """
+        The ASGI messages sent for a request. An open stream gets ``publish``,
+        ``(channel, event)``, and is disconnected after relaying an event.
+        """
+        sent = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            body = message.get('body', b'')
+            if body.startswith(b'retry:'):
+                self.broker.publish(*publish)
+            elif body.startswith(b'id:'):
+                disconnected.set()
+
+        headers = [(b'authorization', f'Bearer {token}'.encode())] if token else []
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': headers}
+        await asyncio.wait_for(self.router(scope, receive, send), 5)
+        return sent
+
+    async def test_relays_the_entry_channel(self):
+        pk = self.entries[0].pk
+        sent = await self.request(
+            f'/api/v1/entries/{pk}/events/', token=self.token,
+            publish=(f'entry:{pk}', {'type': 'votes', 'data': {'upvotes_count': 2}}),
+        )
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        self.assertEqual(sent[-1]['body'], b'id: 1\nevent: votes\ndata: {"upvotes_count":2}\n\n')
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+    async def test_rejects_bad_requests_before_streaming(self):
+        pk = self.entries[0].pk
+        for path, method, token, code in (
+            (f'/api/v1/entries/{pk}/events/', 'GET', None, 401),
+            ('/api/v1/entries/999/events/', 'GET', self.token, 404),
+            (f'/api/v1/entries/{pk}/events/', 'POST', self.token, 405),
+        ):
+            with self.subTest(path=path, method=method):
+                sent = await self.request(path, method, token)
+                self.assertEqual(sent[0]['status'], code)
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+    async def test_other_paths_reach_django(self):
+        sent = await self.request('/api/v1/entries/')
+
+        self.assertEqual(sent, [])
+        self.application.assert_awaited_once()
+
+
+class CommentThreadTests(EntryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.entry = self.entries[0]
+        self.first = self.comment('First')
+        self.solution = self.comment('Solution', is_solution=True)
+        self.last = self.comment('Last')
+        self.replies = [self.comment(f'Reply {i}', parent=self.first) for i in range(4)]
+        self.nested = self.comment('Nested', parent=self.replies[0])
+        self.deepest = self.comment('Deepest', parent=self.nested)
+        self.url = f'/api/v1/entries/{self.entry.pk}/comments/'
+
+    def comment(self, content, **fields):
+        return Comment.objects.create(
+            troubleshooting_entry=self.entry, author=self.author, content=content, **fields
+        )
+
+    def test_solutions_come_first(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            [comment['id'] for comment in response.data['results']],
+            [self.solution.pk, self.first.pk, self.last.pk],
+        )
+
+    def test_replies_are_nested_within_limits(self):
+        thread = self.client.get(self.url).data['results'][1]
+
+        self.assertEqual(thread['replies_count'], 4)
+        self.assertEqual([reply['id'] for reply in thread['replies']], [r.pk for r in self.replies[:3]])
+        nested = thread['replies'][0]['replies'][0]
+        self.assertEqual(nested['id'], self.nested.pk)
+        self.assertEqual((nested['replies'], nested['replies_count']), ([], 1))
+        self.assertIsNotNone(nested['replies_next'])
+        self.assertIsNone(thread['replies'][1]['replies_next'])
+
+        thread = self.client.get(self.url, {'depth': 0}).data['results'][1]
+        self.assertEqual((thread['replies'], thread['replies_count']), ([], 4))
+
+    def test_replies_next_loads_the_rest(self):
+        thread = self.client.get(self.url).data['results'][1]
+
+        response = self.client.get(thread['replies_next'])
+        self.assertEqual([reply['id'] for reply in response.data['results']], [self.replies[3].pk])
+        self.assertIsNone(response.data['next'])
+
+    def test_pages_by_cursor(self):
+        first = self.client.get(self.url, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual(len(first.data['results']), 2)
+        self.assertEqual([comment['id'] for comment in second.data['results']], [self.last.pk])
+        self.assertIsNone(second.data['next'])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_comment_list_and_detail_nest_replies_within_limits(self):
+        response = self.client.get('/api/v1/comments/', {'parent': self.first.pk, 'depth': 1})
+
+        [reply, *_] = response.data['results']
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(([r['id'] for r in reply['replies']], reply['replies_count']), ([self.nested.pk], 1))
+        self.assertEqual(reply['replies'][0]['replies'], [])
+        self.assertIsNotNone(reply['replies'][0]['replies_next'])
+
+        thread = self.client.get(f'/api/v1/comments/{self.first.pk}/').data
+        self.assertEqual([r['id'] for r in thread['replies']], [r.pk for r in self.replies[:3]])
+        self.assertEqual(self.client.get(thread['replies_next']).data['results'][0]['id'], self.replies[3].pk)
+
+    def test_comment_list_queries_do_not_grow_with_the_threads(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/v1/comments/')
+        for comment in [self.first, self.last, *self.replies]:
+            for i in range(3):
+                self.comment(f'More {i}', parent=comment)
+
+        with self.assertNumQueries(len(few)):
+            self.client.get('/api/v1/comments/')
+
+
+class QueryCountTests(EntryAPITestCase):
+    """The list and thread endpoints load related rows per page, not per row."""
+
+    def setUp(self):
+        super().setUp()
+        for entry in self.entries:
+            Vote.objects.create(troubleshooting_entry=entry, user=self.author, vote_type='UP')
+            parent = Comment.objects.create(troubleshooting_entry=entry, author=self.author, content='Top')
+            for i in range(3):
+                Comment.objects.create(
+                    troubleshooting_entry=entry, author=self.reviewer, content=f'Reply {i}', parent=parent
+                )
+
+    def test_endpoints_run_no_repeated_queries(self):
+        entry = self.entries[0]
+        comment = Comment.objects.filter(troubleshooting_entry=entry, parent=None).get()
+        for url in ('/api/v1/entries/', f'/api/v1/entries/{entry.pk}/',
+                    f'/api/v1/entries/{entry.pk}/comments/', '/api/v1/comments/',
+                    f'/api/v1/comments/{comment.pk}/'):
+            with self.subTest(url=url), QueryAnalyzer(strict=True, threshold=3):
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+
+class SparseFieldsTests(EntryAPITestCase):
+
+    def test_fields_limits_the_response(self):
+        response = self.client.get('/api/v1/entries/', {'fields': 'id,title,author.username'})
+
+        entry = response.data['results'][0]
+        self.assertEqual(set(entry), {'id', 'title', 'author'})
+        self.assertEqual(entry['author'], {'username': 'author'})
+
+    def test_expand_replaces_ids_with_objects(self):
+        TroubleshootingEntry.objects.update(status='PENDING_REVIEW')
+        self.client.force_authenticate(self.reviewer)
+
+        entry = self.client.get('/api/v1/entries/review-queue/').data['results'][0]
+        self.assertEqual(entry['author'], self.author.pk)
+        entry = self.client.get(
+            '/api/v1/entries/review-queue/', {'expand': 'author', 'fields': 'id,author.username'}
+        ).data['results'][0]
+        self.assertEqual(entry, {'id': entry['id'], 'author': {'username': 'author'}})
+
+    def test_writes_return_every_field(self):
+        response = self.client.post('/api/v1/comments/?fields=id', {
+            'troubleshooting_entry': self.entries[0].pk, 'content': 'Restart the service',
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('content', response.data)
+
+
+class BatchWriteTests(EntryAPITestCase):
+    url = '/api/v1/batch/'
+
+    def vote(self, entry, vote_type='UP'):
+        return {'op': 'create', 'type': 'vote',
+                'data': {'troubleshooting_entry': entry.pk, 'vote_type': vote_type}}
+
+    def comment(self, entry, content='Works for me'):
+        return {'op': 'create', 'type': 'comment',
+                'data': {'troubleshooting_entry': entry.pk, 'content': content}}
+
+    def test_applies_every_operation_and_reports_each(self):
+        first, second, _ = self.entries
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'create', 'type': 'entry', 'data': {
+                'title': 'New entry', 'problem_description': 'Problem', 'solution': 'Solution',
+                'category': self.category.pk, 'tag_names': ['dns', 'vpn'],
+            }},
+            self.vote(first), self.vote(second, 'DOWN'), self.comment(first),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['applied'], 4)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], [201, 200, 200, 201])
+        created = TroubleshootingEntry.objects.get(pk=results[0]['id'])
+        self.assertEqual(set(created.tags.values_list('name', flat=True)), {'dns', 'vpn'})
+        self.assertEqual(results[1]['upvotes_count'], 1)
+        first.refresh_from_db()
+        self.assertEqual(first.upvotes_count, 1)
+        self.assertTrue(Comment.objects.filter(pk=results[3]['id'], troubleshooting_entry=first).exists())
+
+    def test_changes_an_existing_vote(self):
+        entry = self.entries[0]
+        Vote.objects.create(troubleshooting_entry=entry, user=self.author, vote_type='UP')
+        response = self.client.post(self.url, {'operations': [self.vote(entry, 'DOWN')]}, format='json')
+
+        self.assertEqual(response.data['results'][0]['upvotes_count'], 0)
+        self.assertEqual(Vote.objects.get(troubleshooting_entry=entry).vote_type, 'DOWN')
+
+    def test_rejects_a_second_vote_on_the_same_entry(self):
+        entry = self.entries[0]
+        response = self.client.post(self.url, {'operations': [
+            self.vote(entry, 'UP'), self.vote(entry, 'DOWN'),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['applied'], 1)
+        self.assertEqual(response.data['results'][1]['status'], 400)
+        self.assertIn('troubleshooting_entry', response.data['results'][1]['errors'])
+        self.assertEqual(Vote.objects.get(troubleshooting_entry=entry).vote_type, 'UP')
+
+    def test_atomic_batch_with_an_invalid_operation_applies_nothing(self):
+        response = self.client.post(self.url, {'atomic': True, 'operations': [
+            self.comment(self.entries[0]), self.comment(self.entries[0], content=''),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['applied'], 0)
+        self.assertEqual([result['status'] for result in response.data['results']], [424, 400])
+        self.assertFalse(Comment.objects.exists())
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def queries(entries):
+            operations = [self.vote(entry) for entry in entries] + [self.comment(entry) for entry in entries]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.url, {'operations': operations}, format='json')
+            self.assertEqual(response.data['applied'], len(operations))
+            return len(context.captured_queries)
+
+        self.assertEqual(queries(self.entries[:1]), queries(self.entries[1:]))
+
+
+class ExpertiseTests(EntryAPITestCase):
+    """Writes queue expertise recomputes once per transaction, when it commits."""
+
+    def setUp(self):
+        super().setUp()
+        self.voters = [
+            User.objects.create_user(f'voter{i}', f'voter{i}@example.com', 'pass') for i in range(3)
+        ]
+
+    def vote(self, entry, voters):
+        for voter in voters:
+            Vote.objects.create(troubleshooting_entry=entry, user=voter, vote_type='UP')
+
+    def test_votes_queue_the_entry_authors_on_commit(self):
+        recomputes = Job.objects.filter(task=recompute_expertise.name, kwargs__user_id=self.author.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for entry in self.entries:
+                self.vote(entry, self.voters)
+            self.assertFalse(recomputes.exists())
+
+        self.assertEqual(recomputes.count(), 1)
+        self.assertFalse(Job.objects.filter(
+            task=recompute_expertise.name, kwargs__user_id__in=[voter.pk for voter in self.voters]
+        ).exists())
+
+    def test_deleting_an_entry_costs_the_same_however_many_votes_it_has(self):
+        def delete(entry, voters):
+            self.vote(entry, voters)
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                entry.delete()
+            return len(queries)
+
+        self.assertEqual(delete(self.entries[0], self.voters[:1]), delete(self.entries[1], self.voters))
+
+
+class ArchiveTests(EntryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.entry = self.entries[0]
+        Vote.objects.create(troubleshooting_entry=self.entry, user=self.reviewer, vote_type='UP')
+        self.comment = Comment.objects.create(troubleshooting_entry=self.entry, author=self.author, content='Top')
+        self.reply = Comment.objects.create(
+            troubleshooting_entry=self.entry, author=self.reviewer, content='Reply', parent=self.comment
+        )
+        TroubleshootingEntry.objects.filter(pk=self.entry.pk).update(
+            status='ARCHIVED', updated_at=timezone.now() - timedelta(days=365)
+        )
+
+    def test_archive_batch_moves_entries_with_their_rows(self):
+        self.assertEqual(archive.archive_batch(), [self.entry.pk])
+
+        self.assertFalse(TroubleshootingEntry.objects.filter(pk=self.entry.pk).exists())
+        self.assertFalse(Comment.objects.filter(troubleshooting_entry_id=self.entry.pk).exists())
+        archived = ArchivedEntry.objects.get(pk=self.entry.pk)
+        self.assertIsNotNone(archived.archived_at)
+        self.assertEqual(list(archived.tags.all()), [self.tag])
+        self.assertEqual(ArchivedVote.objects.filter(troubleshooting_entry=archived).count(), 1)
+        self.assertEqual(
+            set(ArchivedComment.objects.values_list('pk', flat=True)), {self.comment.pk, self.reply.pk}
+        )
+        self.assertEqual(archive.archive_batch(), [])
+
+    def test_recently_archived_entries_stay(self):
+        TroubleshootingEntry.objects.filter(pk=self.entry.pk).update(updated_at=timezone.now())
+
+        self.assertEqual(archive.archive_batch(), [])
+
+    def test_archived_entries_are_read_with_include_archived(self):
+        archive.archive_batch()
+        detail = f'/api/v1/entries/{self.entry.pk}/'
+
+        self.assertEqual(self.client.get(detail).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(detail, {'include_archived': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], self.entry.title)
+
+        response = self.client.get(f'{detail}comments/', {'include_archived': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [thread] = response.data['results']
+        self.assertEqual(thread['id'], self.comment.pk)
+        self.assertEqual([reply['id'] for reply in thread['replies']], [self.reply.pk])
+
+        response = self.client.get(f'/api/v1/comments/{self.reply.pk}/', {'include_archived': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_pages_through_both_tiers(self):
+        archive.archive_batch()
+        self.create_entry('Newest')
+
+        response = self.client.get('/api/v1/entries/', {'include_archived': 'true', 'ordering': 'created_at'})
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(
+            [entry['title'] for entry in response.data['results']],
+            ['Entry 0', 'Entry 1', 'Entry 2', 'Newest'],
+        )
+        response = self.client.get('/api/v1/entries/')
+        self.assertEqual(response.data['count'], 3)
+
+    def test_restore_moves_entries_back(self):
+        archive.archive_batch()
+        # A live entry took the slug in the meantime.
+        self.create_entry(self.entry.title)
+        self.client.force_authenticate(self.reviewer)
+        response = self.client.post('/api/v1/entries/restore/', {'ids': [self.entry.pk, 999]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'restored': [self.entry.pk], 'missing': [999]})
+        self.assertFalse(ArchivedEntry.objects.exists())
+        restored = TroubleshootingEntry.objects.get(pk=self.entry.pk)
+        self.assertEqual(restored.slug, f'{self.entry.slug}-{self.entry.pk}')
+        self.assertEqual(restored.votes.count(), 1)
+        self.assertEqual(
+            set(restored.comments.values_list('pk', flat=True)), {self.comment.pk, self.reply.pk}
+        )
+        # Marked updated now: the next sweep leaves it.
+        self.assertEqual(archive.archive_batch(), [])
+
+    def test_restore_requires_a_reviewer(self):
+        archive.archive_batch()
+        response = self.client.post('/api/v1/entries/restore/', {'ids': [self.entry.pk]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(ArchivedEntry.objects.filter(pk=self.entry.pk).exists())
@@ -0,0 +1,86 @@
+"""
+Depth-limited comment threads.
+
+A page of comments is loaded first, then their replies one level at a time,
+at most ``per_node`` per comment (a window function ranks siblings, so each
+level is one query however many parents it has). Reply counts for every
+loaded comment come from a single aggregate query at the end. A thread of
+depth ``d`` therefore costs ``d + 2`` queries.
+"""
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from core.pagination import KeysetPagination
+
+from .models import Comment
+
+# Alternative solutions first, then oldest first.
+THREAD_ORDERING = ('-is_solution', 'created_at', 'id')
+
+
+class CommentThreadPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
+    ordering = THREAD_ORDERING
+
+    reply_depth = 2
+    max_reply_depth = 5
+    replies_per_comment = 3
+    max_replies_per_comment = 20
+
+    def get_reply_limits(self, request):
+        """``(depth, per_comment)`` from ``?depth=`` and ``?replies=``, clamped."""
+        return (
+            _clamped(request.query_params.get('depth'), self.reply_depth, self.max_reply_depth),
+            _clamped(request.query_params.get('replies'), self.replies_per_comment,
+                     self.max_replies_per_comment),
+        )
+
+
+def _clamped(value, default, maximum):
+    try:
+        return max(0, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+def load_replies(comments, depth, per_node, model=Comment):
+    """
+    Set ``loaded_replies`` and ``replies_count_annotation`` on ``comments``
+    and on every reply loaded below them, ``depth`` levels deep; ``model``
+    is ``ArchivedComment`` for the threads of archived entries.
+    """
+    loaded = list(comments)
+    level = loaded
+    for comment in level:
+        comment.loaded_replies = []
+
+    for _ in range(depth):
+        if not level:
+            break
+        parents = {comment.pk: comment for comment in level}
+        level = list(
+            model.objects.filter(parent_id__in=parents, is_deleted=False)
+            .select_related('author')
+            .annotate(sibling_rank=Window(
+                RowNumber(), partition_by=F('parent_id'),
+                order_by=[F('is_solution').desc(), F('created_at').asc(), F('id').asc()],
+            ))
+            .filter(sibling_rank__lte=per_node)
+            .order_by('parent_id', *THREAD_ORDERING)
+        )
+        for reply in level:
+            reply.loaded_replies = []
+            parents[reply.parent_id].loaded_replies.append(reply)
+        loaded.extend(level)
+
+    counts = dict(
+        model.objects.filter(parent_id__in=[comment.pk for comment in loaded], is_deleted=False)
+        .order_by()
+        .values('parent_id')
+        .annotate(total=Count('id'))
+        .values_list('parent_id', 'total')
+    ) if loaded else {}
+    for comment in loaded:
+        comment.replies_count_annotation = counts.get(comment.pk, 0)
+    return loaded
@@ -0,0 +1,17 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+
+router = DefaultRouter()
+router.register(r'categories', views.CategoryViewSet, basename='category')
+router.register(r'tags', views.TagViewSet, basename='tag')
+router.register(r'entries', views.TroubleshootingEntryViewSet, basename='entry')
+router.register(r'comments', views.CommentViewSet, basename='comment')
+
+urlpatterns = [
+    path('', include(router.urls)),
+    path('batch/', views.BatchWriteView.as_view(), name='batch'),
+    path('experts/', views.ExpertsView.as_view(), name='experts'),
+]
@@ -1,3 +1,423 @@
-from django.shortcuts import render
+from rest_framework import viewsets, status, permissions, generics
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.pagination import PageNumberPagination
 
-# Create your views here.
+from django.contrib.auth import get_user_model
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.http import Http404
+from django_filters.rest_framework import DjangoFilterBackend
+
+from core.fieldsets import SparseFieldsViewMixin, field_requested, optimize_queryset
+from .models import (
+    ArchivedComment, ArchivedEntry, Category, CategoryExpertise, Tag, TagExpertise,
+    TroubleshootingEntry, Comment,
+)
+from .serializers import (
+    CategorySerializer,
+    TagSerializer,
+    TroubleshootingEntryListSerializer,
+    TroubleshootingEntryDetailSerializer,
+    TroubleshootingEntryCreateUpdateSerializer,
+    VoteCreateUpdateSerializer,
+    CommentCreateUpdateSerializer,
+    CommentThreadSerializer,
+    ReviewQueueEntrySerializer,
+    ReviewActionSerializer,
+    RestoreEntriesSerializer,
+    ExpertQuerySerializer,
+    ExpertSerializer,
+    UserSerializer,
+)
+from .permissions import IsAuthorOrReadOnly, IsAdminOrReadOnly, IsReviewer
+from . import archive, events, expertise
+from .threads import CommentThreadPagination, load_replies
+from .caching import active_categories
+from .tasks import recount_tag_usage
+
+User = get_user_model()
+
+class StandardPagination(PageNumberPagination):
+    page_size = 15
+
+
+def comment_thread_response(view, queryset):
+    """Paginate ``queryset`` with the view's thread pagination and nest replies."""
+    paginator = view.paginator
+    depth, per_comment = paginator.get_reply_limits(view.request)
+    page = paginator.paginate_queryset(queryset, view.request, view)
+    load_replies(page, depth, per_comment, queryset.model)
+    serializer = CommentThreadSerializer(
+        page, many=True, context={**view.get_serializer_context(), 'paginator': paginator},
+        **view.field_selection
+    )
+    return paginator.get_paginated_response(serializer.data)
+
+
+def get_object_or_archived(view):
+    """
+    ``view.get_object()``, or when the request asks for archives and there
+    is no live object, the archived one: ``view.archive_tier`` is then set
+    and ``get_queryset`` reads the archive tier (see troubleshoots.archive).
+    """
+    try:
+        return view.get_object()
+    except Http404:
+        if not archive.archives_requested(view.request):
+            raise
+    view.archive_tier = True
+    return view.get_object()
+
+
+def group_subcategories(categories):
+    """
+    ``{parent_id: [children]}`` for ``categories``, the context
+    ``CategorySerializer`` takes to render subcategories without a query per node.
+    """
+    by_id = {category.pk: category for category in categories}
+    children = {}
+    for category in by_id.values():
+        if category.parent_id is not None:
+            # Reuse the loaded parent so ``parent_name`` needs no query.
+            if category.parent_id in by_id:
+                category.parent = by_id[category.parent_id]
+            children.setdefault(category.parent_id, []).append(category)
+    return children
+
+
+def annotate_entries(queryset, user, selection):
+    """Annotate the comment count and ``user``'s vote, if the response has them."""
+    if field_requested(selection, 'comments_count'):
+        queryset = queryset.annotate(
+            comments_count_annotation=Count('comments', filter=Q(comments__is_deleted=False))
+        )
+    if field_requested(selection, 'user_vote'):
+        # Vote or ArchivedVote, for either tier's entries.
+        votes = queryset.model._meta.get_field('votes').related_model
+        queryset = queryset.annotate(user_vote_annotation=Subquery(
+            votes.objects.filter(
+                troubleshooting_entry=OuterRef('pk'), user=user
+            ).values('vote_type')[:1]
+        ))
+    return queryset
+
+
+class CategoryViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for browsing categories. Only admins can change them.
+    """
+
+    serializer_class = CategorySerializer
+    permission_classes = [IsAdminOrReadOnly]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = ['parent', 'is_active']
+    search_fields = ['name', 'description']
+    ordering_fields = ['order', 'name']
+    ordering = ['order', 'name']
+    pagination_class = StandardPagination
+
+    def get_queryset(self):
+        return self.optimize_queryset(Category.objects.all())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve') and self.field_requested('subcategories'):
+            context['category_children'] = group_subcategories(active_categories())
+        return context
+
+
+class TagViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for browsing tags. Only admins can change them.
+    """
+
+    serializer_class = TagSerializer
+    permission_classes = [IsAdminOrReadOnly]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = ['is_featured']
+    search_fields = ['name']
+    ordering_fields = ['name', 'created_at']
+    ordering = ['name']
+    pagination_class = StandardPagination
+
+    def get_queryset(self):
+        return self.optimize_queryset(Tag.objects.all())
+
+
+class TroubleshootingEntryViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for troubleshooting entries.
+
+    Lists use the lightweight serializer, a single entry is returned with
+    attachments and revisions. Comments are paginated separately under
+    `/entries/<id>/comments/`. Searching goes through `?search=`, and
+    `?fields=` trims the response (see `core.fieldsets`).
+
+    Entries archived long ago live in the archive tier (see
+    `troubleshoots.archive`); `?include_archived=true` includes them in lists
+    and searches, and finds them and their comment threads by id. Reviewers
+    restore them with `/entries/restore/`.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsAuthorOrReadOnly]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = ['category', 'status', 'priority', 'is_verified', 'author']
+    search_fields = ['title', 'problem_description', 'error_messages', 'tags__name']
+    ordering_fields = ['created_at', 'updated_at', 'upvotes_count']
+    ordering = ['-created_at']
+    pagination_class = StandardPagination
+    archive_tier = False
+
+    def get_queryset(self):
+        """Queryset loading what the requested fields read, and nothing else."""
+        if getattr(self, 'swagger_fake_view', False):
+            # Schema generation: no user to annotate votes for, only the model matters.
+            return TroubleshootingEntry.objects.none()
+        model = ArchivedEntry if self.archive_tier else TroubleshootingEntry
+        if self.action == 'comments':
+            return model.objects.only('id', 'author')
+        queryset = self.optimize_queryset(model.objects.all())
+        if self.action in ('list', 'retrieve'):
+            queryset = annotate_entries(queryset, self.request.user, self.field_selection)
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve') and self.field_requested('category', 'subcategories'):
+            context['category_children'] = group_subcategories(active_categories())
+        return context
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return TroubleshootingEntryListSerializer
+        if self.action == 'retrieve':
+            return TroubleshootingEntryDetailSerializer
+        return TroubleshootingEntryCreateUpdateSerializer
+
+    def list(self, request, *args, **kwargs):
+        if not archive.archives_requested(request):
+            return super().list(request, *args, **kwargs)
+        # Filtered and ordered on the bare models; the page is loaded from get_queryset().
+        keys = [self.filter_queryset(TroubleshootingEntry.objects.all())]
+        querysets = [self.get_queryset()]
+        self.archive_tier = True
+        keys.append(self.filter_queryset(ArchivedEntry.objects.all()))
+        querysets.append(self.get_queryset())
+        page = self.paginate_queryset(archive.TieredResults(keys, querysets))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(get_object_or_archived(self))
+        return Response(serializer.data)
+
+    def perform_destroy(self, instance):
+        tag_ids = [tag.pk for tag in instance.tags.all()]
+        instance.delete()
+        for tag_id in tag_ids:
+            recount_tag_usage.enqueue(tag_id=tag_id)
+
+    @action(detail=True, methods=['get'], pagination_class=CommentThreadPagination)
+    def comments(self, request, pk=None):
+        """
+        Top-level comments, alternative solutions first, each with replies
+        nested `?depth=` levels deep and at most `?replies=` per comment.
+        Paginated with `?cursor=`; `replies_next` links load the rest of a
+        comment's replies.
+        """
+        entry = get_object_or_archived(self)
+        comments = ArchivedComment if self.archive_tier else Comment
+        return comment_thread_response(self, comments.objects.filter(
+            troubleshooting_entry=entry, parent=None, is_deleted=False
+        ).select_related('author'))
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def vote(self, request, pk=None):
+        """
+        Cast or change the current user's vote on an entry.
+        """
+        entry = self.get_object()
+        serializer = VoteCreateUpdateSerializer(
+            data={'troubleshooting_entry': entry.pk, 'vote_type': request.data.get('vote_type')},
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        vote = serializer.save()
+        entry.refresh_from_db(fields=['upvotes_count'])
+        return Response(
+            {'vote_type': vote.vote_type, 'upvotes_count': entry.upvotes_count},
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['get'], url_path='review-queue',
+            permission_classes=[IsReviewer])
+    def review_queue(self, request):
+        """
+        Entries waiting for review, highest priority first, then oldest.
+
+        The filter and ordering match ``entry_review_queue_idx`` exactly, so
+        a page is read straight off the index without sorting the table.
+        """
+        queryset = optimize_queryset(
+            TroubleshootingEntry.objects.filter(status='PENDING_REVIEW').order_by(
+                '-priority_rank', 'created_at', 'id'
+            ),
+            ReviewQueueEntrySerializer, **self.field_selection
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = ReviewQueueEntrySerializer(page, many=True, **self.field_selection)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsReviewer])
+    def review(self, request):
+        """
+        Verify, publish or archive many entries at once.
+
+        Body: ``{"ids": [...], "action": "verify" | "publish" | "archive", "notes": ""}``
+        """
+        serializer = ReviewActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save(reviewer=request.user)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsReviewer])
+    def restore(self, request):
+        """
+        Move entries back from the archive tier, with their comments, votes,
+        attachments and revisions.
+
+        Body: ``{"ids": [...]}``
+        """
+        serializer = RestoreEntriesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save(reviewer=request.user)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class CommentViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for comments on troubleshooting entries.
+
+    With `?include_archived=true`, a comment and its replies are found in
+    the archive tier too (see `troubleshoots.archive`).
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsAuthorOrReadOnly]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ['troubleshooting_entry', 'parent', 'is_solution']
+    ordering_fields = ['created_at']
+    ordering = ['created_at']
+    pagination_class = StandardPagination
+    archive_tier = False
+
+    def get_queryset(self):
+        model = ArchivedComment if self.archive_tier else Comment
+        return self.optimize_queryset(model.objects.filter(is_deleted=False))
+
+    def get_serializer_class(self):
+        if self.action in ['create', 'update', 'partial_update']:
+            return CommentCreateUpdateSerializer
+        return CommentThreadSerializer
+
+    def get_serializer_context(self):
+        # replies_next links continue a thread with /replies/'s cursors.
+        return {**super().get_serializer_context(), 'paginator': CommentThreadPagination()}
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        self.nest_replies(page)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        comment = get_object_or_archived(self)
+        self.nest_replies([comment])
+        return Response(self.get_serializer(comment).data)
+
+    def nest_replies(self, comments):
+        """
+        ``load_replies`` for ``comments``, as deep and as many per comment as
+        `?depth=` and `?replies=` ask, like the thread endpoints.
+        """
+        depth, per_comment = CommentThreadPagination().get_reply_limits(self.request)
+        load_replies(comments, depth, per_comment, ArchivedComment if self.archive_tier else Comment)
+
+    @action(detail=True, methods=['get'], pagination_class=CommentThreadPagination)
+    def replies(self, request, pk=None):
+        """
+        Replies to a comment, paginated and nested like `/entries/<id>/comments/`.
+        """
+        comment = get_object_or_archived(self)
+        comments = ArchivedComment if self.archive_tier else Comment
+        return comment_thread_response(self, comments.objects.filter(
+            parent=comment, is_deleted=False
+        ).select_related('author'))
+
+    def perform_destroy(self, instance):
+        """Soft delete so replies keep their thread."""
+        instance.is_deleted = True
+        instance.save(update_fields=['is_deleted', 'updated_at'])
+        events.comment_changed(instance)
+
+
+class BatchWriteView(generics.GenericAPIView):
+    """
+    Create and update many entries, votes and comments in one request and
+    one transaction; see `troubleshoots.batch` for the body format.
+
+    Responds with one result per operation, in order: its HTTP status and
+    either the object id (vote type and upvote count for votes) or errors.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_serializer_class(self):
+        # troubleshoots.batch is only imported by the first batch request.
+        from .batch import BatchRequestSerializer
+        return BatchRequestSerializer
+
+    def post(self, request):
+        from .batch import BatchWriter
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results, applied = BatchWriter(request.user).run(**serializer.validated_data)
+        rejected = serializer.validated_data['atomic'] and applied < len(results)
+        return Response(
+            {'applied': applied, 'results': results},
+            status=status.HTTP_400_BAD_REQUEST if rejected else status.HTTP_200_OK
+        )
+
+
+class ExpertsView(generics.GenericAPIView):
+    """
+    Who can solve this: the users with the most expertise in a category
+    (`?category=<id>`), a tag (`?tag=<id>`) or the categories and tags a
+    problem description names (`?q=<text>`), best first, at most `?limit=`
+    (default 10, at most 50). See `troubleshoots.expertise` for the scores.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ExpertSerializer
+
+    def get(self, request):
+        params = ExpertQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        category, tag = params.validated_data.get('category'), params.validated_data.get('tag')
+        limit = params.validated_data['limit']
+        if category is not None:
+            categories, tags = [category], []
+            rows = expertise.top_experts(CategoryExpertise, [category.pk], limit)
+        elif tag is not None:
+            categories, tags = [], [tag]
+            rows = expertise.top_experts(TagExpertise, [tag.pk], limit)
+        else:
+            categories, tags, rows = expertise.experts_for_text(params.validated_data['q'], limit)
+
+        users = User.objects.only(*UserSerializer.Meta.fields).in_bulk([row['user_id'] for row in rows])
+        experts = [{**row, 'user': users[row['user_id']]} for row in rows if row['user_id'] in users]
+        return Response({
+            'categories': [{'id': c.pk, 'name': c.name, 'slug': c.slug} for c in categories],
+            'tags': [{'id': t.pk, 'name': t.name, 'slug': t.slug} for t in tags],
+            'experts': self.get_serializer(experts, many=True).data,
+        })
@@ -14,3 +14,17 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ts_backend.settings')
 
 application = get_asgi_application()
+
+from django.core.handlers.asgi import ASGIRequest  # noqa: E402
+
+from core.streams import StreamRouter  # noqa: E402
+from .asgi_urls import stream_urlpatterns  # noqa: E402
+
+
+class AsyncRoutesASGIRequest(ASGIRequest):
+    # Route through the URLconf that puts the async read views first.
+    urlconf = 'ts_backend.asgi_urls'
+
+
+application.request_class = AsyncRoutesASGIRequest
+application = StreamRouter(application, stream_urlpatterns)
@@ -0,0 +1,27 @@
+"""
+URL configuration used by the ASGI application.
+
+The hot read endpoints are served by async views that take precedence over
+their DRF counterparts at the same paths; every other URL falls through to
+``ts_backend.urls`` unchanged. The WSGI application keeps using
+``ts_backend.urls`` directly.
+"""
+from django.urls import path
+
+from accounts import async_views as accounts_async
+from troubleshoots import async_views as troubleshoots_async
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/v1/departments/', accounts_async.department_list, name='department-list'),
+    path('api/v1/users/me/', accounts_async.me, name='user-me'),
+    path('api/v1/entries/', troubleshoots_async.entry_list, name='entry-list'),
+    path('api/v1/entries/<int:pk>/', troubleshoots_async.entry_detail, name='entry-detail'),
+] + sync_urlpatterns
+
+# Long-lived Server-Sent Event streams, answered by core.streams.StreamRouter
+# in front of Django so an idle client holds no thread or connection.
+stream_urlpatterns = [
+    path('api/v1/entries/<int:pk>/events/', troubleshoots_async.entry_events, name='entry-events'),
+]
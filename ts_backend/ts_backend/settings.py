@@ -27,6 +27,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Addresses allowed to scrape /metrics/ without logging in
+INTERNAL_IPS = ['127.0.0.1']
+
 
 # Application definition
 
@@ -43,10 +46,13 @@ INSTALLED_APPS = [
     # 'djoser'
     'drf_spectacular', 
     'accounts',
-    'troubleshoots'
+    'troubleshoots',
+    'core',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,9 +89,34 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Production profile, with PERFORMANCE['SQLITE_PRAGMAS'] (see core/sqlite.py)
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Reads go to the aliases in PERFORMANCE['REPLICA_DATABASES'], when there are
+# any (see core/replicas.py and ts_backend/settings_replicas.py).
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared by every process on the host, so cache invalidation (core/caching.py)
+# and replica pins reach all of them. Throttle buckets are kept apart, in
+# PERFORMANCE['THROTTLE_LOCATION'] (see core/throttling.py).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': BASE_DIR / 'cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,15 +167,44 @@ AUTH_USER_MODEL = 'accounts.User'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication', # Optional, for browsable API
         'rest_framework.authentication.BasicAuthentication',   # Optional, for browsable API
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'TEST_REQUEST_RENDERER_CLASSES': (
+        'rest_framework.renderers.MultiPartRenderer',
+        'core.renderers.FastJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 15
+    'PAGE_SIZE': 15,
+    # Per-endpoint scopes (core.throttling.ScopedBucketThrottle); nothing is
+    # throttled by default. The limits the two endpoints had with DRF's anon
+    # and user throttles, per client address and per user respectively.
+    'DEFAULT_THROTTLE_RATES': {
+        'token_obtain': '100/minute',
+        'password_change': '1000/hour',
+    },
+}
+
+# drf-spectacular loads the accounts extensions when it generates a schema,
+# not at startup (see accounts/schema.py).
+SPECTACULAR_SETTINGS = {
+    'PREPROCESSING_HOOKS': ['accounts.schema.register_extensions'],
 }
 
 
@@ -163,4 +223,70 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
-}
\ No newline at end of file
+}
+
+
+# Performance tooling (see core/conf.py for every key and its default)
+PERFORMANCE = {
+    'INSTRUMENTATION': True,
+    'SERVER_TIMING': True,
+    'METRICS': True,
+    'NPLUSONE_DETECTION': DEBUG,
+    'NPLUSONE_THRESHOLD': 5,
+    'NPLUSONE_STRICT': False,
+    'SLOW_QUERY_MS': 200,
+    'PUBSUB_BACKEND': 'core.pubsub.LocalBroker',
+    'SSE_KEEPALIVE': 15,
+    'CACHE_TIMEOUT': 300,
+    'AUTH_USER_LOCAL_TTL': 5,
+    'SQLITE_PRAGMAS': {
+        'busy_timeout': 5000,  # ms
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -32000,  # KiB
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+    'THROTTLE_LOCATION': BASE_DIR / 'throttle.sqlite3',
+    'SCHEMA_CACHE_DIR': BASE_DIR / 'schema_cache',
+    'REPLICA_DATABASES': (),
+    'REPLICA_PIN_SECONDS': 5,
+    'ARCHIVE_AFTER_DAYS': 180,
+}
+
+
+# Logging
+LOG_DIR = BASE_DIR / 'logs'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.logformat.JsonFormatter'},
+    },
+    'handlers': {
+        'query_log': {
+            'class': 'core.logformat.RotatingFileHandler',
+            'filename': LOG_DIR / 'queries.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'json',
+            'delay': True,
+        },
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.queries': {
+            'handlers': ['query_log'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
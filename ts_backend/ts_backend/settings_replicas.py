@@ -0,0 +1,30 @@
+"""
+Settings with a read replica, for trying ``core.replicas`` locally.
+
+Two SQLite files stand in for the primary and its replica; ``manage.py
+sync_replicas`` plays the part of replication by copying the primary over the
+replica, once or every few seconds (the replication lag)::
+
+    export DJANGO_SETTINGS_MODULE=ts_backend.settings_replicas
+    python manage.py migrate
+    python manage.py sync_replicas --every 2 &
+    python manage.py runserver
+
+Under the test runner the replica mirrors the primary's test database.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, PERFORMANCE
+
+DATABASES = {
+    **DATABASES,
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+PERFORMANCE = {
+    **PERFORMANCE,
+    'REPLICA_DATABASES': ('replica',),
+}
@@ -16,15 +16,24 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+
+from core import views as core_views
+from core.lazy import lazy_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     path('api/v1/', include('accounts.urls')),
+    path('api/v1/', include('troubleshoots.urls')),
+
+    path('api/v1/audit/events/', core_views.AuditEventListView.as_view(), name='audit-events'),
+
+    # DRF SPECTACULAR URLS, served from the schema cache (core/schema.py) and
+    # imported by their first request (core/lazy.py)
+    path('api/v1/schema/', lazy_view('core.schema.CachedSchemaView'), name='schema'),
+    path('api/v1/schema/swagger-ui/', lazy_view('core.schema.CachedSwaggerView', url_name='schema'), name='swagger-ui'),
+    path('api/v1/schema/redoc/', lazy_view('core.schema.CachedRedocView', url_name='schema'), name='redoc'),
 
-    # DRF SPECTACULAR URLS
-    path('api/v1/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/v1/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/v1/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    # Prometheus scrape endpoint
+    path('metrics/', core_views.metrics, name='metrics'),
 ]